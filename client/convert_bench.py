@@ -0,0 +1,438 @@
+#!/usr/bin/env python3
+"""
+Convert2PDF 基准测试
+
+生成或加载覆盖主要输入格式的测试语料，以固定并发数（闭环）或固定到达速率（开环）向服务端发送转换请求，
+统计吞吐量以及按扩展名划分的 p50/p95/p99 延迟。结果可以保存为 JSON，便于对比服务端改动前后的表现。
+
+通过命令行使用:
+    python convert_cli.py bench -H 192.168.1.100 --concurrency 1,4,8 --requests 200 --json-out bench.json
+    python convert_cli.py bench -H 192.168.1.100 --rate 2,5,10 --duration 60 --corpus ./samples
+"""
+
+import asyncio
+import html
+import math
+import pathlib
+import platform
+import random
+import time
+import zipfile
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Union
+
+from convert_client import ConvertClient
+
+
+# 生成语料时的大小档位：名称 -> 段落（行）数
+CORPUS_SIZES = {"small": 20, "medium": 200, "large": 2000}
+
+# 生成正文用的词表
+WORDS = (
+    "convert document server office pdf report quarter revenue table chart page font "
+    "layout section summary figure appendix invoice contract meeting schedule budget "
+    "文档 转换 服务 报告 表格 图表 页面 字体 摘要 附录 合同 会议 预算 项目 数据"
+).split()
+
+_CONTENT_TYPES_RELS = (
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+)
+_OFFICE_DOCUMENT_REL = "http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument"
+
+
+def _sentences(rng: random.Random, count: int) -> List[str]:
+    return [
+        " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24))).capitalize() + "."
+        for _ in range(count)
+    ]
+
+
+def _rows(rng: random.Random, count: int) -> List[List[str]]:
+    return [
+        [str(i), rng.choice(WORDS), f"{rng.uniform(0, 10000):.2f}", str(rng.randint(0, 1000))]
+        for i in range(count)
+    ]
+
+
+def _zip_write(z: zipfile.ZipFile, name: str, data: str, compress_type: int = zipfile.ZIP_DEFLATED):
+    # 固定文件时间，保证相同参数生成的压缩包逐字节相同
+    info = zipfile.ZipInfo(name, date_time=(1980, 1, 1, 0, 0, 0))
+    info.compress_type = compress_type
+    z.writestr(info, data)
+
+
+def _write_txt(path: pathlib.Path, rng: random.Random, count: int):
+    path.write_text("\n\n".join(_sentences(rng, count)), encoding="utf-8")
+
+
+def _write_delimited(delimiter: str) -> Callable:
+    def write(path: pathlib.Path, rng: random.Random, count: int):
+        lines = [delimiter.join(["id", "name", "amount", "quantity"])]
+        lines += [delimiter.join(row) for row in _rows(rng, count)]
+        path.write_text("\n".join(lines), encoding="utf-8")
+    return write
+
+
+def _write_html(path: pathlib.Path, rng: random.Random, count: int):
+    body = "".join(f"<p>{html.escape(s)}</p>" for s in _sentences(rng, count))
+    path.write_text(
+        f'<!DOCTYPE html><html><head><meta charset="utf-8"><title>bench</title></head><body><h1>Bench</h1>{body}</body></html>',
+        encoding="utf-8"
+    )
+
+
+def _write_xml(path: pathlib.Path, rng: random.Random, count: int):
+    items = "".join(
+        f'<item id="{row[0]}"><name>{row[1]}</name><amount>{row[2]}</amount></item>'
+        for row in _rows(rng, count)
+    )
+    path.write_text(f'<?xml version="1.0" encoding="UTF-8"?><items>{items}</items>', encoding="utf-8")
+
+
+def _write_rtf(path: pathlib.Path, rng: random.Random, count: int):
+    # RTF 中非 ASCII 字符使用 \uN? 转义
+    def escape(text: str) -> str:
+        return "".join(c if ord(c) < 128 else f"\\u{ord(c) if ord(c) < 32768 else ord(c) - 65536}?" for c in text)
+    body = "".join(f"{escape(s)}\\par\n" for s in _sentences(rng, count))
+    path.write_text("{\\rtf1\\ansi\\deff0{\\fonttbl{\\f0 Arial;}}\\f0\\fs22\n" + body + "}", encoding="ascii")
+
+
+def _write_docx(path: pathlib.Path, rng: random.Random, count: int):
+    paragraphs = "".join(
+        f"<w:p><w:r><w:t>{html.escape(s)}</w:t></w:r></w:p>" for s in _sentences(rng, count)
+    )
+    with zipfile.ZipFile(path, "w") as z:
+        _zip_write(
+            z,
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            + _CONTENT_TYPES_RELS +
+            '<Override PartName="/word/document.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>'
+            '</Types>'
+        )
+        _zip_write(
+            z,
+            "_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{_OFFICE_DOCUMENT_REL}" Target="word/document.xml"/>'
+            '</Relationships>'
+        )
+        _zip_write(
+            z,
+            "word/document.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+            f'<w:body>{paragraphs}</w:body></w:document>'
+        )
+
+
+def _write_xlsx(path: pathlib.Path, rng: random.Random, count: int):
+    rows = []
+    for r, row in enumerate(_rows(rng, count), start=1):
+        cells = (
+            f'<c r="A{r}"><v>{row[0]}</v></c>'
+            f'<c r="B{r}" t="inlineStr"><is><t>{html.escape(row[1])}</t></is></c>'
+            f'<c r="C{r}"><v>{row[2]}</v></c>'
+            f'<c r="D{r}"><v>{row[3]}</v></c>'
+        )
+        rows.append(f'<row r="{r}">{cells}</row>')
+    with zipfile.ZipFile(path, "w") as z:
+        _zip_write(
+            z,
+            "[Content_Types].xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            + _CONTENT_TYPES_RELS +
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            '<Override PartName="/xl/worksheets/sheet1.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+            '</Types>'
+        )
+        _zip_write(
+            z,
+            "_rels/.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'<Relationship Id="rId1" Type="{_OFFICE_DOCUMENT_REL}" Target="xl/workbook.xml"/>'
+            '</Relationships>'
+        )
+        _zip_write(
+            z,
+            "xl/workbook.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            '<sheets><sheet name="Sheet1" sheetId="1" r:id="rId1"/></sheets></workbook>'
+        )
+        _zip_write(
+            z,
+            "xl/_rels/workbook.xml.rels",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+            'Target="worksheets/sheet1.xml"/></Relationships>'
+        )
+        _zip_write(
+            z,
+            "xl/worksheets/sheet1.xml",
+            '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+            '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+            f'<sheetData>{"".join(rows)}</sheetData></worksheet>'
+        )
+
+
+def _write_odt(path: pathlib.Path, rng: random.Random, count: int):
+    paragraphs = "".join(f"<text:p>{html.escape(s)}</text:p>" for s in _sentences(rng, count))
+    with zipfile.ZipFile(path, "w") as z:
+        # mimetype 必须是第一个且不压缩
+        _zip_write(z, "mimetype", "application/vnd.oasis.opendocument.text", zipfile.ZIP_STORED)
+        _zip_write(
+            z,
+            "META-INF/manifest.xml",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<manifest:manifest xmlns:manifest="urn:oasis:names:tc:opendocument:xmlns:manifest:1.0" manifest:version="1.2">'
+            '<manifest:file-entry manifest:full-path="/" manifest:media-type="application/vnd.oasis.opendocument.text"/>'
+            '<manifest:file-entry manifest:full-path="content.xml" manifest:media-type="text/xml"/>'
+            '</manifest:manifest>'
+        )
+        _zip_write(
+            z,
+            "content.xml",
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<office:document-content xmlns:office="urn:oasis:names:tc:opendocument:xmlns:office:1.0" '
+            'xmlns:text="urn:oasis:names:tc:opendocument:xmlns:text:1.0" office:version="1.2">'
+            f'<office:body><office:text>{paragraphs}</office:text></office:body></office:document-content>'
+        )
+
+
+# 可以生成的语料格式：扩展名 -> 生成函数
+CORPUS_WRITERS: Dict[str, Callable] = {
+    ".txt": _write_txt,
+    ".csv": _write_delimited(","),
+    ".tsv": _write_delimited("\t"),
+    ".html": _write_html,
+    ".xml": _write_xml,
+    ".rtf": _write_rtf,
+    ".docx": _write_docx,
+    ".xlsx": _write_xlsx,
+    ".odt": _write_odt,
+}
+
+
+def generate_corpus(
+    directory: Union[str, pathlib.Path],
+    extensions: Optional[List[str]] = None,
+    sizes: Optional[List[str]] = None,
+    seed: int = 0
+) -> List[pathlib.Path]:
+    """生成测试语料，相同的参数和随机种子总是生成相同的文件
+
+    Args:
+        directory: 语料保存目录
+        extensions: 要生成的格式（默认全部）
+        sizes: 要生成的大小档位（默认 small/medium/large）
+        seed: 随机种子
+
+    Returns:
+        List[pathlib.Path]: 生成的文件列表
+    """
+    directory = pathlib.Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    files = []
+    for extension in extensions or list(CORPUS_WRITERS):
+        writer = CORPUS_WRITERS[extension]
+        for size in sizes or list(CORPUS_SIZES):
+            path = directory / f"bench_{size}{extension}"
+            # 每个文件单独的随机数生成器，生成结果与格式和档位的组合顺序无关
+            writer(path, random.Random(f"{seed}:{extension}:{size}"), CORPUS_SIZES[size])
+            files.append(path)
+    return files
+
+
+def describe_corpus(files: List[pathlib.Path]) -> Dict[str, dict]:
+    """按扩展名统计语料的文件数和大小"""
+    summary: Dict[str, dict] = {}
+    for path in files:
+        item = summary.setdefault(path.suffix.lower(), {"files": 0, "bytes": 0})
+        item["files"] += 1
+        item["bytes"] += path.stat().st_size
+    return dict(sorted(summary.items()))
+
+
+@dataclass
+class Sample:
+    """一次请求的测量结果"""
+    extension: str
+    latency: float
+    ok: bool
+    error: Optional[str] = None
+
+
+def percentile(values: List[float], p: float) -> float:
+    """最近秩法计算百分位数，p 取 0~100"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(p / 100 * len(ordered)), 1)
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def latency_stats(latencies: List[float]) -> dict:
+    if not latencies:
+        return {"count": 0}
+    return {
+        "count": len(latencies),
+        "mean": round(sum(latencies) / len(latencies), 4),
+        "p50": round(percentile(latencies, 50), 4),
+        "p95": round(percentile(latencies, 95), 4),
+        "p99": round(percentile(latencies, 99), 4),
+        "max": round(max(latencies), 4),
+    }
+
+
+def summarize(samples: List[Sample], elapsed: float) -> dict:
+    """汇总一轮测试的吞吐量和延迟，只统计成功请求的延迟"""
+    success = [s for s in samples if s.ok]
+    errors: Dict[str, int] = {}
+    for s in samples:
+        if not s.ok:
+            errors[s.error or "unknown"] = errors.get(s.error or "unknown", 0) + 1
+    by_extension = {}
+    for extension in sorted({s.extension for s in samples}):
+        group = [s for s in samples if s.extension == extension]
+        by_extension[extension] = {
+            "requests": len(group),
+            "errors": sum(1 for s in group if not s.ok),
+            "latency": latency_stats([s.latency for s in group if s.ok]),
+        }
+    return {
+        "requests": len(samples),
+        "success": len(success),
+        "errors": len(samples) - len(success),
+        "elapsed": round(elapsed, 3),
+        "throughput": round(len(success) / elapsed, 3) if elapsed > 0 else 0.0,
+        "latency": latency_stats([s.latency for s in success]),
+        "by_extension": by_extension,
+        "error_messages": errors,
+    }
+
+
+async def measure(client: ConvertClient, file_path: pathlib.Path, started: Optional[float] = None) -> Sample:
+    """转换一个文件并记录延迟；started 为计划发送时间，开环测试中包含客户端排队的时间"""
+    started = time.monotonic() if started is None else started
+    result = await client.convert_file(file_path)
+    return Sample(
+        extension=file_path.suffix.lower(),
+        latency=time.monotonic() - started,
+        ok=result.status == "success",
+        error=result.error
+    )
+
+
+async def run_concurrency(client: ConvertClient, files: List[pathlib.Path], concurrency: int, requests: int) -> dict:
+    """闭环测试：concurrency 个请求同时进行，一个完成后立即发送下一个，共发送 requests 个"""
+    samples: List[Sample] = []
+    next_index = 0
+
+    async def worker():
+        nonlocal next_index
+        while next_index < requests:
+            file_path = files[next_index % len(files)]
+            next_index += 1
+            samples.append(await measure(client, file_path))
+
+    start = time.monotonic()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(samples, time.monotonic() - start)
+
+
+async def run_rate(
+    client: ConvertClient,
+    files: List[pathlib.Path],
+    rate: float,
+    duration: float,
+    poisson: bool = False,
+    max_in_flight: int = 256,
+    seed: int = 0
+) -> dict:
+    """开环测试：按固定到达速率发送请求，不等待之前的请求完成
+
+    延迟从计划发送时间开始计算，服务端变慢导致的排队会体现在延迟中；
+    同时进行的请求达到 max_in_flight 时放弃本次发送并计入 dropped。
+    """
+    rng = random.Random(seed)
+    samples: List[Sample] = []
+    tasks = set()
+    dropped = 0
+    index = 0
+
+    async def run_one(file_path: pathlib.Path, scheduled: float):
+        samples.append(await measure(client, file_path, scheduled))
+
+    start = time.monotonic()
+    scheduled = start
+    while scheduled - start < duration:
+        delay = scheduled - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if len(tasks) >= max_in_flight:
+            dropped += 1
+        else:
+            task = asyncio.create_task(run_one(files[index % len(files)], scheduled))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+        index += 1
+        scheduled += rng.expovariate(rate) if poisson else 1 / rate
+    if tasks:
+        await asyncio.gather(*tasks)
+    summary = summarize(samples, time.monotonic() - start)
+    summary["offered_rate"] = rate
+    summary["dropped"] = dropped
+    return summary
+
+
+def format_run(run: dict) -> List[str]:
+    """把一轮测试结果格式化为便于阅读的几行文字"""
+    latency = run["latency"]
+    label = f"并发 {run['level']}" if run["mode"] == "concurrency" else f"速率 {run['level']}/秒"
+    lines = [
+        f"{label}: {run['requests']} 请求, 成功 {run['success']}, 失败 {run['errors']}"
+        + (f", 丢弃 {run['dropped']}" if run.get("dropped") else "")
+        + f", 吞吐 {run['throughput']:.2f} 文件/秒"
+        + (f", p50 {latency['p50']:.3f}s p95 {latency['p95']:.3f}s p99 {latency['p99']:.3f}s" if latency["count"] else "")
+    ]
+    for extension, item in run["by_extension"].items():
+        ext_latency = item["latency"]
+        lines.append(
+            f"    {extension:<6} {item['requests']:>5} 请求"
+            + (f", 失败 {item['errors']}" if item["errors"] else "")
+            + (
+                f", p50 {ext_latency['p50']:.3f}s p95 {ext_latency['p95']:.3f}s p99 {ext_latency['p99']:.3f}s"
+                if ext_latency["count"] else ""
+            )
+        )
+    return lines
+
+
+def bench_metadata(client: ConvertClient, corpus: dict, options: dict) -> dict:
+    """测试环境信息，写入 JSON 结果便于比较不同运行"""
+    return {
+        "started_at": datetime.now().isoformat(timespec="seconds"),
+        "endpoints": [endpoint.url for endpoint in client.endpoints],
+        "client": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "compress_uploads": client.compress_uploads and any(
+                "gzip" in (endpoint.request_encodings or []) for endpoint in client.endpoints
+            ),
+        },
+        "corpus": corpus,
+        "options": options,
+    }
@@ -5,14 +5,20 @@ Convert2PDF 命令行工具
 使用方法:
     python convert_cli.py --host 192.168.1.100 --port 7758 --input ./documents
     python convert_cli.py -h 192.168.1.100 -p 7758 -i ./documents -o ./output -w 10
+    python convert_cli.py bench -H 192.168.1.100 --concurrency 1,4,8 --json-out bench.json
 """
 
 import argparse
 import asyncio
+import logging
+import random
+import signal
 import sys
+import tempfile
 from pathlib import Path
 import json
 from convert_client import ConvertClient, convert_directory_simple
+import convert_bench
 
 
 def create_parser():
@@ -28,15 +34,26 @@ def create_parser():
   高级使用：
     python convert_cli.py -h 192.168.1.100 -p 7758 -i ./documents -o ./output -w 10 -r
     
+  监听目录（新文件写入完成后立即转换，代替定时任务反复扫描）：
+    python convert_cli.py -H 192.168.1.100 -i ./inbox -o ./output -r --watch
+    
+  断点续传（中断后重新运行，只处理未完成的文件）：
+    python convert_cli.py -H 192.168.1.100 -i ./documents -o ./output -r --resume
+    
+  多服务端分流：
+    python convert_cli.py -e 10.0.0.1:7758 -e 10.0.0.2:7758 -i ./documents -r
+    
   测试连接：
     python convert_cli.py --host 192.168.1.100 --port 7758 --test
+    
+  基准测试（详见 python convert_cli.py bench --help）：
+    python convert_cli.py bench -H 192.168.1.100 --concurrency 1,4,8 --json-out bench.json
         """
     )
     
-    # 必需参数
+    # 服务端地址
     parser.add_argument(
         "--host", "-H",
-        required=True,
         help="服务端IP地址 (例如: 192.168.1.100)"
     )
     
@@ -47,6 +64,13 @@ def create_parser():
         help="服务端端口 (默认: 7758)"
     )
     
+    parser.add_argument(
+        "--endpoint", "-e",
+        action="append",
+        dest="endpoints",
+        help="服务端地址 host:port，可多次指定；指定多个时按文件内容分配到各服务端并自动故障转移"
+    )
+    
     # 输入输出
     parser.add_argument(
         "--input", "-i",
@@ -66,16 +90,78 @@ def create_parser():
         help="并发转换数 (默认: 5)"
     )
     
+    parser.add_argument(
+        "--adaptive",
+        action="store_true",
+        help="根据服务端延迟和 429/503 自动调整并发数，--workers 作为并发上限"
+    )
+    
     parser.add_argument(
         "--recursive", "-r",
         action="store_true",
         help="递归搜索子目录"
     )
     
+    parser.add_argument(
+        "--download", "-d",
+        action="store_true",
+        help="转换完成后将PDF下载到输出目录 (按输入目录结构存放)"
+    )
+    
+    parser.add_argument(
+        "--download-workers",
+        type=int,
+        default=5,
+        help="PDF下载并发数 (默认: 5)"
+    )
+    
     parser.add_argument(
         "--no-save-results",
         action="store_true", 
-        help="不保存结果到JSON文件"
+        help="不保存结果清单 (JSONL)"
+    )
+    
+    # 断点续传
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="断点续传：跳过清单中已成功且未修改的文件，只重试失败和新增的文件"
+    )
+    
+    parser.add_argument(
+        "--manifest",
+        help="结果清单文件路径 (默认: 输出目录/convert_manifest.jsonl)"
+    )
+    
+    parser.add_argument(
+        "--verify-hash",
+        action="store_true",
+        help="断点续传时额外校验文件内容哈希"
+    )
+    
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="持续监听输入目录，新增或修改的文件写入完成后立即转换 (Ctrl+C 退出)"
+    )
+    
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=2.0,
+        help="监听模式下文件最后一次写入后等待多少秒再转换 (默认: 2)"
+    )
+    
+    parser.add_argument(
+        "--dedup",
+        action="store_true",
+        help="检测内容重复的文件，相同内容只上传转换一次"
+    )
+    
+    parser.add_argument(
+        "--no-size-prefilter",
+        action="store_true",
+        help="去重时对所有文件计算哈希，不先按文件大小预筛选"
     )
     
     # 连接选项
@@ -93,6 +179,73 @@ def create_parser():
         help="最大重试次数 (默认: 3)"
     )
     
+    parser.add_argument(
+        "--hedge",
+        type=float,
+        metavar="PERCENTILE",
+        help="开启对冲请求：耗时超过历史延迟该分位数 (例如 0.95) 时向其他服务端/副本重复发送，先返回者生效"
+    )
+    
+    parser.add_argument(
+        "--hedge-budget",
+        type=float,
+        default=0.1,
+        help="对冲请求占总请求数的最大比例 (默认: 0.1)"
+    )
+    
+    parser.add_argument(
+        "--breaker-threshold",
+        type=float,
+        default=0.5,
+        help="服务端错误比例超过该值时熔断，暂停提交新请求，0 表示不启用 (默认: 0.5)"
+    )
+    
+    parser.add_argument(
+        "--breaker-cooldown",
+        type=float,
+        default=30.0,
+        help="熔断后暂停提交的时间/秒 (默认: 30)"
+    )
+    
+    parser.add_argument(
+        "--no-compress",
+        action="store_true",
+        help="不压缩上传文本类文件 (txt/csv/tsv/xml/html)"
+    )
+    
+    parser.add_argument(
+        "--formats",
+        help="除 PDF 外额外导出的格式，逗号分隔 (例如: docx,html)，下载时保存在 PDF 旁边"
+    )
+    
+    parser.add_argument(
+        "--thumbnail",
+        action="store_true",
+        help="同时导出首页缩略图 (PNG)，下载时保存在 PDF 旁边"
+    )
+    
+    parser.add_argument(
+        "--pdf-profile",
+        choices=["default", "web", "compact", "print", "archive"],
+        help="PDF 导出配置，不指定时使用服务端默认配置 (web/compact 降低图片分辨率并线性化)"
+    )
+    
+    # 部分转换，三者只能指定一个
+    page_group = parser.add_mutually_exclusive_group()
+    page_group.add_argument(
+        "--page-range",
+        help="只导出指定页面 (例如: 1-5,8,10-)"
+    )
+    page_group.add_argument(
+        "--preview-pages",
+        type=int,
+        help="预览模式，只导出前 N 页"
+    )
+    page_group.add_argument(
+        "--sheets",
+        help="只导出表格中指定的工作表，从 1 开始的序号 (例如: 1,3-4)"
+    )
+    
     # 功能选项
     parser.add_argument(
         "--test",
@@ -121,31 +274,224 @@ def create_parser():
     return parser
 
 
-async def test_connection(host: str, port: int) -> bool:
+def create_bench_parser():
+    """创建基准测试子命令的参数解析器"""
+    parser = argparse.ArgumentParser(
+        prog="convert_cli.py bench",
+        description="Convert2PDF 基准测试 - 测量服务端的吞吐量和延迟",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+        epilog="""
+使用示例:
+  固定并发数（闭环），每个并发档位发送 200 个请求：
+    python convert_cli.py bench -H 192.168.1.100 --concurrency 1,4,8 --requests 200 --json-out before.json
+    
+  固定到达速率（开环），每个速率档位持续 60 秒：
+    python convert_cli.py bench -H 192.168.1.100 --rate 2,5,10 --duration 60 --poisson
+    
+  使用自己的样本文件：
+    python convert_cli.py bench -H 192.168.1.100 --corpus ./samples --concurrency 8
+        """
+    )
+    
+    parser.add_argument("--host", "-H", help="服务端IP地址")
+    parser.add_argument("--port", "-p", type=int, default=7758, help="服务端端口 (默认: 7758)")
+    parser.add_argument(
+        "--endpoint", "-e",
+        action="append",
+        dest="endpoints",
+        help="服务端地址 host:port，可多次指定"
+    )
+    
+    # 语料
+    parser.add_argument(
+        "--corpus",
+        help="样本文件目录；不指定时自动生成覆盖主要格式的语料"
+    )
+    parser.add_argument(
+        "--formats",
+        help=f"自动生成语料的格式，逗号分隔 (默认: {','.join(convert_bench.CORPUS_WRITERS)})"
+    )
+    parser.add_argument(
+        "--sizes",
+        default=",".join(convert_bench.CORPUS_SIZES),
+        help=f"自动生成语料的大小档位，逗号分隔 (默认: {','.join(convert_bench.CORPUS_SIZES)})"
+    )
+    parser.add_argument("--seed", type=int, default=0, help="随机种子，相同种子生成相同的语料和请求顺序 (默认: 0)")
+    
+    # 负载模式
+    parser.add_argument(
+        "--concurrency",
+        help="固定并发数测试的各档位，逗号分隔 (例如: 1,4,8)；未指定 --rate 时默认 1,4,8"
+    )
+    parser.add_argument(
+        "--requests",
+        type=int,
+        default=100,
+        help="固定并发数测试中每个档位发送的请求数 (默认: 100)"
+    )
+    parser.add_argument(
+        "--rate",
+        help="固定到达速率测试的各档位 (请求/秒)，逗号分隔 (例如: 2,5,10)"
+    )
+    parser.add_argument(
+        "--duration",
+        type=float,
+        default=30.0,
+        help="固定到达速率测试中每个档位的持续时间/秒 (默认: 30)"
+    )
+    parser.add_argument(
+        "--poisson",
+        action="store_true",
+        help="到达间隔服从指数分布（泊松到达），默认为均匀间隔"
+    )
+    parser.add_argument(
+        "--max-in-flight",
+        type=int,
+        default=256,
+        help="固定到达速率测试中同时进行的最大请求数，超过时丢弃 (默认: 256)"
+    )
+    parser.add_argument(
+        "--warmup",
+        type=int,
+        default=5,
+        help="正式测试前的预热请求数，不计入结果 (默认: 5)"
+    )
+    
+    # 连接和输出
+    parser.add_argument("--timeout", type=int, default=300, help="请求超时时间/秒 (默认: 300)")
+    parser.add_argument("--no-compress", action="store_true", help="不压缩上传文本类文件")
+    parser.add_argument("--json-out", help="把结果写入 JSON 文件")
+    
+    return parser
+
+
+async def run_bench(argv: list):
+    """执行基准测试子命令"""
+    parser = create_bench_parser()
+    args = parser.parse_args(argv)
+    
+    if not args.host and not args.endpoints:
+        print("❌ 错误: 必须指定服务端地址 (--host 或 --endpoint)")
+        parser.print_help()
+        sys.exit(1)
+    
+    concurrency_levels = [int(v) for v in args.concurrency.split(",")] if args.concurrency else []
+    rate_levels = [float(v) for v in args.rate.split(",")] if args.rate else []
+    if not concurrency_levels and not rate_levels:
+        concurrency_levels = [1, 4, 8]
+    
+    # 基准测试只测量单次请求，不重试、不熔断，避免掩盖服务端的真实表现
+    max_in_flight = max(concurrency_levels + [args.max_in_flight if rate_levels else 1])
+    client = ConvertClient(
+        host=args.host,
+        port=args.port,
+        timeout=args.timeout,
+        max_retries=0,
+        max_connections=max_in_flight,
+        endpoints=args.endpoints,
+        breaker_threshold=0,
+        compress_uploads=not args.no_compress
+    )
+    # 每个请求的日志会干扰测量结果的输出
+    logging.getLogger("convert_client").setLevel(logging.ERROR)
+    
+    temp_dir = None
+    try:
+        if not await client.connect():
+            print(f"❌ 无法连接到服务端 {', '.join(e.url for e in client.endpoints)}")
+            sys.exit(1)
+        
+        # 准备语料
+        if args.corpus:
+            files = sorted(client.iter_files(args.corpus))
+            corpus_source = str(Path(args.corpus).resolve())
+        else:
+            temp_dir = tempfile.TemporaryDirectory(prefix="convert_bench_")
+            extensions = args.formats.split(",") if args.formats else None
+            files = [
+                f for f in convert_bench.generate_corpus(
+                    temp_dir.name, extensions, args.sizes.split(","), args.seed
+                )
+                if client.is_supported_file(f)
+            ]
+            corpus_source = "generated"
+        if not files:
+            print("❌ 错误: 没有可用的样本文件")
+            sys.exit(1)
+        # 按随机种子打乱请求顺序，各档位使用相同的顺序
+        random.Random(args.seed).shuffle(files)
+        corpus = {"source": corpus_source, "seed": args.seed, "by_extension": convert_bench.describe_corpus(files)}
+        
+        report = convert_bench.bench_metadata(client, corpus, {
+            "concurrency": concurrency_levels,
+            "requests": args.requests,
+            "rate": rate_levels,
+            "duration": args.duration,
+            "poisson": args.poisson,
+            "warmup": args.warmup,
+        })
+        report["runs"] = []
+        
+        print(f"🏁 基准测试: {', '.join(report['endpoints'])}")
+        print(f"   语料: {len(files)} 个文件, 格式: {', '.join(corpus['by_extension'])}")
+        print("=" * 50)
+        
+        if args.warmup:
+            await convert_bench.run_concurrency(client, files, min(args.warmup, 4), args.warmup)
+        
+        for level in concurrency_levels:
+            run = {"mode": "concurrency", "level": level}
+            run.update(await convert_bench.run_concurrency(client, files, level, args.requests))
+            report["runs"].append(run)
+            print("\n".join(convert_bench.format_run(run)))
+        
+        for level in rate_levels:
+            run = {"mode": "rate", "level": level}
+            run.update(await convert_bench.run_rate(
+                client, files, level, args.duration,
+                poisson=args.poisson, max_in_flight=args.max_in_flight, seed=args.seed
+            ))
+            report["runs"].append(run)
+            print("\n".join(convert_bench.format_run(run)))
+        
+        if args.json_out:
+            Path(args.json_out).parent.mkdir(parents=True, exist_ok=True)
+            with open(args.json_out, "w", encoding="utf-8") as f:
+                json.dump(report, f, ensure_ascii=False, indent=2)
+            print(f"\n💾 结果已保存到: {args.json_out}")
+    finally:
+        await client.close()
+        if temp_dir is not None:
+            temp_dir.cleanup()
+
+
+async def test_connection(host: str, port: int, endpoints: list = None) -> bool:
     """测试与服务端的连接"""
+    client = ConvertClient(host, port, endpoints=endpoints)
     try:
-        client = ConvertClient(host, port)
         success = await client.connect()
         
         if success:
-            print(f"✅ 成功连接到服务端 {host}:{port}")
+            print(f"✅ 成功连接到服务端 {', '.join(e.url for e in client.endpoints if e.healthy)}")
             print(f"📋 服务端支持 {len(client.supported_types)} 种文件格式")
             return True
         else:
-            print(f"❌ 无法连接到服务端 {host}:{port}")
+            print(f"❌ 无法连接到服务端 {', '.join(e.url for e in client.endpoints)}")
             return False
             
     except Exception as e:
         print(f"❌ 连接测试失败: {e}")
         return False
+    finally:
+        await client.close()
 
 
-async def list_supported_types(host: str, port: int):
+async def list_supported_types(host: str, port: int, endpoints: list = None):
     """列出服务端支持的文件类型"""
+    client = ConvertClient(host, port, endpoints=endpoints)
     try:
-        client = ConvertClient(host, port)
         if await client.connect():
-            print(f"📋 服务端 {host}:{port} 支持的文件类型:")
+            print(f"📋 服务端 {client.base_url} 支持的文件类型:")
             print("=" * 50)
             
             # 按类别分组显示（简单分类）
@@ -173,21 +519,34 @@ async def list_supported_types(host: str, port: int):
             
     except Exception as e:
         print(f"❌ 获取支持类型失败: {e}")
+    finally:
+        await client.close()
 
 
 async def main():
     """主函数"""
+    # 基准测试子命令使用单独的参数
+    if len(sys.argv) > 1 and sys.argv[1] == "bench":
+        await run_bench(sys.argv[2:])
+        return
+    
     parser = create_parser()
     args = parser.parse_args()
     
+    # 检查服务端地址
+    if not args.host and not args.endpoints:
+        print("❌ 错误: 必须指定服务端地址 (--host 或 --endpoint)")
+        parser.print_help()
+        sys.exit(1)
+    
     # 测试连接模式
     if args.test:
-        success = await test_connection(args.host, args.port)
+        success = await test_connection(args.host, args.port, args.endpoints)
         sys.exit(0 if success else 1)
     
     # 列出支持类型模式  
     if args.list_types:
-        await list_supported_types(args.host, args.port)
+        await list_supported_types(args.host, args.port, args.endpoints)
         sys.exit(0)
     
     # 检查必需参数
@@ -209,30 +568,75 @@ async def main():
         import logging
         logging.getLogger().setLevel(logging.WARNING)
     
+    # 创建客户端
+    client = ConvertClient(
+        host=args.host,
+        port=args.port, 
+        timeout=args.timeout,
+        max_retries=args.retries,
+        endpoints=args.endpoints,
+        hedge_percentile=args.hedge,
+        hedge_budget=args.hedge_budget,
+        breaker_threshold=args.breaker_threshold,
+        breaker_cooldown=args.breaker_cooldown,
+        compress_uploads=not args.no_compress,
+        output_formats=args.formats.split(",") if args.formats else None,
+        thumbnail=args.thumbnail,
+        pdf_profile=args.pdf_profile,
+        page_range=args.page_range,
+        preview_pages=args.preview_pages,
+        sheets=args.sheets
+    )
+    
     try:
-        # 创建客户端
-        client = ConvertClient(
-            host=args.host,
-            port=args.port, 
-            timeout=args.timeout,
-            max_retries=args.retries
-        )
-        
         print(f"🚀 开始批量转换")
-        print(f"   服务端: {args.host}:{args.port}")
+        print(f"   服务端: {', '.join(args.endpoints) if args.endpoints else f'{args.host}:{args.port}'}")
         print(f"   输入: {input_path}")
         print(f"   输出: {output_path}")
-        print(f"   并发数: {args.workers}")
+        print(f"   并发数: {'自适应, 上限 ' if args.adaptive else ''}{args.workers}")
         print(f"   递归搜索: {'是' if args.recursive else '否'}")
+        print(f"   下载PDF: {'是' if args.download else '否'}")
+        print(f"   断点续传: {'是' if args.resume else '否'}")
+        print(f"   重复检测: {'是' if args.dedup else '否'}")
         print("=" * 50)
         
+        # 监听模式：持续运行，直到 Ctrl+C
+        if args.watch:
+            # 作为服务运行时收到 SIGTERM 也正常退出，写完清单并关闭连接
+            if sys.platform != "win32":
+                asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, asyncio.current_task().cancel)
+            try:
+                await client.watch_directory(
+                    directory=input_path,
+                    output_dir=output_path,
+                    max_workers=args.workers,
+                    recursive=args.recursive,
+                    download=args.download,
+                    download_workers=args.download_workers,
+                    manifest_path=args.manifest,
+                    verify_hash=args.verify_hash,
+                    adaptive=args.adaptive,
+                    debounce=args.debounce
+                )
+            except asyncio.CancelledError:
+                print("\n👋 已停止监听")
+            return
+        
         # 执行转换
         results = await client.convert_directory(
             directory=input_path,
             output_dir=output_path,
             max_workers=args.workers,
             recursive=args.recursive,
-            save_results=not args.no_save_results
+            save_results=not args.no_save_results,
+            download=args.download,
+            download_workers=args.download_workers,
+            resume=args.resume,
+            manifest_path=args.manifest,
+            verify_hash=args.verify_hash,
+            adaptive=args.adaptive,
+            dedup=args.dedup,
+            dedup_size_prefilter=not args.no_size_prefilter
         )
         
         # 简要结果
@@ -264,6 +668,8 @@ async def main():
     except Exception as e:
         print(f"❌ 执行失败: {e}")
         sys.exit(1)
+    finally:
+        await client.close()
 
 
 if __name__ == "__main__":
@@ -14,22 +14,113 @@ Convert2PDF Client - 简单易用的PDF转换客户端
         max_workers=10,
         recursive=True
     )
+    
+    # 流式用法（适合百万级文件，结果按完成顺序产出）
+    async for result in client.iter_convert_directory("/path/to/documents", max_workers=10):
+        print(result.original_file, result.status)
 """
 
 import asyncio
+import bisect
+import collections
+import hashlib
 import os
 import pathlib
-from typing import Dict, List, Optional, Union
+import random
+import shutil
+import uuid
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple, Union
 import aiohttp
 import aiofiles
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass
 from datetime import datetime
 import logging
 from tqdm.asyncio import tqdm
+from convert_watch import DirectoryWatcher
 import time
 import json
 
 
+# 上传文件时每次从磁盘读取的块大小
+UPLOAD_CHUNK_SIZE = 256 * 1024
+# 下载PDF时每次写入磁盘的块大小
+DOWNLOAD_CHUNK_SIZE = 256 * 1024
+# 计算文件哈希时每次读取的块大小
+HASH_CHUNK_SIZE = 1024 * 1024
+# 默认的断点续传清单文件名，保存在输出目录下
+MANIFEST_FILE_NAME = "convert_manifest.jsonl"
+# 上传前使用 gzip 压缩的文本类文件，通常能压缩 5~20 倍
+COMPRESSIBLE_SUFFIXES = {".txt", ".csv", ".tsv", ".xml", ".html", ".htm"}
+# 小于该大小的文件压缩收益不明显，直接上传
+COMPRESS_MIN_SIZE = 4 * 1024
+# 传递请求截止时间的请求头，值为客户端还愿意等待的秒数
+DEADLINE_HEADER = "X-Request-Timeout"
+# 同一文件的各次重试携带相同的幂等键，服务端据此复用仍在进行或已完成的转换
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# 重试退避的最长等待时间(秒)
+MAX_RETRY_DELAY = 60.0
+# 可以重试的HTTP状态码，其余 4xx 视为永久错误
+RETRYABLE_STATUS = {408, 425, 429, 500, 502, 503, 504}
+# 服务端返回的确定性错误，重试也不会成功
+PERMANENT_ERRORS = (
+    "file is already pdf",
+    "file type not supported",
+    "Uploaded file must have a filename",
+    "Either file_url or file upload is required",
+    "file is empty",
+    "file content does not match extension",
+    "file is damaged or truncated",
+    "file previously failed to convert",
+    "output format not supported",
+)
+
+
+class ConvertError(Exception):
+    """服务端返回的转换错误"""
+    
+    def __init__(self, message: str, status: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status = status
+        self.retry_after = retry_after
+
+
+def is_retryable(error: Exception) -> bool:
+    """判断一次转换失败是否值得重试
+    
+    连接失败、超时、服务端内部错误和过载可以重试；
+    请求本身有问题（文件类型不支持、已经是PDF等 4xx 错误）或本地文件不可读时重试也不会成功。
+    """
+    if isinstance(error, ConvertError):
+        if any(str(error).startswith(message) for message in PERMANENT_ERRORS):
+            return False
+        if error.status is None:
+            return True
+        return error.status in RETRYABLE_STATUS or error.status >= 500
+    if isinstance(error, (FileNotFoundError, PermissionError, IsADirectoryError)):
+        return False
+    return True
+
+
+def is_overload(error: Exception) -> bool:
+    """服务端因并发已满拒绝请求（429/503），由并发限制器和 Retry-After 处理"""
+    return isinstance(error, ConvertError) and error.status in (429, 503)
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """解析 Retry-After 响应头，支持秒数和 HTTP 日期两种格式"""
+    if not value:
+        return None
+    try:
+        return max(float(value), 0.0)
+    except ValueError:
+        pass
+    try:
+        from email.utils import parsedate_to_datetime
+        return max(parsedate_to_datetime(value).timestamp() - time.time(), 0.0)
+    except (TypeError, ValueError):
+        return None
+
+
 @dataclass
 class ConvertResult:
     """转换结果数据类"""
@@ -38,6 +129,453 @@ class ConvertResult:
     converted_url: Optional[str] = None
     error: Optional[str] = None
     elapsed_time: float = 0.0
+    local_file: Optional[str] = None
+    skipped: bool = False
+    endpoint: Optional[str] = None
+    duplicate_of: Optional[str] = None
+    # 请求了多个输出格式时，各格式的下载地址
+    outputs: Optional[Dict[str, str]] = None
+    # 服务端返回的页数、各格式文件大小和缩略图尺寸
+    metadata: Optional[Dict] = None
+    thumbnail_url: Optional[str] = None
+
+
+def hash_file(file_path: Union[str, pathlib.Path]) -> str:
+    """计算文件内容的 SHA-256"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as f:
+        while chunk := f.read(HASH_CHUNK_SIZE):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class DuplicateDetector:
+    """按内容识别重复文件，相同内容只上传转换一次
+    
+    开启大小预筛选时，只有出现过相同大小的文件才计算哈希；
+    某个大小第一次出现时先不计算，等第二个相同大小的文件出现时再补算第一个文件的哈希。
+    """
+    
+    def __init__(self, size_prefilter: bool = True):
+        """初始化去重器
+        
+        Args:
+            size_prefilter: 是否先按文件大小预筛选，大小唯一的文件不计算哈希
+        """
+        self.size_prefilter = size_prefilter
+        # 大小只出现过一次的文件：大小 -> (文件路径, 转换结果)
+        self._first_by_size: Dict[int, Tuple[pathlib.Path, asyncio.Future]] = {}
+        self._seen_sizes: set = set()
+        # 内容哈希 -> (首个文件路径, 转换结果)
+        self._by_hash: Dict[str, Tuple[pathlib.Path, asyncio.Future]] = {}
+        self.duplicates = 0
+        self.skipped_bytes = 0
+    
+    async def claim(
+        self,
+        file_path: pathlib.Path,
+        size: int,
+        file_hash: Optional[str] = None
+    ) -> Tuple[asyncio.Future, Optional[pathlib.Path], Optional[str]]:
+        """登记一个文件
+        
+        Returns:
+            (转换结果, 内容相同的首个文件, 内容哈希)。首个文件为 None 时由调用方负责转换并设置结果，
+            否则等待首个文件的结果即可
+        """
+        loop = asyncio.get_running_loop()
+        if self.size_prefilter and file_hash is None:
+            if size not in self._seen_sizes:
+                self._seen_sizes.add(size)
+                future = loop.create_future()
+                self._first_by_size[size] = (file_path, future)
+                return future, None, None
+            first = self._first_by_size.pop(size, None)
+            if first is not None:
+                # 出现第二个相同大小的文件，补算第一个文件的哈希
+                first_hash = await asyncio.to_thread(hash_file, first[0])
+                self._by_hash.setdefault(first_hash, first)
+        
+        if file_hash is None:
+            file_hash = await asyncio.to_thread(hash_file, file_path)
+        existing = self._by_hash.get(file_hash)
+        if existing is not None:
+            self.duplicates += 1
+            self.skipped_bytes += size
+            return existing[1], existing[0], file_hash
+        future = loop.create_future()
+        self._by_hash[file_hash] = (file_path, future)
+        return future, None, file_hash
+
+
+class ConvertManifest:
+    """断点续传清单
+    
+    以 JSONL 格式追加记录每个文件的转换结果，以文件路径、大小、修改时间（可选内容哈希）作为判断依据。
+    中断后重新运行时，已成功且未修改的文件直接跳过，只重新转换失败和新增/修改过的文件。
+    """
+    
+    def __init__(self, path: Union[str, pathlib.Path], use_hash: bool = False):
+        """初始化清单
+        
+        Args:
+            path: 清单文件路径
+            use_hash: 是否额外使用内容哈希判断文件是否变化（更可靠，但需要读取整个文件）
+        """
+        self.path = pathlib.Path(path)
+        self.use_hash = use_hash
+        # 文件路径 -> 最近一次成功的记录
+        self.completed: Dict[str, dict] = {}
+        self._file = None
+        self._lock = asyncio.Lock()
+    
+    def load(self) -> int:
+        """读取已有清单，返回已完成的文件数"""
+        self.completed.clear()
+        if not self.path.exists():
+            return 0
+        with open(self.path, 'r', encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError:
+                    # 进程被中断时最后一行可能不完整
+                    continue
+                # 旧版本把下载失败的文件记为 success 并附带 error，这类记录按未完成处理
+                if record.get("status") == "success" and not record.get("error"):
+                    self.completed[record["path"]] = record
+                else:
+                    self.completed.pop(record.get("path"), None)
+        return len(self.completed)
+    
+    def get_completed(self, file_path: pathlib.Path, stat: os.stat_result, file_hash: Optional[str] = None) -> Optional[dict]:
+        """如果文件已成功转换且之后没有修改，返回对应的记录"""
+        record = self.completed.get(str(file_path))
+        if not record:
+            return None
+        if record.get("size") != stat.st_size or record.get("mtime_ns") != stat.st_mtime_ns:
+            return None
+        # 记录中没有哈希（上次运行未开启校验）时只比较大小和修改时间
+        if self.use_hash and record.get("sha256") and record.get("sha256") != file_hash:
+            return None
+        return record
+    
+    async def open(self):
+        """以追加模式打开清单文件"""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._file = await aiofiles.open(self.path, 'a', encoding='utf-8')
+    
+    async def record(
+        self,
+        result: ConvertResult,
+        stat: Optional[os.stat_result] = None,
+        file_hash: Optional[str] = None
+    ):
+        """追加一条转换记录并立即写入磁盘"""
+        record = {
+            "path": result.original_file,
+            "size": stat.st_size if stat else None,
+            "mtime_ns": stat.st_mtime_ns if stat else None,
+            "sha256": file_hash,
+            **{k: v for k, v in asdict(result).items() if k not in ("original_file", "skipped")},
+            "recorded_at": datetime.now().isoformat(timespec="seconds")
+        }
+        async with self._lock:
+            await self._file.write(json.dumps(record, ensure_ascii=False) + "\n")
+            await self._file.flush()
+        # 同步更新内存中的记录，长时间运行（监听模式）时同一文件再次出现也能正确判断
+        if result.status == "success" and not result.error and stat is not None:
+            self.completed[result.original_file] = record
+        else:
+            self.completed.pop(result.original_file, None)
+    
+    async def close(self):
+        """关闭清单文件"""
+        if self._file is not None:
+            await self._file.close()
+            self._file = None
+
+
+class CircuitBreaker:
+    """熔断器
+    
+    最近的请求中失败比例超过阈值时断开，冷却期内暂停提交新请求；
+    冷却结束后放行一个探测请求，成功则恢复，失败则重新断开。
+    只统计连接失败、超时和服务端内部错误，永久错误和过载拒绝不计入。
+    """
+    
+    def __init__(
+        self,
+        failure_threshold: float = 0.5,
+        min_requests: int = 20,
+        window: int = 50,
+        cooldown: float = 30.0
+    ):
+        """初始化熔断器
+        
+        Args:
+            failure_threshold: 触发熔断的失败比例 (0~1)
+            min_requests: 窗口内至少有多少个请求后才判断失败比例
+            window: 统计失败比例的最近请求数
+            cooldown: 断开后暂停提交的时间(秒)
+        """
+        self.failure_threshold = failure_threshold
+        self.min_requests = min_requests
+        self.cooldown = cooldown
+        self.outcomes = collections.deque(maxlen=window)
+        self.state = "closed"
+        self.open_until = 0.0
+        # 半开状态下发送探测请求的任务
+        self.probe_task: Optional[asyncio.Task] = None
+        self.trips = 0
+        self.logger = logging.getLogger(__name__)
+    
+    async def acquire(self) -> bool:
+        """熔断器断开时等待，直到恢复或轮到本请求作为探测请求
+        
+        Returns:
+            等待期间探测失败、熔断器再次断开时返回 False，本次尝试作废
+        """
+        trips = self.trips
+        while self.state != "closed":
+            if self.trips != trips:
+                return False
+            now = time.monotonic()
+            if self.state == "open" and now < self.open_until:
+                await asyncio.sleep(self.open_until - now)
+                continue
+            if self.probe_task is None:
+                self.state = "half_open"
+                self.probe_task = asyncio.current_task()
+                return True
+            # 探测请求进行中，稍后再看结果
+            await asyncio.sleep(min(1.0, self.cooldown))
+        return True
+    
+    def record(self, failed: Optional[bool]):
+        """记录一次请求结果，None 表示请求被取消或不计入统计"""
+        is_probe = self.probe_task is not None and self.probe_task is asyncio.current_task()
+        if is_probe:
+            self.probe_task = None
+        if failed is None:
+            return
+        if is_probe:
+            if failed:
+                self._trip()
+            else:
+                self.state = "closed"
+                self.outcomes.clear()
+                self.logger.info("🔌 熔断器恢复，继续提交请求")
+            return
+        if self.state != "closed":
+            # 断开前已发出的请求结果不影响探测
+            return
+        self.outcomes.append(failed)
+        if (
+            len(self.outcomes) >= self.min_requests
+            and sum(self.outcomes) / len(self.outcomes) >= self.failure_threshold
+        ):
+            self._trip()
+    
+    def _trip(self):
+        self.state = "open"
+        self.open_until = time.monotonic() + self.cooldown
+        self.trips += 1
+        self.logger.warning(f"🔌 服务端错误率过高，熔断器断开，暂停提交 {self.cooldown:.0f}秒")
+
+
+class AdaptiveLimiter:
+    """AIMD 自适应并发限制器
+    
+    请求延迟稳定时每完成一轮请求把并发数加一（加性增加）；
+    延迟明显上升、请求出错或服务端返回 429/503 时把并发数乘以一个系数（乘性减少），
+    并遵守服务端返回的 Retry-After 暂停提交新请求。
+    """
+    
+    def __init__(
+        self,
+        initial_limit: int = 2,
+        min_limit: int = 1,
+        max_limit: int = 20,
+        decrease_factor: float = 0.7,
+        latency_tolerance: float = 2.0
+    ):
+        """初始化限制器
+        
+        Args:
+            initial_limit: 初始并发数
+            min_limit: 最小并发数
+            max_limit: 最大并发数
+            decrease_factor: 过载时并发数的缩减系数
+            latency_tolerance: 平滑延迟超过基线延迟的多少倍视为过载
+        """
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.limit = float(min(max(initial_limit, min_limit), max_limit))
+        self.decrease_factor = decrease_factor
+        self.latency_tolerance = latency_tolerance
+        self.in_flight = 0
+        self.latency_ewma: Optional[float] = None
+        self.baseline_latency: Optional[float] = None
+        self.peak_limit = self.current_limit
+        self._pause_until = 0.0
+        self._last_decrease = 0.0
+        self._condition = asyncio.Condition()
+    
+    @property
+    def current_limit(self) -> int:
+        """当前允许的并发数"""
+        return max(self.min_limit, int(self.limit))
+    
+    async def acquire(self):
+        """获取一个并发名额，服务端要求暂停时先等待"""
+        while (delay := self._pause_until - time.monotonic()) > 0:
+            await asyncio.sleep(delay)
+        async with self._condition:
+            await self._condition.wait_for(lambda: self.in_flight < self.current_limit)
+            self.in_flight += 1
+    
+    async def release(self):
+        """归还并发名额"""
+        async with self._condition:
+            self.in_flight -= 1
+            self._condition.notify_all()
+    
+    def on_success(self, latency: float):
+        """请求成功，根据延迟决定增加还是减少并发数"""
+        self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        # 基线取观察到的最低平滑延迟，并缓慢上调以适应负载的自然变化
+        if self.baseline_latency is None or self.latency_ewma < self.baseline_latency:
+            self.baseline_latency = self.latency_ewma
+        else:
+            self.baseline_latency *= 1.001
+        
+        if self.latency_ewma > self.baseline_latency * self.latency_tolerance:
+            self._decrease()
+        else:
+            # 每个成功的请求增加 1/limit，即每完成一轮并发请求增加 1
+            self.limit = min(self.limit + 1 / self.limit, float(self.max_limit))
+            self.peak_limit = max(self.peak_limit, self.current_limit)
+    
+    def on_error(self):
+        """请求出错（超时、连接失败、5xx）"""
+        self._decrease()
+    
+    def on_overload(self, retry_after: Optional[float] = None):
+        """服务端返回 429/503，缩减并发数并按 Retry-After 暂停提交"""
+        self._decrease()
+        if retry_after:
+            self._pause_until = max(self._pause_until, time.monotonic() + retry_after)
+    
+    def _decrease(self):
+        # 同一批并发请求同时失败时只缩减一次，避免并发数瞬间降到最低
+        now = time.monotonic()
+        if now - self._last_decrease < (self.latency_ewma or 1.0):
+            return
+        self._last_decrease = now
+        self.limit = max(self.limit * self.decrease_factor, float(self.min_limit))
+
+
+class HedgingPolicy:
+    """对冲请求策略
+    
+    请求耗时超过历史延迟的指定分位数仍未返回时，向另一个服务端（或同一服务后的其他副本）再发一份相同的请求，
+    先返回的结果生效，另一个被取消。对冲请求数不超过主请求数的 budget 比例，避免放大服务端负载。
+    """
+    
+    def __init__(
+        self,
+        percentile: float = 0.95,
+        budget: float = 0.1,
+        min_samples: int = 20,
+        window: int = 1000
+    ):
+        """初始化对冲策略
+        
+        Args:
+            percentile: 触发对冲的延迟分位数 (0~1)
+            budget: 对冲请求数占主请求数的最大比例
+            min_samples: 至少观察到多少个请求延迟后才开始对冲
+            window: 用于计算分位数的最近延迟样本数
+        """
+        self.percentile = percentile
+        self.budget = budget
+        self.min_samples = min_samples
+        self.latencies = collections.deque(maxlen=window)
+        self.requests = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+    
+    def observe(self, latency: float):
+        """记录一次成功请求的延迟"""
+        self.latencies.append(latency)
+    
+    def hedge_delay(self) -> Optional[float]:
+        """当前的对冲等待时间，样本不足时返回 None"""
+        if len(self.latencies) < self.min_samples:
+            return None
+        ordered = sorted(self.latencies)
+        return ordered[min(int(len(ordered) * self.percentile), len(ordered) - 1)]
+    
+    def try_spend(self) -> bool:
+        """预算允许时记一次对冲请求并返回 True"""
+        if self.hedges + 1 > self.budget * self.requests:
+            return False
+        self.hedges += 1
+        return True
+
+
+@dataclass
+class Endpoint:
+    """服务端节点及其状态统计"""
+    url: str
+    unhealthy_until: float = 0.0
+    success: int = 0
+    failed: int = 0
+    bytes_sent: int = 0
+    busy_time: float = 0.0
+    # 服务端可以解压的请求体编码，None 表示尚未获取；各服务端版本可能不同，需要分别获取
+    request_encodings: Optional[List[str]] = None
+    
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.unhealthy_until
+
+
+class HashRing:
+    """一致性哈希环
+    
+    每个节点在环上放置多个虚拟节点，同一个键总是优先路由到同一个节点；
+    节点增减时只有少量键会改变归属，服务端缓存仍然有效。
+    """
+    
+    def __init__(self, nodes: List[str], replicas: int = 100):
+        self.nodes = list(nodes)
+        ring = sorted(
+            (self._hash(f"{node}#{i}"), node)
+            for node in self.nodes
+            for i in range(replicas)
+        )
+        self._keys = [key for key, _ in ring]
+        self._nodes = [node for _, node in ring]
+    
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int(hashlib.md5(key.encode()).hexdigest()[:16], 16)
+    
+    def preference_list(self, key: str) -> List[str]:
+        """按优先级返回键对应的所有节点，第一个为首选节点，其余依次作为故障转移节点"""
+        if not self._keys:
+            return []
+        start = bisect.bisect(self._keys, self._hash(key))
+        result = []
+        for i in range(len(self._keys)):
+            node = self._nodes[(start + i) % len(self._keys)]
+            if node not in result:
+                result.append(node)
+                if len(result) == len(self.nodes):
+                    break
+        return result
 
 
 class ConvertClient:
@@ -45,6 +583,7 @@ class ConvertClient:
     
     提供简单易用的文件批量转换功能，支持：
     - 自动连接检测
+    - 连接池复用（所有请求共享一个会话）
     - 异步并发处理
     - 智能重试机制
     - 进度实时显示
@@ -57,7 +596,22 @@ class ConvertClient:
         port: int = 7758,
         timeout: int = 300,
         max_retries: int = 3,
-        retry_delay: float = 1.0
+        retry_delay: float = 1.0,
+        max_connections: int = 5,
+        endpoints: Optional[List[str]] = None,
+        endpoint_cooldown: float = 30.0,
+        hedge_percentile: Optional[float] = None,
+        hedge_budget: float = 0.1,
+        breaker_threshold: float = 0.5,
+        breaker_cooldown: float = 30.0,
+        compress_uploads: bool = True,
+        idempotency: bool = True,
+        output_formats: Optional[List[str]] = None,
+        thumbnail: bool = False,
+        pdf_profile: Optional[str] = None,
+        page_range: Optional[str] = None,
+        preview_pages: Optional[int] = None,
+        sheets: Optional[str] = None
     ):
         """初始化客户端
         
@@ -67,14 +621,63 @@ class ConvertClient:
             timeout: 请求超时时间(秒)
             max_retries: 最大重试次数
             retry_delay: 重试间隔(秒)
+            max_connections: 连接池中到每个服务端的最大连接数，批量转换时会自动扩大到 max_workers
+            endpoints: 多个服务端地址列表（例如 ["10.0.0.1:7758", "10.0.0.2:7758"]），
+                指定后忽略 host/port，按文件内容的一致性哈希分配到各个服务端
+            endpoint_cooldown: 服务端请求失败后暂停向其分配文件的时间(秒)
+            hedge_percentile: 开启对冲请求并指定触发的延迟分位数（例如 0.95），为 None 表示不对冲
+            hedge_budget: 对冲请求数占主请求数的最大比例
+            breaker_threshold: 触发熔断的服务端错误比例，为 0 表示不启用熔断
+            breaker_cooldown: 熔断后暂停提交的时间(秒)
+            compress_uploads: 服务端支持时是否 gzip 压缩上传 txt/csv/tsv/xml/html 等文本类文件
+            idempotency: 是否为每个文件生成幂等键，重试时服务端等待首次请求的结果而不是重新转换
+            output_formats: 除 PDF 外额外导出的格式（例如 ["docx", "html"]），服务端一次转换全部生成
+            thumbnail: 是否同时导出首页缩略图（PNG），下载时保存在 PDF 旁边
+            pdf_profile: PDF 导出配置（default / web / compact / print / archive），为 None 时使用服务端默认配置
+            page_range: 只导出指定页面（例如 "1-5,8"）
+            preview_pages: 只导出前 N 页，用于预览
+            sheets: 只导出指定的工作表（从 1 开始的序号，例如 "1,3"），仅支持表格
         """
         self.host = host
         self.port = port
-        self.base_url = f"http://{host}:{port}"
+        self.endpoints = [
+            Endpoint(url if "://" in url else f"http://{url}")
+            for url in (endpoints or [f"{host}:{port}"])
+        ]
+        for endpoint in self.endpoints:
+            endpoint.url = endpoint.url.rstrip("/")
+        self.base_url = self.endpoints[0].url
+        self.hash_ring = HashRing([endpoint.url for endpoint in self.endpoints])
+        self.endpoint_cooldown = endpoint_cooldown
         self.timeout = aiohttp.ClientTimeout(total=timeout)
         self.max_retries = max_retries
         self.retry_delay = retry_delay
+        self.max_connections = max_connections
         self.supported_types: List[str] = []
+        self.compress_uploads = compress_uploads
+        self.idempotency = idempotency
+        self.output_formats = output_formats or []
+        self.thumbnail = thumbnail
+        self.pdf_profile = pdf_profile
+        # 部分转换参数，服务端只接受其中一个
+        self.page_selection = {
+            name: str(value)
+            for name, value in (("page_range", page_range), ("preview_pages", preview_pages), ("sheets", sheets))
+            if value
+        }
+        self._session: Optional[aiohttp.ClientSession] = None
+        # 自适应并发限制器，批量转换开启 adaptive 时创建
+        self.limiter: Optional[AdaptiveLimiter] = None
+        # 对冲请求策略，用于控制长尾延迟
+        self.hedging: Optional[HedgingPolicy] = (
+            HedgingPolicy(percentile=hedge_percentile, budget=hedge_budget)
+            if hedge_percentile else None
+        )
+        # 熔断器，服务端错误率激增时暂停提交
+        self.breaker: Optional[CircuitBreaker] = (
+            CircuitBreaker(failure_threshold=breaker_threshold, cooldown=breaker_cooldown)
+            if breaker_threshold > 0 else None
+        )
         
         # 配置日志
         logging.basicConfig(
@@ -90,7 +693,37 @@ class ConvertClient:
         
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         """异步上下文管理器出口"""
-        pass
+        await self.close()
+    
+    async def _get_session(self, max_connections: Optional[int] = None) -> aiohttp.ClientSession:
+        """获取共享的HTTP会话，不存在或连接数不足时重新创建
+        
+        所有请求复用同一个连接池，避免每个文件都重新建立TCP连接
+        
+        Args:
+            max_connections: 需要的最大连接数，默认使用初始化时的设置
+        """
+        max_connections = max(max_connections or 0, self.max_connections)
+        if self._session is not None and not self._session.closed:
+            if max_connections <= self.max_connections:
+                return self._session
+            await self._session.close()
+        
+        self.max_connections = max_connections
+        connector = aiohttp.TCPConnector(
+            limit=max_connections * len(self.endpoints),
+            limit_per_host=max_connections,
+            ttl_dns_cache=300,       # DNS解析结果缓存5分钟
+            keepalive_timeout=60,    # 空闲连接保留60秒以便复用
+        )
+        self._session = aiohttp.ClientSession(connector=connector, timeout=self.timeout)
+        return self._session
+    
+    async def close(self):
+        """关闭共享的HTTP会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
     
     async def connect(self) -> bool:
         """连接到服务端并获取基本信息
@@ -99,13 +732,16 @@ class ConvertClient:
             bool: 连接是否成功
         """
         try:
-            # 健康检查
-            await self._health_check()
+            # 健康检查，多个服务端时并发检查
+            healthy = await self.check_endpoints()
+            if not healthy:
+                raise ConnectionError("没有可用的服务端")
+            self.base_url = healthy[0].url
             
             # 获取支持的文件类型
             await self._get_supported_types()
             
-            self.logger.info(f"✅ 成功连接到服务端 {self.base_url}")
+            self.logger.info(f"✅ 成功连接到服务端 {', '.join(e.url for e in healthy)}")
             self.logger.info(f"📋 支持 {len(self.supported_types)} 种文件格式")
             return True
             
@@ -113,24 +749,80 @@ class ConvertClient:
             self.logger.error(f"❌ 连接服务端失败: {e}")
             return False
     
-    async def _health_check(self):
+    async def check_endpoints(self) -> List[Endpoint]:
+        """检查所有服务端的健康状态，返回健康的服务端列表"""
+        async def check(endpoint: Endpoint) -> bool:
+            try:
+                await self._health_check(endpoint.url)
+                endpoint.unhealthy_until = 0.0
+                return True
+            except Exception as e:
+                if len(self.endpoints) > 1:
+                    self.logger.warning(f"⚠️ 服务端 {endpoint.url} 不可用: {e}")
+                self._mark_unhealthy(endpoint)
+                if len(self.endpoints) == 1:
+                    raise
+                return False
+        
+        checks = await asyncio.gather(*(check(endpoint) for endpoint in self.endpoints))
+        return [endpoint for endpoint, ok in zip(self.endpoints, checks) if ok]
+    
+    def _mark_unhealthy(self, endpoint: Endpoint):
+        """暂停向服务端分配文件，冷却时间过后自动恢复"""
+        endpoint.unhealthy_until = time.monotonic() + self.endpoint_cooldown
+    
+    def _pick_endpoint(self, routing_key: Optional[str], exclude: Optional[Endpoint] = None) -> Endpoint:
+        """按一致性哈希选择服务端，首选节点不可用时依次故障转移"""
+        if len(self.endpoints) == 1 or routing_key is None:
+            candidates = self.endpoints
+        else:
+            by_url = {endpoint.url: endpoint for endpoint in self.endpoints}
+            candidates = [by_url[url] for url in self.hash_ring.preference_list(routing_key)]
+        for endpoint in candidates:
+            if endpoint.healthy and endpoint is not exclude:
+                return endpoint
+        # 没有其他可用节点时仍然尝试首选节点
+        return candidates[0]
+    
+    async def _health_check(self, base_url: Optional[str] = None):
         """健康检查"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            async with session.get(f"{self.base_url}/health") as response:
-                if response.status != 200:
-                    raise ConnectionError(f"服务端健康检查失败: {response.status}")
-                result = await response.json()
-                if result.get("status") != "ok":
-                    raise ConnectionError("服务端状态异常")
+        session = await self._get_session()
+        async with session.get(f"{base_url or self.base_url}/health") as response:
+            if response.status != 200:
+                raise ConnectionError(f"服务端健康检查失败: {response.status}")
+            result = await response.json()
+            if result.get("status") != "ok":
+                raise ConnectionError("服务端状态异常")
+    
+    async def _fetch_file_types(self, base_url: str) -> dict:
+        """查询服务端支持的文件类型和请求体编码，同时记录到对应的服务端节点"""
+        session = await self._get_session()
+        async with session.get(f"{base_url}/get_supported_file_types") as response:
+            if response.status != 200:
+                raise ConnectionError(f"获取支持文件类型失败: {response.status}")
+            result = await response.json()
+        for endpoint in self.endpoints:
+            if endpoint.url == base_url:
+                # 旧版本服务端不返回该字段，此时不压缩上传
+                endpoint.request_encodings = result.get("request_encodings", [])
+        return result
     
     async def _get_supported_types(self):
         """获取支持的文件类型"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            async with session.get(f"{self.base_url}/get_supported_file_types") as response:
-                if response.status != 200:
-                    raise ConnectionError(f"获取支持文件类型失败: {response.status}")
-                result = await response.json()
-                self.supported_types = result.get("supported_file_types", [])
+        result = await self._fetch_file_types(self.base_url)
+        self.supported_types = result.get("supported_file_types", [])
+    
+    async def _request_encodings(self, base_url: str) -> List[str]:
+        """服务端可以解压的请求体编码，首次向该服务端上传时获取；获取失败时不压缩，下次再试"""
+        for endpoint in self.endpoints:
+            if endpoint.url == base_url and endpoint.request_encodings is not None:
+                return endpoint.request_encodings
+        try:
+            result = await self._fetch_file_types(base_url)
+        except Exception as e:
+            self.logger.debug(f"获取 {base_url} 支持的请求体编码失败: {e}")
+            return []
+        return result.get("request_encodings", [])
     
     def is_supported_file(self, file_path: Union[str, pathlib.Path]) -> bool:
         """检查文件是否支持转换
@@ -175,59 +867,292 @@ class ConvertClient:
                 elapsed_time=time.time() - start_time
             )
         
+        # 多个服务端时按文件内容哈希路由，相同内容总是优先发往同一个服务端
+        routing_key = None
+        if len(self.endpoints) > 1:
+            routing_key = await asyncio.to_thread(hash_file, file_path)
+        
+        # 各次重试共用一个幂等键，首次请求超时后服务端仍在转换时，重试直接取得它的结果
+        idempotency_key = uuid.uuid4().hex if self.idempotency else None
+        
         # 执行转换（带重试）
         for attempt in range(self.max_retries + 1):
+            if self.breaker and not await self.breaker.acquire():
+                # 熔断期间不发送请求，直接计为一次失败的尝试
+                error = ConvertError("服务端错误率过高，熔断器断开")
+                continue
+            # 熔断器可能已把本次尝试作为探测请求，之后的等待都在 try 中，被取消时 finally 也会释放探测
+            outcome = None
+            limiter_acquired = False
+            attempt_start = time.monotonic()
             try:
-                result = await self._do_convert_file(file_path)
+                endpoint = self._pick_endpoint(routing_key)
+                if self.limiter:
+                    await self.limiter.acquire()
+                    limiter_acquired = True
+                attempt_start = time.monotonic()
+                result, endpoint = await self._convert_with_hedging(
+                    file_path, endpoint, routing_key, idempotency_key
+                )
+                latency = time.monotonic() - attempt_start
                 result.elapsed_time = time.time() - start_time
+                result.endpoint = endpoint.url
+                endpoint.success += 1
+                endpoint.bytes_sent += file_path.stat().st_size
+                endpoint.busy_time += latency
+                if self.limiter:
+                    self.limiter.on_success(latency)
+                if self.hedging:
+                    self.hedging.observe(latency)
+                outcome = False
                 return result
                 
             except Exception as e:
-                if attempt < self.max_retries:
-                    # 指数退避重试
-                    wait_time = self.retry_delay * (2 ** attempt)
-                    self.logger.warning(f"转换失败 (尝试 {attempt + 1}/{self.max_retries + 1}): {e}")
-                    self.logger.info(f"等待 {wait_time:.1f}秒后重试...")
-                    await asyncio.sleep(wait_time)
-                else:
-                    return ConvertResult(
-                        original_file=str(file_path),
-                        status="error",
-                        error=f"转换失败 (已重试{self.max_retries}次): {str(e)}",
-                        elapsed_time=time.time() - start_time
-                    )
-    
-    async def _do_convert_file(self, file_path: pathlib.Path) -> ConvertResult:
-        """执行文件转换的核心逻辑"""
-        async with aiohttp.ClientSession(timeout=self.timeout) as session:
-            # 准备multipart form data
-            data = aiohttp.FormData()
+                error = e
+                retry_after = None
+                retryable = is_retryable(e)
+                # 永久错误说明服务端正常响应，过载拒绝交给并发限制器处理，都不算作服务端故障
+                outcome = retryable and not is_overload(e)
+                endpoint.failed += 1
+                endpoint.busy_time += time.monotonic() - attempt_start
+                if is_overload(e):
+                    retry_after = e.retry_after
+                    if self.limiter:
+                        self.limiter.on_overload(retry_after)
+                elif self.limiter:
+                    self.limiter.on_error()
+                
+                # 连接失败、超时或服务端内部错误时暂时摘除该服务端，下次重试转移到其他服务端
+                if len(self.endpoints) > 1 and (
+                    not isinstance(e, ConvertError) or (e.status or 0) >= 500
+                ):
+                    self._mark_unhealthy(endpoint)
+            finally:
+                # 退避等待期间不占用并发名额
+                if limiter_acquired:
+                    await self.limiter.release()
+                if self.breaker:
+                    self.breaker.record(outcome)
+            
+            if not retryable:
+                self.logger.warning(f"转换失败，错误不可重试: {error}")
+                return ConvertResult(
+                    original_file=str(file_path),
+                    status="error",
+                    error=str(error),
+                    elapsed_time=time.time() - start_time
+                )
             
-            # 读取文件并添加到表单
-            async with aiofiles.open(file_path, 'rb') as f:
-                file_content = await f.read()
-                data.add_field('file', file_content, filename=file_path.name)
+            if attempt < self.max_retries:
+                # 全抖动指数退避，避免大量失败的请求同时重试；服务端要求等待更久时以 Retry-After 为准
+                backoff = min(MAX_RETRY_DELAY, self.retry_delay * (2 ** attempt))
+                wait_time = max(random.uniform(0, backoff), retry_after or 0)
+                self.logger.warning(f"转换失败 (尝试 {attempt + 1}/{self.max_retries + 1}): {error}")
+                self.logger.info(f"等待 {wait_time:.1f}秒后重试...")
+                await asyncio.sleep(wait_time)
+        
+        return ConvertResult(
+            original_file=str(file_path),
+            status="error",
+            error=f"转换失败 (已重试{self.max_retries}次): {str(error) or type(error).__name__}",
+            elapsed_time=time.time() - start_time
+        )
+    
+    async def _convert_with_hedging(
+        self,
+        file_path: pathlib.Path,
+        endpoint: Endpoint,
+        routing_key: Optional[str],
+        idempotency_key: Optional[str] = None
+    ) -> Tuple[ConvertResult, Endpoint]:
+        """发送转换请求，超过对冲等待时间仍未返回时再向另一个服务端发送一份，先成功的结果生效
+        
+        对冲请求不携带幂等键，否则发往同一服务端时只会等待主请求的任务。
+        
+        Returns:
+            (转换结果, 实际返回结果的服务端)
+        """
+        if not self.hedging:
+            return await self._do_convert_file(file_path, endpoint.url, idempotency_key), endpoint
+        
+        self.hedging.requests += 1
+        primary = asyncio.create_task(self._do_convert_file(file_path, endpoint.url, idempotency_key))
+        tasks = {primary: endpoint}
+        try:
+            delay = self.hedging.hedge_delay()
+            if delay is not None:
+                await asyncio.wait({primary}, timeout=delay)
+                if not primary.done() and self.hedging.try_spend():
+                    # 只有一个服务端时对冲请求仍发往同一地址，由服务端的负载均衡分配到其他副本
+                    hedge_endpoint = self._pick_endpoint(routing_key, exclude=endpoint)
+                    self.logger.info(f"⏱️ {file_path.name} 超过 {delay:.1f}秒未返回，向 {hedge_endpoint.url} 发送对冲请求")
+                    hedge = asyncio.create_task(self._do_convert_file(file_path, hedge_endpoint.url))
+                    tasks[hedge] = hedge_endpoint
+            
+            pending = set(tasks)
+            first_error = None
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is not primary:
+                            self.hedging.hedge_wins += 1
+                        return task.result(), tasks[task]
+                    if task is primary or first_error is None:
+                        first_error = task.exception()
+            raise first_error
+        finally:
+            # 先返回的请求生效后，取消另一个
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+    
+    async def _do_convert_file(
+        self,
+        file_path: pathlib.Path,
+        base_url: Optional[str] = None,
+        idempotency_key: Optional[str] = None
+    ) -> ConvertResult:
+        """执行文件转换的核心逻辑"""
+        session = await self._get_session()
+        
+        # 准备multipart form data，文件内容边读边发送，不整体读入内存
+        data = aiohttp.FormData()
+        data.add_field(
+            'file',
+            self._iter_file_chunks(file_path),
+            filename=file_path.name,
+            content_type='application/octet-stream'
+        )
+        if self.output_formats:
+            data.add_field('output_formats', ",".join(self.output_formats))
+        if self.thumbnail:
+            data.add_field('thumbnail', 'true')
+        if self.pdf_profile:
+            data.add_field('pdf_profile', self.pdf_profile)
+        for name, value in self.page_selection.items():
+            data.add_field(name, value)
+        
+        # 文本类文件压缩后上传，服务端边接收边解压；分片和对冲请求可能发往不同版本的服务端，按实际目标判断
+        base_url = base_url or self.base_url
+        compress = None
+        if (
+            self.compress_uploads
+            and file_path.suffix.lower() in COMPRESSIBLE_SUFFIXES
+            and file_path.stat().st_size >= COMPRESS_MIN_SIZE
+            and "gzip" in await self._request_encodings(base_url)
+        ):
+            compress = "gzip"
+        
+        # 发送转换请求
+        # 告知服务端本次请求最多等待多久，超时后服务端不再继续处理
+        headers = {DEADLINE_HEADER: f"{self.timeout.total:g}"} if self.timeout.total else {}
+        if idempotency_key:
+            headers[IDEMPOTENCY_HEADER] = idempotency_key
+        
+        async with session.post(
+            f"{base_url}/convert",
+            data=data,
+            compress=compress,
+            headers=headers
+        ) as response:
+            response_text = await response.text()
             
-            # 发送转换请求
-            async with session.post(f"{self.base_url}/convert", data=data) as response:
-                response_text = await response.text()
+            if response.status == 200:
+                result = await response.json()
+                return ConvertResult(
+                    original_file=str(file_path),
+                    status=result.get("status", "unknown"),
+                    converted_url=result.get("converted_url"),
+                    outputs=result.get("outputs"),
+                    metadata=result.get("metadata"),
+                    thumbnail_url=result.get("thumbnail_url")
+                )
+            else:
+                # 尝试解析错误信息
+                try:
+                    error_data = json.loads(response_text)
+                    error_msg = error_data.get("error", f"HTTP {response.status}")
+                except:
+                    error_msg = f"HTTP {response.status}: {response_text}"
                 
-                if response.status == 200:
-                    result = await response.json()
-                    return ConvertResult(
-                        original_file=str(file_path),
-                        status=result.get("status", "unknown"),
-                        converted_url=result.get("converted_url")
-                    )
-                else:
-                    # 尝试解析错误信息
-                    try:
-                        error_data = json.loads(response_text)
-                        error_msg = error_data.get("error", f"HTTP {response.status}")
-                    except:
-                        error_msg = f"HTTP {response.status}: {response_text}"
-                    
-                    raise Exception(error_msg)
+                raise ConvertError(
+                    error_msg,
+                    status=response.status,
+                    retry_after=parse_retry_after(response.headers.get("Retry-After"))
+                )
+    
+    @staticmethod
+    async def _iter_file_chunks(file_path: pathlib.Path, chunk_size: int = UPLOAD_CHUNK_SIZE):
+        """按块异步读取文件，用于流式上传"""
+        async with aiofiles.open(file_path, 'rb') as f:
+            while True:
+                chunk = await f.read(chunk_size)
+                if not chunk:
+                    break
+                yield chunk
+    
+    async def download_file(self, url: str, dest_path: Union[str, pathlib.Path]) -> pathlib.Path:
+        """流式下载文件到本地，先写入临时文件，完成后再重命名
+        
+        Args:
+            url: 下载地址
+            dest_path: 保存路径
+            
+        Returns:
+            pathlib.Path: 保存路径
+        """
+        dest_path = pathlib.Path(dest_path)
+        dest_path.parent.mkdir(parents=True, exist_ok=True)
+        part_path = dest_path.with_name(dest_path.name + ".part")
+        
+        session = await self._get_session()
+        try:
+            async with session.get(url) as response:
+                if response.status != 200:
+                    raise Exception(f"HTTP {response.status}")
+                async with aiofiles.open(part_path, 'wb') as f:
+                    async for chunk in response.content.iter_chunked(DOWNLOAD_CHUNK_SIZE):
+                        await f.write(chunk)
+            part_path.replace(dest_path)
+        finally:
+            if part_path.exists():
+                part_path.unlink()
+        return dest_path
+    
+    def iter_files(
+        self,
+        directory: Union[str, pathlib.Path],
+        recursive: bool = True
+    ) -> Iterator[pathlib.Path]:
+        """逐个产出目录中支持的文件，不一次性加载整个目录树
+        
+        基于 os.scandir 遍历，目录项的类型信息来自 scandir 本身，不需要对每个文件单独 stat
+        
+        Args:
+            directory: 目录路径
+            recursive: 是否递归搜索子目录
+            
+        Yields:
+            pathlib.Path: 支持的文件路径
+        """
+        pending_dirs = [str(directory)]
+        while pending_dirs:
+            current_dir = pending_dirs.pop()
+            try:
+                with os.scandir(current_dir) as entries:
+                    for entry in entries:
+                        try:
+                            # 不跟随符号链接目录，避免循环引用
+                            if entry.is_dir(follow_symlinks=False):
+                                if recursive:
+                                    pending_dirs.append(entry.path)
+                            elif entry.is_file() and self.is_supported_file(entry.name):
+                                yield pathlib.Path(entry.path)
+                        except OSError as e:
+                            self.logger.warning(f"无法访问 {entry.path}: {e}")
+            except OSError as e:
+                self.logger.warning(f"无法读取目录 {current_dir}: {e}")
     
     def find_files(
         self, 
@@ -248,23 +1173,277 @@ class ConvertClient:
             self.logger.error(f"目录不存在或不是目录: {directory}")
             return []
         
-        files = []
-        pattern = "**/*" if recursive else "*"
-        
-        for file_path in directory.glob(pattern):
-            if file_path.is_file() and self.is_supported_file(file_path):
-                files.append(file_path)
+        files = list(self.iter_files(directory, recursive))
         
         self.logger.info(f"📁 在 {directory} 中找到 {len(files)} 个可转换文件")
         return files
     
+    async def iter_convert_directory(
+        self,
+        directory: Union[str, pathlib.Path],
+        output_dir: Optional[Union[str, pathlib.Path]] = None,
+        max_workers: int = 5,
+        recursive: bool = True,
+        download: bool = False,
+        download_workers: int = 5,
+        manifest: Optional[ConvertManifest] = None,
+        resume: bool = False,
+        dedup: Optional[DuplicateDetector] = None,
+        watcher: Optional[DirectoryWatcher] = None
+    ) -> AsyncIterator[ConvertResult]:
+        """流式批量转换目录中的文件，每完成一个文件就产出一个结果
+        
+        目录遍历和转换同时进行：生产者把遍历到的文件放入有界队列，max_workers 个消费者从队列中取文件转换，
+        内存占用只与并发数有关，与目录中的文件总数无关
+        
+        Args:
+            directory: 输入目录
+            output_dir: 下载PDF的保存目录（可选，默认为输入目录的父目录）
+            max_workers: 最大并发数
+            recursive: 是否递归搜索
+            download: 是否将转换后的PDF下载到输出目录（按输入目录的相对路径存放）
+            download_workers: 下载PDF的最大并发数，与转换并发数相互独立
+            manifest: 断点续传清单（可选），每个文件完成后立即追加记录
+            resume: 是否跳过清单中已成功且未修改的文件（跳过的文件也会产出结果，skipped 为 True）
+            dedup: 重复文件检测器（可选），内容相同的文件只转换一次，其余文件复用结果（duplicate_of 为首个文件）
+            watcher: 目录监听器（可选），处理完目录中已有的文件后继续转换监听到的新文件，直到被取消
+            
+        Yields:
+            ConvertResult: 转换结果，按完成顺序产出
+        """
+        # 确保已连接
+        if not self.supported_types:
+            if not await self.connect():
+                raise ConnectionError("无法连接到服务端")
+        
+        directory = pathlib.Path(directory)
+        if not directory.exists() or not directory.is_dir():
+            self.logger.error(f"目录不存在或不是目录: {directory}")
+            return
+        
+        # 下载的PDF保存位置
+        download_dir = pathlib.Path(output_dir) if output_dir else directory.parent
+        
+        # 确保连接池足够容纳所有并发请求
+        await self._get_session(max_workers + (download_workers if download else 0))
+        
+        # 待转换文件队列和结果队列都是有界的，生产者和消费者之间形成背压
+        file_queue: asyncio.Queue = asyncio.Queue(maxsize=max_workers * 2)
+        result_queue: asyncio.Queue = asyncio.Queue(maxsize=max_workers * 2)
+        download_semaphore = asyncio.Semaphore(download_workers)
+        # 下载和等待重复文件结果的后台任务
+        background_tasks = set()
+        
+        async def produce():
+            """遍历目录，把文件放入队列，队列满时等待"""
+            for file_path in self.iter_files(directory, recursive):
+                if watcher is None or watcher.accepts(str(file_path)):
+                    await file_queue.put(file_path)
+            if watcher is not None:
+                async for file_path in watcher.files():
+                    await file_queue.put(file_path)
+            for _ in range(max_workers):
+                await file_queue.put(None)
+        
+        def spawn(coro):
+            task = asyncio.create_task(coro)
+            background_tasks.add(task)
+            task.add_done_callback(background_tasks.discard)
+        
+        async def finish(
+            result: ConvertResult,
+            stat: Optional[os.stat_result],
+            file_hash: Optional[str],
+            shared: Optional[asyncio.Future] = None
+        ):
+            """记录到清单并产出结果，同时通知等待该结果的重复文件"""
+            if shared is not None and not shared.done():
+                shared.set_result(result)
+            if manifest is not None:
+                await manifest.record(result, stat, file_hash)
+            await result_queue.put(result)
+        
+        async def finish_duplicate(
+            file_path: pathlib.Path,
+            original_path: pathlib.Path,
+            shared: asyncio.Future,
+            stat: Optional[os.stat_result],
+            file_hash: Optional[str]
+        ):
+            """等待内容相同的首个文件完成，复用其转换结果"""
+            original = await shared
+            result = ConvertResult(
+                original_file=str(file_path),
+                status=original.status,
+                converted_url=original.converted_url,
+                error=original.error,
+                duplicate_of=str(original_path),
+                outputs=original.outputs,
+                metadata=original.metadata,
+                thumbnail_url=original.thumbnail_url
+            )
+            if download and original.status == 'success':
+                dest_path = download_dir / file_path.relative_to(directory).with_suffix(".pdf")
+                if original.local_file:
+                    # 首个文件已经下载过，直接复制本地文件，其他格式的输出保存在PDF旁边
+                    original_pdf = pathlib.Path(original.local_file)
+                    copies = [(original_pdf, dest_path)] + [
+                        (original_pdf.with_suffix(f".{output_format}"), dest_path.with_suffix(f".{output_format}"))
+                        for output_format in (original.outputs or {})
+                        # 与 download_result 一致，不覆盖源文件
+                        if output_format != "pdf" and dest_path.with_suffix(f".{output_format}") != file_path
+                    ]
+                    try:
+                        dest_path.parent.mkdir(parents=True, exist_ok=True)
+                        for source, dest in copies:
+                            await asyncio.to_thread(shutil.copyfile, source, dest)
+                        result.local_file = str(dest_path)
+                    except OSError as e:
+                        self.logger.warning(f"PDF复制失败 {file_path.name}: {e}")
+                        result.status = "error"
+                        result.error = f"PDF复制失败: {e}"
+                elif original.converted_url:
+                    await download_semaphore.acquire()
+                    await download_result(result, file_path, stat, file_hash)
+                    return
+            await finish(result, stat, file_hash)
+        
+        async def download_result(
+            result: ConvertResult,
+            file_path: pathlib.Path,
+            stat: Optional[os.stat_result],
+            file_hash: Optional[str],
+            shared: Optional[asyncio.Future] = None
+        ):
+            """下载转换后的PDF，保存路径与输入文件的相对路径一致；其他格式的输出保存在PDF旁边"""
+            relative_path = file_path.relative_to(directory)
+            dest_path = download_dir / relative_path.with_suffix(".pdf")
+            try:
+                extra_downloads = [
+                    self.download_file(url, dest_path.with_suffix(f".{output_format}"))
+                    for output_format, url in (result.outputs or {}).items()
+                    # 输出目录与输入目录相同时不覆盖源文件
+                    if output_format != "pdf" and dest_path.with_suffix(f".{output_format}") != file_path
+                ]
+                await asyncio.gather(self.download_file(result.converted_url, dest_path), *extra_downloads)
+                result.local_file = str(dest_path)
+            except Exception as e:
+                # 下载失败的文件计为失败，不能作为已完成记入清单
+                self.logger.warning(f"PDF下载失败 {file_path.name}: {e}")
+                result.status = "error"
+                result.error = f"PDF下载失败: {e}"
+            finally:
+                download_semaphore.release()
+            await finish(result, stat, file_hash, shared)
+        
+        async def consume():
+            """从队列中取文件转换，直到收到结束标记"""
+            while True:
+                file_path = await file_queue.get()
+                if file_path is None:
+                    break
+                
+                # 记录转换前的文件状态，用于下次运行时判断文件是否修改过
+                stat = None
+                file_hash = None
+                if manifest is not None or dedup is not None:
+                    try:
+                        stat = file_path.stat()
+                        if manifest is not None and manifest.use_hash:
+                            file_hash = await asyncio.to_thread(hash_file, file_path)
+                    except OSError:
+                        pass
+                
+                # 已成功转换且未修改的文件直接跳过
+                if resume and manifest is not None and stat is not None:
+                    record = manifest.get_completed(file_path, stat, file_hash)
+                    # 需要下载时，本地 PDF 不存在（之前未下载或已被删除）的文件重新转换并下载
+                    if record and download and not (record.get("local_file") and os.path.exists(record["local_file"])):
+                        record = None
+                    if record:
+                        await result_queue.put(ConvertResult(
+                            original_file=str(file_path),
+                            status="success",
+                            converted_url=record.get("converted_url"),
+                            local_file=record.get("local_file"),
+                            elapsed_time=record.get("elapsed_time", 0.0),
+                            skipped=True
+                        ))
+                        continue
+                
+                # 与之前某个文件内容相同时不再上传，等待那个文件的结果
+                shared = None
+                if dedup is not None and stat is not None:
+                    try:
+                        shared, original_path, file_hash = await dedup.claim(file_path, stat.st_size, file_hash)
+                    except OSError:
+                        original_path = None
+                    if original_path is not None:
+                        spawn(finish_duplicate(file_path, original_path, shared, stat, file_hash))
+                        continue
+                
+                try:
+                    result = await self.convert_file(file_path)
+                except BaseException:
+                    if shared is not None and not shared.done():
+                        shared.cancel()
+                    raise
+                if download and result.status == 'success' and result.converted_url:
+                    # 转换完成后立即开始下载，与后续文件的转换同时进行；下载池满时等待
+                    await download_semaphore.acquire()
+                    spawn(download_result(result, file_path, stat, file_hash, shared))
+                else:
+                    await finish(result, stat, file_hash, shared)
+        
+        async def run():
+            workers = [asyncio.create_task(produce())]
+            workers += [asyncio.create_task(consume()) for _ in range(max_workers)]
+            try:
+                await asyncio.gather(*workers)
+                while background_tasks:
+                    await asyncio.gather(*background_tasks)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # 通知迭代器结束，异常在 await runner 时抛给调用方
+                await result_queue.put(None)
+                raise
+            finally:
+                for worker in workers:
+                    worker.cancel()
+            await result_queue.put(None)
+        
+        runner = asyncio.create_task(run())
+        try:
+            while True:
+                result = await result_queue.get()
+                if result is None:
+                    break
+                yield result
+            await runner
+        finally:
+            # 调用方提前退出时取消所有后台任务
+            if not runner.done():
+                runner.cancel()
+            for task in list(background_tasks):
+                task.cancel()
+    
     async def convert_directory(
         self,
         directory: Union[str, pathlib.Path],
         output_dir: Optional[Union[str, pathlib.Path]] = None,
         max_workers: int = 5,
         recursive: bool = True,
-        save_results: bool = True
+        save_results: bool = True,
+        download: bool = False,
+        download_workers: int = 5,
+        resume: bool = False,
+        manifest_path: Optional[Union[str, pathlib.Path]] = None,
+        verify_hash: bool = False,
+        adaptive: bool = False,
+        initial_workers: int = 2,
+        dedup: bool = False,
+        dedup_size_prefilter: bool = True
     ) -> List[ConvertResult]:
         """批量转换目录中的文件
         
@@ -273,95 +1452,218 @@ class ConvertClient:
             output_dir: 结果保存目录（可选）
             max_workers: 最大并发数
             recursive: 是否递归搜索
-            save_results: 是否保存结果到JSON文件
+            save_results: 是否将结果逐条追加保存到清单文件（JSONL）
+            download: 是否将转换后的PDF下载到输出目录（按输入目录的相对路径存放）
+            download_workers: 下载PDF的最大并发数，与转换并发数相互独立
+            resume: 是否断点续传，跳过清单中已成功且未修改的文件，只重试失败和新增的文件
+            manifest_path: 清单文件路径（可选，默认为结果保存目录下的 convert_manifest.jsonl）
+            verify_hash: 是否额外使用内容哈希判断文件是否修改过
+            adaptive: 是否根据服务端延迟和 429/503 自动调整并发数，开启后 max_workers 为并发上限
+            initial_workers: 自适应并发的初始并发数
+            dedup: 是否检测内容重复的文件，相同内容只上传转换一次
+            dedup_size_prefilter: 去重时是否先按文件大小预筛选，大小唯一的文件不计算哈希
             
         Returns:
             List[ConvertResult]: 转换结果列表
         """
-        # 确保已连接
-        if not self.supported_types:
-            if not await self.connect():
-                raise ConnectionError("无法连接到服务端")
-        
-        # 查找文件
-        files = self.find_files(directory, recursive)
-        if not files:
-            self.logger.warning("没有找到可转换的文件")
-            return []
+        directory = pathlib.Path(directory)
         
         # 创建输出目录
         if output_dir:
             output_dir = pathlib.Path(output_dir)
             output_dir.mkdir(parents=True, exist_ok=True)
         
-        # 创建进度条
-        progress_bar = tqdm(total=len(files), desc="转换进度", unit="文件")
+        # 结果逐条追加写入清单，中断后可以断点续传
+        manifest = None
+        if save_results or resume:
+            manifest = ConvertManifest(
+                manifest_path or (output_dir or directory.parent) / MANIFEST_FILE_NAME,
+                use_hash=verify_hash
+            )
+            if resume:
+                completed_count = manifest.load()
+                self.logger.info(f"📒 从清单 {manifest.path} 恢复，已完成 {completed_count} 个文件")
+            await manifest.open()
+        
+        # 自适应并发：max_workers 个消费者同时工作，实际发出的请求数由限制器控制
+        if adaptive:
+            self.limiter = AdaptiveLimiter(initial_limit=initial_workers, max_limit=max_workers)
         
-        # 创建任务队列
-        semaphore = asyncio.Semaphore(max_workers)
-        results = []
+        detector = DuplicateDetector(size_prefilter=dedup_size_prefilter) if dedup else None
         
-        async def convert_with_progress(file_path):
-            async with semaphore:
-                result = await self.convert_file(file_path)
-                progress_bar.update(1)
-                progress_bar.set_postfix({
-                    '成功': sum(1 for r in results if r.status == 'success'),
-                    '失败': sum(1 for r in results if r.status == 'error'),
-                    '当前': file_path.name[:20]
-                })
-                return result
+        # 文件总数事先未知，进度条只显示已完成的数量
+        progress_bar = tqdm(desc="转换进度", unit="文件")
+        
+        results = []
+        success_count = 0
+        error_count = 0
+        skipped_count = 0
         
         # 执行并发转换
         start_time = time.time()
-        tasks = [convert_with_progress(file_path) for file_path in files]
-        results = await asyncio.gather(*tasks)
-        
-        progress_bar.close()
+        try:
+            async for result in self.iter_convert_directory(
+                directory,
+                output_dir=output_dir,
+                max_workers=max_workers,
+                recursive=recursive,
+                download=download,
+                download_workers=download_workers,
+                manifest=manifest,
+                resume=resume,
+                dedup=detector
+            ):
+                results.append(result)
+                if result.skipped:
+                    skipped_count += 1
+                elif result.status == 'success':
+                    success_count += 1
+                else:
+                    error_count += 1
+                progress_bar.update(1)
+                postfix = {
+                    '成功': success_count,
+                    '失败': error_count,
+                    '跳过': skipped_count,
+                    '当前': pathlib.Path(result.original_file).name[:20]
+                }
+                if self.limiter:
+                    postfix['并发'] = self.limiter.current_limit
+                progress_bar.set_postfix(postfix)
+        finally:
+            progress_bar.close()
+            if manifest is not None:
+                await manifest.close()
+            limiter, self.limiter = self.limiter, None
         total_time = time.time() - start_time
         
-        # 统计结果
-        success_count = sum(1 for r in results if r.status == 'success')
-        error_count = len(results) - success_count
+        if not results:
+            self.logger.warning("没有找到可转换的文件")
+            return []
         
+        # 统计结果
         self.logger.info(f"\n📊 转换完成!")
         self.logger.info(f"   总计: {len(results)} 个文件")
         self.logger.info(f"   成功: {success_count} 个")
         self.logger.info(f"   失败: {error_count} 个")
+        if resume:
+            self.logger.info(f"   跳过(已完成): {skipped_count} 个")
         self.logger.info(f"   用时: {total_time:.1f} 秒")
         self.logger.info(f"   平均: {total_time/len(results):.1f} 秒/文件")
+        if len(self.endpoints) > 1:
+            self.logger.info("   各服务端吞吐:")
+            for endpoint in self.endpoints:
+                self.logger.info(
+                    f"     {endpoint.url}: 成功 {endpoint.success}, 失败 {endpoint.failed}, "
+                    f"上传 {endpoint.bytes_sent / 1024 / 1024:.1f} MB, "
+                    f"{endpoint.success / total_time:.2f} 文件/秒"
+                )
+        if detector is not None:
+            self.logger.info(
+                f"   重复文件: {detector.duplicates} 个, "
+                f"跳过上传 {detector.skipped_bytes / 1024 / 1024:.1f} MB"
+            )
+        if self.breaker and self.breaker.trips:
+            self.logger.info(f"   熔断: {self.breaker.trips} 次")
+        if self.hedging and self.hedging.hedges:
+            self.logger.info(
+                f"   对冲请求: {self.hedging.hedges} 次 (占 {self.hedging.hedges / max(self.hedging.requests, 1):.1%}), "
+                f"其中 {self.hedging.hedge_wins} 次先于原请求返回"
+            )
+        if limiter:
+            self.logger.info(f"   自适应并发: 最终 {limiter.current_limit}, 峰值 {limiter.peak_limit}, 上限 {max_workers}")
+        if download:
+            download_count = sum(1 for r in results if r.local_file)
+            self.logger.info(f"   已下载: {download_count} 个PDF -> {output_dir or directory.parent}")
         
-        # 保存结果
-        if save_results:
-            await self._save_results(results, output_dir or pathlib.Path(directory).parent)
+        if manifest is not None:
+            self.logger.info(f"💾 结果已保存到: {manifest.path}")
         
         return results
     
-    async def _save_results(
-        self, 
-        results: List[ConvertResult], 
-        output_dir: pathlib.Path
+    async def watch_directory(
+        self,
+        directory: Union[str, pathlib.Path],
+        output_dir: Optional[Union[str, pathlib.Path]] = None,
+        max_workers: int = 5,
+        recursive: bool = True,
+        download: bool = False,
+        download_workers: int = 5,
+        manifest_path: Optional[Union[str, pathlib.Path]] = None,
+        verify_hash: bool = False,
+        adaptive: bool = False,
+        initial_workers: int = 2,
+        debounce: float = 2.0
     ):
-        """保存转换结果到JSON文件"""
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        result_file = output_dir / f"convert_results_{timestamp}.json"
+        """持续监听目录，新增或修改的文件写入完成后立即转换，直到被取消
+        
+        启动时先处理目录中已有、但清单中没有成功记录的文件；之后只处理文件系统事件通知的文件，不再扫描整个目录。
+        与批量转换共用断点续传清单、并发控制和下载逻辑。
+        
+        Args:
+            directory: 监听的目录
+            output_dir: 结果保存目录（可选）
+            max_workers: 最大并发数
+            recursive: 是否同时监听子目录
+            download: 是否将转换后的PDF下载到输出目录
+            download_workers: 下载PDF的最大并发数
+            manifest_path: 清单文件路径（可选，默认为结果保存目录下的 convert_manifest.jsonl）
+            verify_hash: 是否额外使用内容哈希判断文件是否修改过
+            adaptive: 是否根据服务端延迟和 429/503 自动调整并发数
+            initial_workers: 自适应并发的初始并发数
+            debounce: 文件最后一次写入后等待多少秒再转换，避免转换写了一半的文件
+        """
+        directory = pathlib.Path(directory)
+        if not self.supported_types:
+            if not await self.connect():
+                raise ConnectionError("无法连接到服务端")
+        
+        if output_dir:
+            output_dir = pathlib.Path(output_dir)
+            output_dir.mkdir(parents=True, exist_ok=True)
         
-        # 转换为可序列化的格式
-        serializable_results = []
-        for result in results:
-            serializable_results.append({
-                "original_file": result.original_file,
-                "status": result.status,
-                "converted_url": result.converted_url,
-                "error": result.error,
-                "elapsed_time": result.elapsed_time
-            })
+        manifest = ConvertManifest(
+            manifest_path or (output_dir or directory.parent) / MANIFEST_FILE_NAME,
+            use_hash=verify_hash
+        )
+        completed_count = manifest.load()
+        await manifest.open()
+        
+        if adaptive:
+            self.limiter = AdaptiveLimiter(initial_limit=initial_workers, max_limit=max_workers)
         
-        # 写入文件
-        async with aiofiles.open(result_file, 'w', encoding='utf-8') as f:
-            await f.write(json.dumps(serializable_results, indent=2, ensure_ascii=False))
+        # 先开始监听再处理已有文件，避免遗漏启动过程中写入的文件
+        watcher = DirectoryWatcher(directory, recursive, debounce, file_filter=self.is_supported_file)
+        await watcher.start()
+        self.logger.info(f"👀 开始监听 {directory} ({watcher.backend})，清单中已完成 {completed_count} 个文件")
         
-        self.logger.info(f"💾 结果已保存到: {result_file}")
+        success_count = 0
+        error_count = 0
+        try:
+            async for result in self.iter_convert_directory(
+                directory,
+                output_dir=output_dir,
+                max_workers=max_workers,
+                recursive=recursive,
+                download=download,
+                download_workers=download_workers,
+                manifest=manifest,
+                resume=True,
+                watcher=watcher
+            ):
+                if result.skipped:
+                    continue
+                if result.status == 'success':
+                    success_count += 1
+                    self.logger.info(f"✅ {result.original_file} -> {result.local_file or result.converted_url}")
+                else:
+                    error_count += 1
+                    self.logger.error(f"❌ {result.original_file}: {result.error}")
+        finally:
+            await watcher.stop()
+            await manifest.close()
+            self.limiter = None
+            self.logger.info(f"👋 停止监听 {directory}，本次成功 {success_count} 个，失败 {error_count} 个")
 
 
 # 便捷函数
@@ -390,24 +1692,22 @@ if __name__ == "__main__":
     # 示例用法
     async def main():
         # 基础用法
-        client = ConvertClient("192.168.1.100", 7758)
-        await client.connect()
-        
-        # 转换单个文件
-        result = await client.convert_file("test.docx")
-        print(f"转换结果: {result}")
-        
-        # 批量转换目录
-        results = await client.convert_directory(
-            "documents/", 
-            max_workers=10,
-            recursive=True
-        )
-        
-        # 显示失败的文件
-        for result in results:
-            if result.status == "error":
-                print(f"❌ {result.original_file}: {result.error}")
+        async with ConvertClient("192.168.1.100", 7758) as client:
+            # 转换单个文件
+            result = await client.convert_file("test.docx")
+            print(f"转换结果: {result}")
+            
+            # 批量转换目录
+            results = await client.convert_directory(
+                "documents/", 
+                max_workers=10,
+                recursive=True
+            )
+            
+            # 显示失败的文件
+            for result in results:
+                if result.status == "error":
+                    print(f"❌ {result.original_file}: {result.error}")
     
     # 运行示例
     # asyncio.run(main())
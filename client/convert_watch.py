@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Convert2PDF 目录监听
+
+订阅文件系统事件（Linux 上使用 inotify），目录中出现新文件或文件被修改时立即产出，
+不需要反复扫描整个目录。文件在 debounce 秒内没有新的写入事件才视为写入完成，避免转换写了一半的文件。
+非 Linux 系统退化为定时扫描比较文件大小和修改时间。
+
+通过命令行使用:
+    python convert_cli.py -H 192.168.1.100 -i ./inbox -o ./output --watch
+"""
+
+import asyncio
+import ctypes
+import ctypes.util
+import errno
+import logging
+import os
+import pathlib
+import struct
+import sys
+from typing import AsyncIterator, Callable, Dict, Optional, Tuple, Union
+
+
+# inotify 事件类型，见 <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+# inotify_event 结构体头部: int wd; uint32_t mask, cookie, len
+EVENT_HEADER = struct.Struct("iIII")
+# 每次从 inotify 读取的最大字节数
+EVENT_BUFFER_SIZE = 64 * 1024
+
+
+def _load_libc():
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1, libc.inotify_add_watch  # 确认支持 inotify
+        return libc
+    except (OSError, AttributeError):
+        return None
+
+
+_libc = _load_libc()
+
+
+def is_temporary_file(name: str) -> bool:
+    """编辑器和 Office 的临时文件、锁文件（~$a.docx、.~lock.a.docx#、隐藏文件）不需要转换"""
+    return name.startswith(("~$", "."))
+
+
+class DirectoryWatcher:
+    """监听目录中新增或修改的文件"""
+
+    def __init__(
+        self,
+        directory: Union[str, pathlib.Path],
+        recursive: bool = True,
+        debounce: float = 2.0,
+        file_filter: Optional[Callable[[str], bool]] = None,
+        poll_interval: float = 5.0
+    ):
+        """初始化监听器
+
+        Args:
+            directory: 监听的目录
+            recursive: 是否同时监听子目录（包括之后新建的子目录）
+            debounce: 文件最后一次写入后等待多少秒才产出(秒)
+            file_filter: 文件过滤函数，参数为文件路径，返回 False 的文件被忽略
+            poll_interval: 不支持 inotify 时扫描目录的间隔(秒)
+        """
+        self.directory = pathlib.Path(directory)
+        self.recursive = recursive
+        self.debounce = debounce
+        self.file_filter = file_filter
+        self.poll_interval = poll_interval
+        self.backend = "inotify" if _libc is not None else "polling"
+        # 等待写入完成的文件：路径 -> 到期时间
+        self._pending: Dict[str, float] = {}
+        self._ready: asyncio.Queue = asyncio.Queue()
+        self._wake = asyncio.Event()
+        # inotify 监听描述符 -> 目录路径
+        self._watches: Dict[int, str] = {}
+        self._fd: Optional[int] = None
+        self._tasks = []
+        # 进行中的目录扫描任务，扫描在线程中执行，避免大目录阻塞事件循环
+        self._scans = set()
+        self.logger = logging.getLogger(__name__)
+
+    async def start(self):
+        """开始监听"""
+        self._loop = asyncio.get_running_loop()
+        if self.backend == "inotify":
+            fd = _libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+            if fd < 0:
+                raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+            self._fd = fd
+            await asyncio.to_thread(self._add_tree, str(self.directory))
+            self._loop.add_reader(fd, self._read_events)
+        else:
+            self._tasks.append(asyncio.create_task(self._poll_loop()))
+        self._tasks.append(asyncio.create_task(self._flush_loop()))
+
+    async def stop(self):
+        """停止监听"""
+        for task in [*self._tasks, *self._scans]:
+            task.cancel()
+        self._tasks.clear()
+        self._scans.clear()
+        if self._fd is not None:
+            self._loop.remove_reader(self._fd)
+            os.close(self._fd)
+            self._fd = None
+
+    async def __aenter__(self):
+        await self.start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.stop()
+
+    async def files(self) -> AsyncIterator[pathlib.Path]:
+        """持续产出写入完成的文件，直到被取消"""
+        while True:
+            yield await self._ready.get()
+
+    def accepts(self, path: str) -> bool:
+        """文件是否需要处理：跳过临时文件和 file_filter 排除的文件"""
+        if is_temporary_file(os.path.basename(path)):
+            return False
+        return self.file_filter is None or self.file_filter(path)
+
+    def _touch(self, path: str):
+        """文件有新的写入，重新开始计时"""
+        if self.accepts(path):
+            self._pending[path] = self._loop.time() + self.debounce
+            self._wake.set()
+
+    def _add_watch(self, path: str):
+        wd = _libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                self.logger.warning(f"无法监听 {path}: 超过 inotify 监听数量上限，请调大 fs.inotify.max_user_watches")
+            else:
+                self.logger.warning(f"无法监听 {path}: {os.strerror(err)}")
+            return
+        self._watches[wd] = path
+
+    def _add_tree(self, root: str, scan_files: bool = False):
+        """监听目录及其子目录；scan_files 时把已有的文件也加入待处理队列"""
+        pending_dirs = [root]
+        while pending_dirs:
+            current_dir = pending_dirs.pop()
+            self._add_watch(current_dir)
+            try:
+                with os.scandir(current_dir) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.recursive:
+                                    pending_dirs.append(entry.path)
+                            elif scan_files and entry.is_file():
+                                self._loop.call_soon_threadsafe(self._touch, entry.path)
+                        except OSError:
+                            continue
+            except OSError as e:
+                self.logger.warning(f"无法访问目录 {current_dir}: {e}")
+
+    def _scan_tree(self, root: str):
+        """在线程中监听并扫描目录树；由事件回调调用，不等待扫描完成"""
+        task = self._loop.create_task(asyncio.to_thread(self._add_tree, root, scan_files=True))
+        self._scans.add(task)
+        task.add_done_callback(self._scans.discard)
+
+    def _read_events(self):
+        """读取并处理 inotify 事件"""
+        try:
+            data = os.read(self._fd, EVENT_BUFFER_SIZE)
+        except BlockingIOError:
+            return
+        offset = 0
+        while offset < len(data):
+            wd, mask, _cookie, length = EVENT_HEADER.unpack_from(data, offset)
+            name = data[offset + EVENT_HEADER.size:offset + EVENT_HEADER.size + length].rstrip(b"\0")
+            offset += EVENT_HEADER.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                # 事件队列溢出，部分事件丢失，重新扫描一遍目录
+                self.logger.warning("inotify 事件队列溢出，重新扫描目录")
+                self._scan_tree(str(self.directory))
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            parent = self._watches.get(wd)
+            if parent is None or not name:
+                continue
+            path = os.path.join(parent, os.fsdecode(name))
+            if mask & IN_ISDIR:
+                # 新建或移入的子目录：加入监听，并处理加入监听之前已经写入的文件
+                if self.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._scan_tree(path)
+                continue
+            self._touch(path)
+
+    async def _flush_loop(self):
+        """把超过 debounce 时间没有新写入的文件放入就绪队列"""
+        while True:
+            now = self._loop.time()
+            for path in [p for p, deadline in self._pending.items() if deadline <= now]:
+                del self._pending[path]
+                if os.path.isfile(path):
+                    await self._ready.put(pathlib.Path(path))
+            self._wake.clear()
+            timeout = min(self._pending.values()) - now if self._pending else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        """扫描目录，返回 文件路径 -> (大小, 修改时间)"""
+        snapshot = {}
+        pending_dirs = [str(self.directory)]
+        while pending_dirs:
+            current_dir = pending_dirs.pop()
+            try:
+                with os.scandir(current_dir) as entries:
+                    for entry in entries:
+                        try:
+                            if entry.is_dir(follow_symlinks=False):
+                                if self.recursive:
+                                    pending_dirs.append(entry.path)
+                            elif entry.is_file() and self.accepts(entry.path):
+                                stat = entry.stat()
+                                snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+                        except OSError:
+                            continue
+            except OSError as e:
+                self.logger.warning(f"无法访问目录 {current_dir}: {e}")
+        return snapshot
+
+    async def _poll_loop(self):
+        """不支持 inotify 时定时扫描，比较文件大小和修改时间"""
+        snapshot = await asyncio.to_thread(self._snapshot)
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            current = await asyncio.to_thread(self._snapshot)
+            for path, signature in current.items():
+                if snapshot.get(path) != signature:
+                    self._touch(path)
+            snapshot = current
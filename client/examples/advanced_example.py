@@ -53,6 +53,7 @@ async def main():
     files = client.find_files(input_dir, recursive=True)
     if not files:
         print(f"❌ 在 {input_dir} 中没有找到可转换的文件")
+        await client.close()
         return
     
     print(f"\n📁 找到 {len(files)} 个可转换文件：")
@@ -107,7 +108,10 @@ async def main():
         for error_type, count in error_stats.items():
             print(f"   {error_type}: {count} 次")
     
-    # 8. 生成报告
+    # 8. 关闭客户端连接池
+    await client.close()
+    
+    # 9. 生成报告
     await generate_report(results, output_dir)
     
     print(f"\n🎉 任务完成！转换后的文件保存在：{output_dir}")
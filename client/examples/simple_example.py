@@ -18,10 +18,9 @@ async def main():
     """简单示例：几行代码完成批量转换"""
     
     # 1. 创建客户端 - 只需要填写服务端IP和端口
-    client = ConvertClient("192.168.1.100", 7758)
-    
-    # 2. 传入目录路径，自动批量转换
-    results = await client.convert_directory("./test_documents")
+    async with ConvertClient("192.168.1.100", 7758) as client:
+        # 2. 传入目录路径，自动批量转换
+        results = await client.convert_directory("./test_documents")
     
     # 3. 查看结果
     print(f"\n转换完成! 共处理 {len(results)} 个文件")
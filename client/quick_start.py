@@ -31,12 +31,12 @@ async def quick_start():
         print("❌ 请输入正确的目录路径")
         return
     
+    # 创建客户端
+    client = ConvertClient(SERVER_HOST, SERVER_PORT)
+    
     try:
         print(f"\n🔗 连接服务端 {SERVER_HOST}:{SERVER_PORT}...")
         
-        # 创建客户端
-        client = ConvertClient(SERVER_HOST, SERVER_PORT)
-        
         # 检查连接
         if not await client.connect():
             print("❌ 无法连接到服务端，请检查服务是否启动")
@@ -90,6 +90,8 @@ async def quick_start():
         print("\n⚠️ 用户取消操作")
     except Exception as e:
         print(f"❌ 执行失败: {e}")
+    finally:
+        await client.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,289 @@
+"""
+ConvertClient 批量转换的单元测试，不需要服务端
+
+运行:
+    python -m unittest test_convert_client
+"""
+
+import asyncio
+import json
+import logging
+import pathlib
+import tempfile
+import unittest
+
+from convert_client import MANIFEST_FILE_NAME, AdaptiveLimiter, ConvertClient, ConvertManifest, ConvertResult
+
+
+class DownloadFailureTest(unittest.IsolatedAsyncioTestCase):
+    """转换成功但下载失败的文件应计为失败，并在清单中保持未完成"""
+
+    async def asyncSetUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmp.name)
+        self.input_dir = root / "input"
+        self.output_dir = root / "output"
+        self.input_dir.mkdir()
+        (self.input_dir / "a.txt").write_text("hello")
+
+        self.client = ConvertClient(max_retries=0)
+        self.client.supported_types = [".txt"]
+
+        async def convert_file(file_path):
+            return ConvertResult(
+                original_file=str(file_path),
+                status="success",
+                converted_url="http://storage.invalid/a.pdf"
+            )
+
+        async def download_file(url, dest_path):
+            raise ConnectionError("connection reset")
+
+        self.client.convert_file = convert_file
+        self.client.download_file = download_file
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.tmp.cleanup()
+        logging.disable(logging.NOTSET)
+
+    async def test_failed_download_is_reported_as_error(self):
+        results = await self.client.convert_directory(self.input_dir, output_dir=self.output_dir, download=True)
+
+        self.assertEqual(len(results), 1)
+        self.assertEqual(results[0].status, "error")
+        self.assertIn("PDF下载失败", results[0].error)
+        self.assertIsNone(results[0].local_file)
+
+    async def test_failed_download_stays_pending_in_manifest(self):
+        await self.client.convert_directory(self.input_dir, output_dir=self.output_dir, download=True)
+
+        manifest = ConvertManifest(self.output_dir / MANIFEST_FILE_NAME)
+        self.assertEqual(manifest.load(), 0)
+
+
+class ManifestResumeTest(unittest.IsolatedAsyncioTestCase):
+    """断点续传时，下载失败或本地 PDF 缺失的文件应重新处理"""
+
+    async def asyncSetUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmp.name)
+        self.input_dir = root / "input"
+        self.output_dir = root / "output"
+        self.input_dir.mkdir()
+        self.output_dir.mkdir()
+        self.source = self.input_dir / "a.txt"
+        self.source.write_text("hello")
+        self.manifest_path = self.output_dir / MANIFEST_FILE_NAME
+
+        self.client = ConvertClient(max_retries=0)
+        self.client.supported_types = [".txt"]
+        self.converted = []
+
+        async def convert_file(file_path):
+            self.converted.append(file_path)
+            return ConvertResult(
+                original_file=str(file_path),
+                status="success",
+                converted_url="http://storage.invalid/a.pdf"
+            )
+
+        async def download_file(url, dest_path):
+            dest_path = pathlib.Path(dest_path)
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            dest_path.write_bytes(b"%PDF-1.4")
+            return dest_path
+
+        self.client.convert_file = convert_file
+        self.client.download_file = download_file
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.tmp.cleanup()
+        logging.disable(logging.NOTSET)
+
+    async def write_record(self, **fields):
+        manifest = ConvertManifest(self.manifest_path)
+        await manifest.open()
+        await manifest.record(
+            ConvertResult(original_file=str(self.source), status="success", **fields),
+            self.source.stat()
+        )
+        await manifest.close()
+
+    async def test_success_with_download_error_is_pending(self):
+        await self.write_record(converted_url="http://storage.invalid/a.pdf", error="PDF下载失败: HTTP 500")
+
+        self.assertEqual(ConvertManifest(self.manifest_path).load(), 0)
+
+    async def test_resume_with_download_refetches_missing_pdf(self):
+        missing_pdf = self.output_dir / "input" / "a.pdf"
+        await self.write_record(converted_url="http://storage.invalid/a.pdf", local_file=str(missing_pdf))
+
+        results = await self.client.convert_directory(
+            self.input_dir, output_dir=self.output_dir, download=True, resume=True
+        )
+
+        self.assertEqual(self.converted, [self.source])
+        self.assertEqual(results[0].status, "success")
+        self.assertFalse(results[0].skipped)
+
+    async def test_resume_skips_downloaded_file(self):
+        results = await self.client.convert_directory(self.input_dir, output_dir=self.output_dir, download=True)
+        self.converted.clear()
+
+        results = await self.client.convert_directory(
+            self.input_dir, output_dir=self.output_dir, download=True, resume=True
+        )
+
+        self.assertEqual(self.converted, [])
+        self.assertTrue(results[0].skipped)
+
+
+class DuplicateResultTest(unittest.IsolatedAsyncioTestCase):
+    """内容相同的文件复用首个文件的结果，包括全部输出格式"""
+
+    async def asyncSetUp(self):
+        logging.disable(logging.CRITICAL)
+        self.tmp = tempfile.TemporaryDirectory()
+        root = pathlib.Path(self.tmp.name)
+        self.input_dir = root / "input"
+        self.output_dir = root / "output"
+        self.input_dir.mkdir()
+        (self.input_dir / "a.txt").write_text("hello")
+        (self.input_dir / "b.txt").write_text("hello")
+
+        self.client = ConvertClient(max_retries=0)
+        self.client.supported_types = [".txt"]
+        self.converted = []
+
+        async def convert_file(file_path):
+            self.converted.append(file_path)
+            return ConvertResult(
+                original_file=str(file_path),
+                status="success",
+                converted_url="http://storage.invalid/a.pdf",
+                outputs={"pdf": "http://storage.invalid/a.pdf", "png": "http://storage.invalid/a.png"},
+                metadata={"page_count": 3},
+                thumbnail_url="http://storage.invalid/a.png"
+            )
+
+        async def download_file(url, dest_path):
+            dest_path = pathlib.Path(dest_path)
+            dest_path.parent.mkdir(parents=True, exist_ok=True)
+            dest_path.write_text(url)
+            return dest_path
+
+        self.client.convert_file = convert_file
+        self.client.download_file = download_file
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        self.tmp.cleanup()
+        logging.disable(logging.NOTSET)
+
+    async def test_duplicate_copies_every_output(self):
+        results = await self.client.convert_directory(
+            self.input_dir, output_dir=self.output_dir, download=True, dedup=True
+        )
+
+        self.assertEqual(len(self.converted), 1)
+        duplicate = next(result for result in results if result.duplicate_of)
+        self.assertEqual(duplicate.status, "success")
+        self.assertEqual(set(duplicate.outputs), {"pdf", "png"})
+        self.assertEqual(duplicate.metadata, {"page_count": 3})
+        self.assertEqual(duplicate.thumbnail_url, "http://storage.invalid/a.png")
+        local_pdf = pathlib.Path(duplicate.local_file)
+        self.assertEqual(local_pdf.with_suffix(".png").read_text(), "http://storage.invalid/a.png")
+
+
+class CircuitBreakerProbeTest(unittest.IsolatedAsyncioTestCase):
+    """作为探测请求的尝试在等待并发名额时被取消，探测应被释放"""
+
+    async def test_cancelled_probe_is_released(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = pathlib.Path(tmp) / "a.txt"
+            source.write_text("hello")
+            client = ConvertClient(max_retries=0, breaker_threshold=0.5)
+            client.supported_types = [".txt"]
+            # 熔断器冷却结束，下一次尝试成为探测请求
+            client.breaker.state = "open"
+            client.breaker.open_until = 0.0
+            # 并发名额已被占满，探测请求在 limiter.acquire() 中等待
+            client.limiter = AdaptiveLimiter(initial_limit=1, max_limit=1)
+            await client.limiter.acquire()
+
+            task = asyncio.create_task(client.convert_file(source))
+            await asyncio.sleep(0.05)
+            self.assertIs(client.breaker.probe_task, task)
+
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+            self.assertIsNone(client.breaker.probe_task)
+            self.assertEqual(client.limiter.in_flight, 1)
+            await client.close()
+
+
+class FakeResponse:
+    def __init__(self, body: dict):
+        self.status = 200
+        self.body = body
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self):
+        return self.body
+
+    async def text(self):
+        return json.dumps(self.body)
+
+
+class FakeSession:
+    """按服务端地址返回不同的请求体编码，记录每个转换请求是否压缩"""
+
+    def __init__(self, encodings: dict):
+        self.encodings = encodings
+        self.posts = []
+
+    def get(self, url):
+        base_url = url.rsplit("/", 1)[0]
+        return FakeResponse({"supported_file_types": [".txt"], "request_encodings": self.encodings[base_url]})
+
+    def post(self, url, data, compress, headers):
+        self.posts.append((url.rsplit("/", 1)[0], compress))
+        return FakeResponse({"status": "success", "converted_url": "http://storage.invalid/a.pdf"})
+
+
+class RequestEncodingTest(unittest.IsolatedAsyncioTestCase):
+    """只向支持 gzip 的服务端压缩上传，按每个请求实际发往的服务端判断"""
+
+    async def test_compression_follows_chosen_endpoint(self):
+        new, old = "http://new.invalid", "http://old.invalid"
+        client = ConvertClient(endpoints=[new, old], compress_uploads=True)
+        session = FakeSession({new: ["gzip"], old: []})
+
+        async def get_session(max_connections=None):
+            return session
+
+        client._get_session = get_session
+        await client._get_supported_types()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            source = pathlib.Path(tmp) / "a.txt"
+            source.write_text("hello " * 2048)
+            await client._do_convert_file(source, old)
+            await client._do_convert_file(source, new)
+
+        self.assertEqual(session.posts, [(old, None), (new, "gzip")])
+        self.assertEqual([endpoint.request_encodings for endpoint in client.endpoints], [["gzip"], []])
+
+
+if __name__ == "__main__":
+    unittest.main()
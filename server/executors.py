@@ -0,0 +1,565 @@
+# 文件转换执行器
+# main.py 通过环境变量 CONVERT_EXECUTOR 选择具体实现：
+#   subprocess - 每次请求直接启动一个 soffice 进程（默认，与原有行为一致）
+#   warm_pool  - 预热好的 LibreOffice 用户配置池，每个并发槽位独占一份配置
+#   docker     - 每次请求启动一个一次性容器，在容器内执行 soffice
+#   fake       - 不调用 LibreOffice，按配置模拟耗时和失败并生成目标格式的合法小文件，用于本地压测
+import asyncio
+import html
+import itertools
+import math
+import os
+import pathlib
+import random
+import shlex
+import struct
+import zlib
+
+from dotenv import load_dotenv
+from loguru import logger
+
+# 加载环境变量,系统环境变量优先级最高
+load_dotenv()
+
+# warm_pool 执行器的槽位数量（即最大并发转换数），为0表示使用 CPU 核数
+WARM_POOL_SIZE = int(os.getenv("WARM_POOL_SIZE", 0)) or (os.cpu_count() or 1)
+# warm_pool 执行器的 LibreOffice 用户配置存放目录
+WARM_POOL_PROFILE_DIR = pathlib.Path(
+    os.getenv(
+        "WARM_POOL_PROFILE_DIR", pathlib.Path(__file__).parent / "lo_profiles"
+    )
+)
+
+# docker 执行器使用的镜像，镜像内需要安装 LibreOffice
+CONVERT_DOCKER_IMAGE = os.getenv(
+    "CONVERT_DOCKER_IMAGE",
+    "swr.cn-north-4.myhuaweicloud.com/wyyy/convert2pdf_server:0.4.0",
+)
+
+# 启动时查询 LibreOffice 版本的最长时间(秒)
+VERSION_CHECK_TIMEOUT = int(os.getenv("VERSION_CHECK_TIMEOUT", 60))
+
+# docker 执行器一次导出多个格式时，记录各格式 soffice 退出码的文件（位于输出目录）
+DOCKER_STATUS_FILE = ".convert_status"
+
+# fake 执行器的耗时分布：fixed / uniform / exponential / lognormal
+FAKE_LATENCY_DISTRIBUTION = os.getenv("FAKE_LATENCY_DISTRIBUTION", "lognormal")
+# fake 执行器的平均耗时和标准差（秒）
+FAKE_LATENCY_MEAN = float(os.getenv("FAKE_LATENCY_MEAN", 1.0))
+FAKE_LATENCY_STDDEV = float(os.getenv("FAKE_LATENCY_STDDEV", 0.5))
+# fake 执行器的失败概率（0~1）
+FAKE_FAILURE_RATE = float(os.getenv("FAKE_FAILURE_RATE", 0.0))
+
+
+class ConversionError(Exception):
+    """文件转换失败"""
+
+    def __init__(self, message: str, returncode: int | None = None, stderr: str = ""):
+        super().__init__(message)
+        self.returncode = returncode
+        self.stderr = stderr
+        # 转换期间执行器是否超出处理能力，由调用方设置；此时的崩溃和超时可能是资源争用导致的
+        self.saturated = False
+        # 导出失败的格式，一次导出多个格式时用于定位
+        self.failed_formats: list[str] = []
+
+
+class ConversionTimeout(ConversionError):
+    """转换超过最长时间，转换进程已被终止"""
+
+
+def format_name(convert_to: str) -> str:
+    """--convert-to 参数中的目标格式（扩展名），例如 "pdf:writer_pdf_Export:{...}" -> pdf"""
+    return convert_to.split(":")[0]
+
+
+def output_path_for(input_path: pathlib.Path, output_dir: pathlib.Path, convert_to: str) -> pathlib.Path:
+    """soffice 输出文件的路径：输出目录下与输入同名、扩展名为目标格式的文件"""
+    return output_dir / f"{input_path.stem}.{format_name(convert_to)}"
+
+
+def format_failures(failures: list[tuple[str, ConversionError]]) -> ConversionError:
+    """合并多个格式的导出失败，错误信息列出失败的格式，退出码和 stderr 取自第一个失败的格式"""
+    failed_formats = [format_name(convert_to) for convert_to, _ in failures]
+    first = failures[0][1]
+    error = ConversionError(
+        f"Failed to convert file to {', '.join(failed_formats)}",
+        returncode=first.returncode,
+        stderr="\n".join(f"[{format_name(convert_to)}] {e.stderr}" for convert_to, e in failures),
+    )
+    error.failed_formats = failed_formats
+    return error
+
+
+def infilter_args(infilter: str | None) -> list[str]:
+    """指定导入过滤器时的 soffice 参数，为 None 时由 LibreOffice 自动识别格式"""
+    return [f"--infilter={infilter}"] if infilter else []
+
+
+async def run_soffice(args: list[str], description: str) -> tuple[bytes, bytes]:
+    """
+    执行 soffice 命令并等待结束
+    如果调用方被取消（例如客户端断开连接），会杀掉 soffice 进程，避免继续占用资源
+    """
+    process = await asyncio.create_subprocess_exec(
+        *args, stdout=asyncio.subprocess.PIPE, stderr=asyncio.subprocess.PIPE
+    )
+    try:
+        stdout, stderr = await process.communicate()
+    except asyncio.CancelledError:
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+            logger.warning(f"soffice process killed due to cancellation: {description}")
+        raise
+
+    if process.returncode != 0:
+        logger.error(
+            f"soffice exited with code {process.returncode}, {description}, stderr: {stderr.decode()}"
+        )
+        logger.error(f"Stdout: {stdout.decode() if stdout else 'None'}")
+        raise ConversionError(
+            "Failed to convert file", returncode=process.returncode, stderr=stderr.decode()
+        )
+    return stdout, stderr
+
+
+class ConvertExecutor:
+    """转换执行器基类"""
+
+    name = "base"
+    # 能同时处理的转换数，同时进行的转换超过该值时执行器满负荷
+    capacity = os.cpu_count() or 1
+
+    async def start(self):
+        """服务启动时调用，用于预热等初始化工作"""
+
+    async def stop(self):
+        """服务关闭时调用，用于释放资源"""
+
+    async def version(self) -> str | None:
+        """执行转换的 LibreOffice 的版本（soffice --version 的输出），无法获取时返回 None"""
+        try:
+            stdout, _ = await asyncio.wait_for(
+                run_soffice(["soffice", "--version"], "version check"), timeout=VERSION_CHECK_TIMEOUT
+            )
+        except (ConversionError, OSError, asyncio.TimeoutError) as e:
+            logger.warning(f"Failed to get LibreOffice version: {e!r}")
+            return None
+        return stdout.decode(errors="ignore").strip()
+
+    async def convert(
+        self,
+        input_path: pathlib.Path,
+        output_dir: pathlib.Path,
+        convert_to: str = "pdf",
+        infilter: str | None = None,
+    ) -> pathlib.Path:
+        """
+        将 input_path 转换为 convert_to 指定的格式，输出到 output_dir
+        convert_to 与 soffice --convert-to 参数的格式相同，例如 "pdf" 或 "pdf:writer_pdf_Export"
+        infilter 与 soffice --infilter 参数的格式相同，例如 "MS Word 2007 XML"，为 None 时自动识别输入格式
+        返回输出文件路径，失败时抛出 ConversionError
+        """
+        raise NotImplementedError
+
+    async def convert_many(
+        self,
+        input_path: pathlib.Path,
+        output_dir: pathlib.Path,
+        formats: list[str],
+        infilter: str | None = None,
+    ) -> list[pathlib.Path]:
+        """
+        将 input_path 导出为 formats 中的每个格式，返回与 formats 一一对应的输出文件路径
+        soffice 命令行每次只能指定一个 --convert-to，每个格式都要重新加载一次文档，默认实现依次调用 convert；
+        某个格式失败时继续导出其余格式，最后抛出列出所有失败格式的 ConversionError
+        """
+        output_paths, failures = [], []
+        for convert_to in formats:
+            try:
+                output_paths.append(await self.convert(input_path, output_dir, convert_to, infilter))
+            except ConversionError as e:
+                failures.append((convert_to, e))
+        if failures:
+            raise format_failures(failures)
+        return output_paths
+
+
+class SubprocessExecutor(ConvertExecutor):
+    """每次转换直接启动一个 soffice 进程"""
+
+    name = "subprocess"
+
+    async def convert(self, input_path, output_dir, convert_to="pdf", infilter=None):
+        abs_input_path = os.path.normpath(str(input_path.absolute()))
+        abs_output_dir = os.path.normpath(str(output_dir.absolute()))
+        logger.info(f"Converting file path: {abs_input_path}, output dir: {abs_output_dir}")
+
+        stdout, _ = await run_soffice(
+            [
+                "soffice",
+                "--headless",
+                *infilter_args(infilter),
+                "--convert-to",
+                convert_to,
+                abs_input_path,
+                "--outdir",
+                abs_output_dir,
+            ],
+            f"File: {abs_input_path}, Output Dir: {abs_output_dir}",
+        )
+        logger.info(f"File conversion successful. Stdout: {stdout.decode() if stdout else 'None'}")
+        return output_path_for(input_path, output_dir, convert_to)
+
+
+class WarmPoolExecutor(ConvertExecutor):
+    """
+    预热的 LibreOffice 用户配置池
+    多个 soffice 进程共用同一份用户配置时会互相冲突，只能串行执行；首次使用新配置时还要花数秒初始化。
+    这里为每个槽位准备一份独立的用户配置并在启动时预热，转换时从池中取出一个槽位独占使用。
+    """
+
+    name = "warm_pool"
+
+    def __init__(self, size: int = WARM_POOL_SIZE, profile_dir: pathlib.Path = WARM_POOL_PROFILE_DIR):
+        self.size = size
+        self.capacity = size
+        self.profile_dir = profile_dir
+        self.slots: asyncio.Queue[int] = asyncio.Queue()
+
+    def _profile_url(self, slot: int) -> str:
+        return (self.profile_dir / f"slot_{slot}").absolute().as_uri()
+
+    async def start(self):
+        self.profile_dir.mkdir(parents=True, exist_ok=True)
+
+        async def warm_up(slot: int):
+            try:
+                await run_soffice(
+                    [
+                        "soffice",
+                        f"-env:UserInstallation={self._profile_url(slot)}",
+                        "--headless",
+                        "--terminate_after_init",
+                    ],
+                    f"warm up slot {slot}",
+                )
+            except Exception as e:
+                logger.warning(f"Failed to warm up LibreOffice profile slot {slot}: {e}")
+
+        await asyncio.gather(*(warm_up(slot) for slot in range(self.size)))
+        for slot in range(self.size):
+            self.slots.put_nowait(slot)
+        logger.info(f"LibreOffice warm pool ready, size: {self.size}, profile dir: {self.profile_dir}")
+
+    async def convert(self, input_path, output_dir, convert_to="pdf", infilter=None):
+        return (await self.convert_many(input_path, output_dir, [convert_to], infilter))[0]
+
+    async def convert_many(self, input_path, output_dir, formats, infilter=None):
+        # 所有格式在同一个槽位内连续导出，只排队一次；每个格式仍是一次独立的 soffice 调用，文档会重新加载
+        slot = await self.slots.get()
+        try:
+            abs_input_path = os.path.normpath(str(input_path.absolute()))
+            abs_output_dir = os.path.normpath(str(output_dir.absolute()))
+            output_paths, failures = [], []
+            for convert_to in formats:
+                logger.info(
+                    f"Converting file path: {abs_input_path}, output dir: {abs_output_dir}, "
+                    f"format: {convert_to}, warm pool slot: {slot}"
+                )
+                try:
+                    stdout, _ = await run_soffice(
+                        [
+                            "soffice",
+                            f"-env:UserInstallation={self._profile_url(slot)}",
+                            "--headless",
+                            *infilter_args(infilter),
+                            "--convert-to",
+                            convert_to,
+                            abs_input_path,
+                            "--outdir",
+                            abs_output_dir,
+                        ],
+                        f"File: {abs_input_path}, Output Dir: {abs_output_dir}, format: {format_name(convert_to)}, slot: {slot}",
+                    )
+                except ConversionError as e:
+                    # 继续导出其余格式，最后一起报告失败的格式
+                    failures.append((convert_to, e))
+                    continue
+                logger.info(f"File conversion successful. Stdout: {stdout.decode() if stdout else 'None'}")
+                output_paths.append(output_path_for(input_path, output_dir, convert_to))
+            if failures:
+                raise format_failures(failures)
+            return output_paths
+        finally:
+            self.slots.put_nowait(slot)
+
+
+class DockerExecutor(ConvertExecutor):
+    """每次转换启动一个一次性容器，挂载任务目录并在容器内执行 soffice"""
+
+    name = "docker"
+
+    def __init__(self, image: str = CONVERT_DOCKER_IMAGE):
+        self.image = image
+        self.client = None
+
+    async def start(self):
+        # docker 为可选依赖，只有选择该执行器时才需要安装
+        import docker
+
+        self.client = docker.from_env()
+        logger.info(f"Docker executor ready, image: {self.image}")
+
+    async def version(self):
+        # 转换在镜像内执行，需要查询镜像内的 LibreOffice 版本
+        def run_version():
+            return self.client.containers.run(
+                image=self.image, command=["soffice", "--version"], network_disabled=True, remove=True
+            )
+
+        try:
+            output = await asyncio.wait_for(asyncio.to_thread(run_version), timeout=VERSION_CHECK_TIMEOUT)
+        except Exception as e:
+            logger.warning(f"Failed to get LibreOffice version in image {self.image}: {e!r}")
+            return None
+        return output.decode(errors="ignore").strip()
+
+    async def convert(self, input_path, output_dir, convert_to="pdf", infilter=None):
+        return (await self.convert_many(input_path, output_dir, [convert_to], infilter))[0]
+
+    async def convert_many(self, input_path, output_dir, formats, infilter=None):
+        abs_input_dir = os.path.normpath(str(input_path.parent.absolute()))
+        abs_output_dir = os.path.normpath(str(output_dir.absolute()))
+        # 输入和输出通常在同一个任务目录下，此时只挂载一次
+        volumes = {abs_output_dir: {"bind": "/data/output", "mode": "rw"}}
+        container_input_dir = "/data/output"
+        if abs_input_dir != abs_output_dir:
+            volumes[abs_input_dir] = {"bind": "/data/input", "mode": "ro"}
+            container_input_dir = "/data/input"
+
+        # 多个格式在同一个容器内依次导出，只启动一次容器；每个格式仍是一次独立的 soffice 调用，文档会重新加载
+        commands = [
+            [
+                "soffice",
+                "--headless",
+                *infilter_args(infilter),
+                "--convert-to",
+                convert_to,
+                f"{container_input_dir}/{input_path.name}",
+                "--outdir",
+                "/data/output",
+            ]
+            for convert_to in formats
+        ]
+        if len(commands) == 1:
+            command = commands[0]
+        else:
+            # 每个格式的退出码按顺序写入状态文件，某个格式失败时继续导出其余格式
+            command = ["sh", "-c", "\n".join(
+                f"{shlex.join(format_command)}; echo $? >> /data/output/{DOCKER_STATUS_FILE}"
+                for format_command in commands
+            )]
+
+        def start_container():
+            return self.client.containers.run(
+                image=self.image,
+                command=command,
+                volumes=volumes,
+                network_disabled=True,
+                detach=True,
+            )
+
+        (output_dir / DOCKER_STATUS_FILE).unlink(missing_ok=True)
+        logger.info(f"Converting file in docker container, file: {input_path}, image: {self.image}")
+        try:
+            # docker SDK 是阻塞调用，放到线程中执行
+            container = await asyncio.to_thread(start_container)
+        except Exception as e:
+            logger.error(f"Docker conversion failed, file: {input_path}, error: {e}")
+            raise ConversionError("Failed to convert file", stderr=str(e)) from e
+
+        # 不使用 auto_remove：很快退出的容器可能在 wait 之前就被删除，导致 wait 抛出 NotFound，
+        # 容器在等待结束后显式删除
+        try:
+            status = await asyncio.to_thread(container.wait)
+        except asyncio.CancelledError:
+            # 取消线程中的等待不会停止容器，需要显式杀掉容器内的 soffice
+            try:
+                await asyncio.to_thread(container.kill)
+                logger.warning(f"Docker container killed due to cancellation, file: {input_path}")
+            except Exception as e:
+                logger.error(f"Failed to kill docker container, file: {input_path}, error: {e}")
+            raise
+        except Exception as e:
+            logger.error(f"Docker conversion failed, file: {input_path}, error: {e}")
+            raise ConversionError("Failed to convert file", stderr=str(e)) from e
+        finally:
+            try:
+                await asyncio.to_thread(container.remove, force=True)
+            except Exception as e:
+                logger.warning(f"Failed to remove docker container, file: {input_path}, error: {e}")
+
+        if status.get("StatusCode") != 0:
+            logger.error(f"Docker conversion failed, file: {input_path}, status: {status}")
+            raise ConversionError(
+                f"Failed to convert file to {', '.join(map(format_name, formats))}", returncode=status.get("StatusCode")
+            )
+        if len(formats) > 1:
+            status_path = output_dir / DOCKER_STATUS_FILE
+            returncodes = status_path.read_text().split() if status_path.exists() else []
+            status_path.unlink(missing_ok=True)
+            # 没有记录退出码的格式按失败处理
+            failures = [
+                (convert_to, ConversionError("Failed to convert file", returncode=int(code) if code else None))
+                for convert_to, code in itertools.zip_longest(formats, returncodes[:len(formats)])
+                if code != "0"
+            ]
+            if failures:
+                logger.error(f"Docker conversion failed, file: {input_path}, formats: {[format_name(f) for f, _ in failures]}")
+                raise format_failures(failures)
+        return [output_path_for(input_path, output_dir, convert_to) for convert_to in formats]
+
+
+def fake_pdf_bytes(text: str = "converted by fake executor") -> bytes:
+    """生成一个只有一页的合法 PDF 文件内容"""
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    stream = f"BT /F1 12 Tf 72 720 Td ({text}) Tj ET".encode("latin-1", "replace")
+    objects = [
+        b"<< /Type /Catalog /Pages 2 0 R >>",
+        b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+        b"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+        b"/Resources << /Font << /F1 5 0 R >> >> /Contents 4 0 R >>",
+        b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream",
+        b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>",
+    ]
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, start=1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    for offset in offsets:
+        pdf += b"%010d 00000 n \n" % offset
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+        len(objects) + 1,
+        xref_offset,
+    )
+    return bytes(pdf)
+
+
+def fake_png_bytes(text: str = "") -> bytes:
+    """生成一个 1x1 白色像素的合法 PNG 文件内容"""
+    def chunk(kind: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    # 宽 1 高 1，8 位 RGB；每行像素前有一个过滤类型字节
+    header = struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", header)
+        + chunk(b"IDAT", zlib.compress(b"\x00\xff\xff\xff"))
+        + chunk(b"IEND", b"")
+    )
+
+
+def fake_bmp_bytes(text: str = "") -> bytes:
+    """生成一个 1x1 白色像素的合法 BMP 文件内容"""
+    # 24 位像素每行按 4 字节对齐
+    pixels = b"\xff\xff\xff\x00"
+    info = struct.pack("<IiiHHIIiiII", 40, 1, 1, 1, 24, 0, len(pixels), 2835, 2835, 0, 0)
+    header = struct.pack("<2sIHHI", b"BM", 14 + len(info) + len(pixels), 0, 0, 14 + len(info))
+    return header + info + pixels
+
+
+# fake 执行器能生成的输出格式 -> 生成文件内容的函数（参数为写入文件的文本）
+FAKE_OUTPUTS = {
+    "pdf": fake_pdf_bytes,
+    "png": fake_png_bytes,
+    "bmp": fake_bmp_bytes,
+    "html": lambda text: (
+        f"<!DOCTYPE html>\n<html><head><meta charset=\"utf-8\"><title>{html.escape(text)}</title></head>"
+        f"<body><p>{html.escape(text)}</p></body></html>\n"
+    ).encode(),
+    "txt": lambda text: f"{text}\n".encode(),
+    "csv": lambda text: f"\"{text.replace('"', '""')}\"\r\n".encode(),
+    "xml": lambda text: f'<?xml version="1.0" encoding="UTF-8"?>\n<document>{html.escape(text)}</document>\n'.encode(),
+    "svg": lambda text: (
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="200" height="20">'
+        f'<text x="0" y="15">{html.escape(text)}</text></svg>\n'
+    ).encode(),
+    "mml": lambda text: (
+        f'<math xmlns="http://www.w3.org/1998/Math/MathML"><mtext>{html.escape(text)}</mtext></math>\n'
+    ).encode(),
+}
+
+
+class FakeExecutor(ConvertExecutor):
+    """不调用 LibreOffice，模拟转换耗时和失败，用于在没有 LibreOffice/Docker 的机器上压测调度、队列和缓存逻辑"""
+
+    name = "fake"
+
+    def __init__(
+        self,
+        distribution: str = FAKE_LATENCY_DISTRIBUTION,
+        mean: float = FAKE_LATENCY_MEAN,
+        stddev: float = FAKE_LATENCY_STDDEV,
+        failure_rate: float = FAKE_FAILURE_RATE,
+    ):
+        self.distribution = distribution
+        self.mean = mean
+        self.stddev = stddev
+        self.failure_rate = failure_rate
+
+    async def version(self):
+        # 模拟支持导出过滤器选项的版本
+        return "LibreOffice 24.2 (fake executor)"
+
+    def sample_latency(self) -> float:
+        """按配置的分布采样一次转换耗时（秒）"""
+        if self.distribution == "fixed" or self.mean <= 0:
+            return max(self.mean, 0.0)
+        if self.distribution == "uniform":
+            return random.uniform(max(self.mean - self.stddev, 0.0), self.mean + self.stddev)
+        if self.distribution == "exponential":
+            return random.expovariate(1 / self.mean)
+        # lognormal：根据期望和标准差换算出对数正态分布的参数
+        sigma2 = math.log(1 + (self.stddev / self.mean) ** 2)
+        mu = math.log(self.mean) - sigma2 / 2
+        return random.lognormvariate(mu, math.sqrt(sigma2))
+
+    async def convert(self, input_path, output_dir, convert_to="pdf", infilter=None):
+        output_format = format_name(convert_to)
+        if output_format not in FAKE_OUTPUTS:
+            # 不能生成的格式直接失败，避免把 PDF 内容写进其他扩展名的文件
+            logger.error(f"Fake executor cannot produce {output_format}, file: {input_path}")
+            raise ConversionError(
+                f"Failed to convert file to {output_format}", returncode=1,
+                stderr=f"fake executor supports only: {', '.join(FAKE_OUTPUTS)}"
+            )
+        latency = self.sample_latency()
+        await asyncio.sleep(latency)
+        if random.random() < self.failure_rate:
+            logger.error(f"Fake conversion failed, file: {input_path}, latency: {latency:.3f}s")
+            raise ConversionError("Failed to convert file", returncode=1, stderr="fake failure")
+
+        output_path = output_path_for(input_path, output_dir, convert_to)
+        output_path.write_bytes(FAKE_OUTPUTS[output_format](input_path.name))
+        logger.info(f"Fake conversion successful, file: {input_path}, latency: {latency:.3f}s")
+        return output_path
+
+
+EXECUTORS = {
+    executor.name: executor
+    for executor in (SubprocessExecutor, WarmPoolExecutor, DockerExecutor, FakeExecutor)
+}
+
+
+def create_executor(name: str) -> ConvertExecutor:
+    """根据名称创建转换执行器"""
+    if name not in EXECUTORS:
+        raise ValueError(f"Unknown convert executor: {name}, available: {', '.join(EXECUTORS)}")
+    return EXECUTORS[name]()
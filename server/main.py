@@ -6,7 +6,14 @@ from minio import Minio
 from minio.error import S3Error
 import asyncio
 import aiohttp
+import hashlib
+import mimetypes
+import shutil
 import time
+import zlib
+from collections import OrderedDict
+from dataclasses import replace
+from typing import Optional
 from pydantic import BaseModel
 from loguru import logger
 from starlette.applications import Starlette
@@ -15,8 +22,17 @@ from starlette.responses import JSONResponse
 from starlette.routing import Route
 from starlette.middleware import Middleware
 from starlette.middleware.cors import CORSMiddleware
+from starlette.datastructures import Headers
 from dotenv import load_dotenv
-from urllib.parse import urlparse
+from urllib.parse import unquote, urlparse
+from executors import ConversionError, ConversionTimeout, create_executor
+from sniffing import ContentMismatch, ContentSniffer
+from output_info import pdf_page_count, png_dimensions
+from pdf_export import (
+    CALC_PDF_EXPORT, DRAW_PDF_EXPORT, IMPRESS_PDF_EXPORT, MATH_PDF_EXPORT, WRITER_PDF_EXPORT, WRITER_WEB_PDF_EXPORT,
+    linearize_pdf, page_range_max_pages, parse_page_selection, parse_profile, smaller_profiles,
+    supports_filter_options,
+)
 
 # 加载环境变量,系统环境变量优先级最高
 load_dotenv()
@@ -36,6 +52,62 @@ DOWNLOAD_URL_PREFIX = os.getenv("DOWNLOAD_URL_PREFIX", "")
 # 下载文件时是否校验 SSL 证书，默认关闭（即跳过校验）；如需开启请将环境变量 DOWNLOAD_SSL_VERIFY 设为 true/1/yes
 DOWNLOAD_SSL_VERIFY = os.getenv("DOWNLOAD_SSL_VERIFY", "false").lower() not in ("false", "0", "no")
 
+# 请求体为 gzip 压缩时，解压后的最大大小(MB)，防止压缩炸弹
+MAX_DECOMPRESSED_UPLOAD_MB = int(os.getenv("MAX_DECOMPRESSED_UPLOAD_MB", 1024))
+# 保存上传/下载文件时每次写入磁盘的块大小
+FILE_CHUNK_SIZE = 1024 * 1024
+
+# 客户端通过该请求头告知还愿意等待多少秒（相对时间，不受两端时钟差影响），超过后服务端放弃处理
+DEADLINE_HEADER = "X-Request-Timeout"
+# 因客户端已放弃等待而丢弃的请求数，按丢弃时所处的阶段统计
+expired_requests = {"download": 0, "convert": 0, "upload": 0}
+
+# 请求头为 true 时，客户端断开连接后仍然完成转换和上传（异步完成），否则中止处理
+COMPLETE_ON_DISCONNECT_HEADER = "X-Complete-On-Disconnect"
+# 转换过程中检查客户端是否断开连接的间隔(秒)
+DISCONNECT_POLL_INTERVAL = float(os.getenv("DISCONNECT_POLL_INTERVAL", 0.5))
+# 因客户端断开连接而中止的请求数，按中止时所处的阶段统计
+disconnected_requests = {"convert": 0, "upload": 0}
+
+# 客户端通过该请求头为一次转换指定唯一键，重试时携带相同的键会等待首次请求的任务或直接取得其结果，不会重复转换
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+# 成功结果按幂等键保留的时间(秒)
+IDEMPOTENCY_TTL = int(os.getenv("IDEMPOTENCY_TTL", 3600))
+# 最多保留的幂等键数量，超出时淘汰最早的
+IDEMPOTENCY_MAX_KEYS = int(os.getenv("IDEMPOTENCY_MAX_KEYS", 10000))
+# 等待任务的请求全部离开后任务继续保留的时间(秒)，期间携带相同键的重试可以重新等待它，超过后取消任务
+IDEMPOTENCY_GRACE = float(os.getenv("IDEMPOTENCY_GRACE", 30))
+
+# 文件转换执行器: subprocess(默认) / warm_pool / docker / fake，详见 executors.py
+CONVERT_EXECUTOR = os.getenv("CONVERT_EXECUTOR", "subprocess")
+executor = create_executor(CONVERT_EXECUTOR)
+# 单次转换的最长时间(秒)，超时终止转换进程，为 0 表示不限制
+CONVERT_TIMEOUT = int(os.getenv("CONVERT_TIMEOUT", 600))
+
+# 隔离区：确定性转换失败（崩溃、超时、无输出）的文件内容哈希，再次提交时直接拒绝
+# 同一内容失败多少次后隔离，负载较高时偶发的一次超时不应隔离正常文件，至少为 2
+POISON_FAILURE_THRESHOLD = max(int(os.getenv("POISON_FAILURE_THRESHOLD", 2)), 2)
+# 隔离时间(秒)，从最后一次失败开始计算
+POISON_TTL = int(os.getenv("POISON_TTL", 86400))
+# 最多记录的文件数量，超出时淘汰最早的
+POISON_MAX_ENTRIES = int(os.getenv("POISON_MAX_ENTRIES", 10000))
+# 管理接口的访问令牌，请求需携带 Authorization: Bearer <令牌>；未设置时管理接口拒绝所有请求
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN", "")
+
+# LibreOffice 是否支持 --convert-to 中的导出过滤器选项（7.4+），服务启动时根据执行器的 LibreOffice 版本设置；
+# 不支持时 PDF 按默认设置导出，部分转换不可用
+pdf_filter_options_supported = False
+
+# PDF 导出配置的效果统计：按配置和是否生效累计输入、首次导出和最终 PDF 的大小，大小目标重新导出节省的字节数，线性化和部分转换的次数，
+# 以及 LibreOffice 忽略页码范围而拒绝的部分转换次数
+pdf_export_stats = {
+    "profiles": {},
+    "size_target": {"reexports": 0, "saved_bytes": 0, "missed": 0},
+    "linearized": 0,
+    "partial": 0,
+    "partial_ignored": 0,
+}
+
 # 1、文档格式
 document_input_formats = [
     '.odt',   # OpenDocument文本文档
@@ -169,6 +241,78 @@ formula_output_formats = [
 
 supported_file_types = document_input_formats + document_output_formats + spreadsheet_input_formats + spreadsheet_output_formats + presentation_input_formats + presentation_output_formats + drawing_input_formats + drawing_output_formats + database_input_formats + database_output_formats + formula_input_formats + formula_output_formats
 
+# 各类输入格式可以导出的格式
+format_families = [
+    (document_input_formats, document_output_formats),
+    (spreadsheet_input_formats, spreadsheet_output_formats),
+    (presentation_input_formats, presentation_output_formats),
+    (drawing_input_formats, drawing_output_formats),
+    (database_input_formats, database_output_formats),
+    (formula_input_formats, formula_output_formats),
+]
+
+
+def get_output_formats(input_extension: str):
+    """输入格式可以导出的格式，不属于任何一类输入格式时只能导出 PDF"""
+    for input_formats, output_formats in format_families:
+        if input_extension in input_formats:
+            return output_formats
+    return ['.pdf']
+
+
+# 可以导出首页缩略图（PNG）的输入格式
+thumbnail_input_formats = document_input_formats + spreadsheet_input_formats + presentation_input_formats + drawing_input_formats
+
+
+def parse_flag(form_data, name: str) -> bool:
+    """读取布尔类型的表单字段"""
+    return str(form_data.get(name, "")).lower() in ("true", "1", "yes")
+
+
+def describe_outputs(output_formats, output_paths):
+    """转换输出的页数、各格式的文件大小和缩略图尺寸"""
+    paths = dict(zip(output_formats, output_paths))
+    return {
+        "page_count": pdf_page_count(paths["pdf"]),
+        "sizes": {fmt: path.stat().st_size for fmt, path in paths.items()},
+        "thumbnail": png_dimensions(paths["png"]) if "png" in paths else None,
+    }
+
+
+# 各类输入格式使用的 PDF 导出过滤器，导出配置的选项需要指定与文档类型一致的过滤器
+pdf_export_filters = [
+    (spreadsheet_input_formats, CALC_PDF_EXPORT),
+    (presentation_input_formats, IMPRESS_PDF_EXPORT),
+    (drawing_input_formats, DRAW_PDF_EXPORT),
+    (formula_input_formats, MATH_PDF_EXPORT),
+    (document_input_formats, WRITER_PDF_EXPORT),
+]
+
+
+def get_pdf_export_filter(input_extension: str):
+    """输入格式对应的 PDF 导出过滤器，无法确定打开文档的组件时返回 None（使用默认导出设置）"""
+    if input_extension in ('.html', '.htm'):
+        return WRITER_WEB_PDF_EXPORT
+    # XML 可能是任意组件的文档，数据库没有对应的导出过滤器
+    if input_extension == '.xml':
+        return None
+    for input_formats, export_filter in pdf_export_filters:
+        if input_extension in input_formats:
+            return export_filter
+    return None
+
+
+def parse_output_formats(form_data):
+    """解析 output_formats 表单字段（逗号分隔，或多个同名字段），PDF 总是第一个输出"""
+    formats = ["pdf"]
+    for value in form_data.getlist("output_formats"):
+        for output_format in str(value).split(","):
+            output_format = output_format.strip().lstrip(".").lower()
+            if output_format and output_format not in formats:
+                formats.append(output_format)
+    return formats
+
+
 # 创建minio客户端的辅助函数
 def create_minio_client():
     """创建并返回minio客户端"""
@@ -210,7 +354,24 @@ async def on_startup():
     logger.add(log_file, rotation="100 MB", retention="1000 days")
     logger.info(f"server start up, time: {time.strftime('%Y-%m-%d %H:%M:%S')}, s3 url is: {S3_ENDPOINT_URL}, log file is at: {log_file}")
 
+    # 启动转换执行器
+    await executor.start()
+    logger.info(f"Convert executor: {executor.name}")
+
+    # 检查 LibreOffice 版本，旧版本会忽略导出过滤器选项，导出配置和部分转换无法生效
+    global pdf_filter_options_supported
+    libreoffice_version = await executor.version()
+    pdf_filter_options_supported = supports_filter_options(libreoffice_version)
+    if pdf_filter_options_supported:
+        logger.info(f"LibreOffice version: {libreoffice_version}")
+    else:
+        logger.warning(
+            f"LibreOffice version {libreoffice_version or 'unknown'} does not support PDF export filter options (7.4+ required), "
+            "PDF profiles are not applied and partial conversion is disabled"
+        )
+
 async def on_shutdown():
+    await executor.stop()
     logger.info(f"server shut down, time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
 
 # 健康检查接口
@@ -219,16 +380,549 @@ async def health(request: Request):
 
 # 获取支持的文件类型接口
 async def get_supported_file_types(request:Request):
-    return JSONResponse({"supported_file_types": supported_file_types}, status_code=200)
+    # request_encodings 告知客户端可以压缩上传的请求体
+    return JSONResponse({"supported_file_types": supported_file_types, "request_encodings": ["gzip"]}, status_code=200)
+
+
+# 服务端统计接口
+async def stats(request: Request):
+    return JSONResponse(
+        {
+            "expired_requests": expired_requests,
+            "disconnected_requests": disconnected_requests,
+            "idempotency": {
+                "keys": len(idempotency_table.entries),
+                "hits": idempotency_table.hits,
+                "cancelled": idempotency_table.cancelled,
+            },
+            "poison_cache": {"entries": len(poison_cache.entries), "rejected": poison_cache.rejected},
+            "pdf_export": pdf_export_stats,
+        },
+        status_code=200
+    )
+
+
+def get_deadline(request: Request):
+    """根据请求头计算截止时间（time.monotonic），未指定或格式错误时返回 None"""
+    value = request.headers.get(DEADLINE_HEADER)
+    if not value:
+        return None
+    try:
+        return time.monotonic() + float(value)
+    except ValueError:
+        logger.warning(f"Invalid {DEADLINE_HEADER} header: {value}")
+        return None
+
+
+def deadline_expired(deadline, stage: str, source: str) -> bool:
+    """截止时间已过时计数并返回 True，调用方应放弃后续处理"""
+    if deadline is None or time.monotonic() < deadline:
+        return False
+    expired_requests[stage] += 1
+    logger.warning(f"Request deadline exceeded before {stage}, dropped, source: {source}")
+    return True
+
+
+def deadline_response():
+    return JSONResponse({"error": "Request deadline exceeded"}, status_code=504)
+
+
+class ClientDisconnected(Exception):
+    pass
+
+
+def complete_on_disconnect(request: Request) -> bool:
+    """请求是否选择了客户端断开后继续完成处理"""
+    return request.headers.get(COMPLETE_ON_DISCONNECT_HEADER, "").lower() in ("true", "1", "yes")
+
+
+async def wait_for_disconnect(request: Request):
+    """定时检查，直到客户端断开连接"""
+    while not await request.is_disconnected():
+        await asyncio.sleep(DISCONNECT_POLL_INTERVAL)
+
+
+async def cancel_on_disconnect(request: Request, coro):
+    """执行 coro，客户端中途断开连接时取消它并抛出 ClientDisconnected
+    
+    取消会传递到执行器，soffice 进程被终止，转换槽位随之释放。
+    """
+    task = asyncio.ensure_future(coro)
+    watcher = asyncio.create_task(wait_for_disconnect(request))
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+        if not task.done():
+            task.cancel()
+            # 等待执行器完成清理（终止进程、归还槽位）
+            await asyncio.gather(task, return_exceptions=True)
+    if task.cancelled():
+        raise ClientDisconnected()
+    return task.result()
+
+
+class RequestTooLarge(Exception):
+    pass
+
+
+class GzipRequestMiddleware:
+    """解压 Content-Encoding: gzip 的请求体
+    
+    边接收边解压，表单解析器看到的是解压后的原始请求体，上传的文件照常落盘，不会整体读入内存。
+    """
+
+    def __init__(self, app, max_size: int = MAX_DECOMPRESSED_UPLOAD_MB * 1024 * 1024):
+        self.app = app
+        self.max_size = max_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or Headers(scope=scope).get("content-encoding", "").lower() != "gzip":
+            await self.app(scope, receive, send)
+            return
+
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        total_size = 0
+        response_started = False
+
+        async def receive_decompressed():
+            nonlocal total_size
+            message = await receive()
+            if message["type"] != "http.request":
+                return message
+            # 每次最多解压到剩余额度多一个字节，超出即可判定过大，不会一次性解压出巨大的数据
+            body = decompressor.decompress(message.get("body", b""), self.max_size - total_size + 1)
+            if not message.get("more_body", False):
+                body += decompressor.flush()
+            total_size += len(body)
+            if total_size > self.max_size:
+                raise RequestTooLarge()
+            return {**message, "body": body}
+
+        async def send_wrapper(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        # 去掉压缩相关的请求头，后续处理按未压缩的请求体进行
+        scope = dict(scope)
+        scope["headers"] = [
+            (key, value) for key, value in scope["headers"]
+            if key not in (b"content-encoding", b"content-length")
+        ]
+        try:
+            await self.app(scope, receive_decompressed, send_wrapper)
+        except (RequestTooLarge, zlib.error) as e:
+            if response_started:
+                raise
+            if isinstance(e, RequestTooLarge):
+                logger.warning(f"Decompressed request body exceeds {MAX_DECOMPRESSED_UPLOAD_MB} MB, rejected")
+                response = JSONResponse({"error": "Request body too large"}, status_code=413)
+            else:
+                logger.warning(f"Invalid gzip request body: {e}")
+                response = JSONResponse({"error": "Invalid gzip request body"}, status_code=400)
+            await response(scope, receive, send)
+
+class IdempotencyTable:
+    """幂等键 -> 转换任务，保存进行中的任务和成功的结果，按 TTL 和数量上限淘汰
+    
+    失败的任务完成后立即移除，携带相同键的重试会重新转换。
+    进行中的任务记录正在等待它的请求数；所有请求都离开（超时或断开连接）后任务继续保留 grace 秒，
+    期间没有重试重新等待时取消任务，除非有请求选择了断开后继续完成（X-Complete-On-Disconnect）。
+    """
+
+    def __init__(
+        self,
+        ttl: int = IDEMPOTENCY_TTL,
+        max_keys: int = IDEMPOTENCY_MAX_KEYS,
+        grace: float = IDEMPOTENCY_GRACE
+    ):
+        self.ttl = ttl
+        self.max_keys = max_keys
+        self.grace = grace
+        # 幂等键 -> (任务, 过期时间)，按加入或完成的先后排序
+        self.entries: "OrderedDict[str, tuple[asyncio.Task, float]]" = OrderedDict()
+        # 命中已有任务或结果的请求数
+        self.hits = 0
+        # 幂等键 -> 正在等待任务的请求数
+        self.waiters: "dict[str, int]" = {}
+        # 客户端断开后仍需完成的任务的幂等键
+        self.detached: "set[str]" = set()
+        # 幂等键 -> 没有请求等待的任务的取消定时器
+        self.orphan_timers: "dict[str, asyncio.TimerHandle]" = {}
+        # 没有请求等待超过 grace 秒而取消的任务数
+        self.cancelled = 0
+
+    def get(self, key: str):
+        """返回键对应的任务，不存在或已过期时返回 None"""
+        self._evict()
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        self.hits += 1
+        return entry[0]
+
+    def add(self, key: str, task: asyncio.Task):
+        self.entries[key] = (task, time.monotonic() + self.ttl)
+        task.add_done_callback(lambda t: self._on_done(key, t))
+        self._evict()
+
+    def attach(self, key: str, complete_on_disconnect: bool):
+        """一个请求开始等待键对应的任务，取消尚未触发的取消定时器"""
+        self.waiters[key] = self.waiters.get(key, 0) + 1
+        if complete_on_disconnect:
+            self.detached.add(key)
+        timer = self.orphan_timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+    def detach(self, key: str, task: asyncio.Task):
+        """一个请求不再等待任务；最后一个请求离开后，任务在 grace 秒内没有请求重新等待时取消"""
+        self.waiters[key] -= 1
+        if self.waiters[key] > 0:
+            return
+        del self.waiters[key]
+        if not task.done() and key not in self.detached:
+            self.orphan_timers[key] = asyncio.get_running_loop().call_later(
+                self.grace, self._cancel_orphan, key, task
+            )
+
+    def _cancel_orphan(self, key: str, task: asyncio.Task):
+        self.orphan_timers.pop(key, None)
+        if self.waiters.get(key) or task.done():
+            return
+        self.cancelled += 1
+        logger.warning(f"No client waited for the job within {self.grace}s, job cancelled, key: {key}")
+        task.cancel()
+
+    def _on_done(self, key: str, task: asyncio.Task):
+        self.detached.discard(key)
+        timer = self.orphan_timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        entry = self.entries.get(key)
+        if entry is None or entry[0] is not task:
+            return
+        if task.cancelled() or task.exception() is not None or task.result().status_code != 200:
+            del self.entries[key]
+        else:
+            # 结果从完成时开始保留 TTL
+            self.entries[key] = (task, time.monotonic() + self.ttl)
+            self.entries.move_to_end(key)
+
+    def _evict(self):
+        now = time.monotonic()
+        while self.entries:
+            key, (task, expires_at) = next(iter(self.entries.items()))
+            # 进行中的任务不按时间淘汰，只在数量超出上限时淘汰（任务本身继续执行）
+            if len(self.entries) > self.max_keys or (task.done() and expires_at <= now):
+                del self.entries[key]
+            else:
+                break
+
+
+idempotency_table = IdempotencyTable()
+
+
+class PoisonCache:
+    """确定性转换失败的文件内容哈希 -> 失败记录，按 TTL 和数量上限淘汰"""
+
+    def __init__(
+        self,
+        threshold: int = POISON_FAILURE_THRESHOLD,
+        ttl: int = POISON_TTL,
+        max_entries: int = POISON_MAX_ENTRIES
+    ):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # (内容哈希, 转换选项) -> 失败记录，按最后一次失败的先后排序；
+        # 同一文件在某组选项下失败（例如导出缩略图崩溃）不影响其他选项的转换
+        self.entries: "OrderedDict[tuple[str, str], dict]" = OrderedDict()
+        # 因命中隔离区被拒绝的请求数
+        self.rejected = 0
+
+    def check(self, content_hash: str, options: str):
+        """返回文件在这组转换选项下的隔离记录，未隔离时返回 None"""
+        self._evict()
+        entry = self.entries.get((content_hash, options))
+        if entry is None or entry["failures"] < self.threshold:
+            return None
+        entry["rejected"] += 1
+        self.rejected += 1
+        return entry
+
+    def record(self, content_hash: str, options: str, reason: str, source: str):
+        """记录文件在这组转换选项下的一次确定性失败"""
+        now = time.time()
+        entry = self.entries.pop((content_hash, options), None) or {
+            "hash": content_hash,
+            "options": options,
+            "failures": 0,
+            "rejected": 0,
+            "first_failed_at": now,
+        }
+        entry.update(
+            reason=reason,
+            source=source,
+            failures=entry["failures"] + 1,
+            last_failed_at=now,
+            expires_at=now + self.ttl,
+        )
+        self.entries[(content_hash, options)] = entry
+        self._evict()
+        if entry["failures"] >= self.threshold:
+            logger.warning(f"File quarantined, hash: {content_hash}, options: {options}, reason: {reason}, source: {source}")
+
+    def remove(self, content_hash: str) -> int:
+        """移除文件在所有转换选项下的记录，返回移除的数量"""
+        keys = [key for key in self.entries if key[0] == content_hash]
+        for key in keys:
+            del self.entries[key]
+        return len(keys)
+
+    def clear(self) -> int:
+        count = len(self.entries)
+        self.entries.clear()
+        return count
+
+    def _evict(self):
+        now = time.time()
+        while self.entries:
+            key, entry = next(iter(self.entries.items()))
+            if len(self.entries) > self.max_entries or entry["expires_at"] <= now:
+                del self.entries[key]
+            else:
+                break
+
+
+poison_cache = PoisonCache()
+
+
+def poison_reason(error: ConversionError, output_exists: bool):
+    """判断转换失败是否由文件本身导致（重试也会失败），返回失败原因；可能是偶发故障时返回 None
+    
+    执行器满负荷时的崩溃和超时可能是资源争用导致的，不计入隔离区。
+    """
+    crashed = error.returncode is not None and (error.returncode < 0 or error.returncode >= 128)
+    if error.saturated and (isinstance(error, ConversionTimeout) or crashed):
+        return None
+    if isinstance(error, ConversionTimeout):
+        return f"conversion timed out after {CONVERT_TIMEOUT}s"
+    # 没有退出码（例如 docker 调用失败）说明没有真正开始转换；81 为 soffice 首次初始化配置目录后要求重启
+    if error.returncode is None or error.returncode == 81 or output_exists:
+        return None
+    if error.returncode < 0 or error.returncode >= 128:
+        return f"soffice crashed (exit code {error.returncode})"
+    return f"soffice exited with code {error.returncode} without output"
+
+
+# 正在进行的转换 -> 期间同时进行的最大转换数，用于判断转换失败时执行器是否满负荷
+active_conversions = {}
+
+
+async def convert_with_timeout(input_path: pathlib.Path, output_dir: pathlib.Path, formats, import_filter):
+    """执行转换，超过 CONVERT_TIMEOUT 时终止转换进程并抛出 ConversionTimeout
+    
+    转换失败时在 ConversionError.saturated 中记录转换期间同时进行的转换是否超过了执行器的处理能力。
+    """
+    output_dir.mkdir(parents=True, exist_ok=True)
+    conversion = object()
+    active_conversions[conversion] = 0
+    for key in active_conversions:
+        active_conversions[key] = max(active_conversions[key], len(active_conversions))
+    try:
+        try:
+            return await asyncio.wait_for(
+                executor.convert_many(input_path, output_dir, formats, import_filter),
+                timeout=CONVERT_TIMEOUT or None
+            )
+        except asyncio.TimeoutError:
+            raise ConversionTimeout(f"Conversion timed out after {CONVERT_TIMEOUT}s") from None
+    except ConversionError as e:
+        e.saturated = active_conversions[conversion] > executor.capacity
+        if e.saturated:
+            logger.warning(f"Conversion failed while executor was saturated ({active_conversions[conversion]} concurrent, capacity {executor.capacity})")
+        raise
+    finally:
+        del active_conversions[conversion]
+
+
+async def export_outputs(
+    input_path: pathlib.Path,
+    output_dir: pathlib.Path,
+    output_formats,
+    import_filter,
+    profile,
+    export_filter
+):
+    """按导出配置转换，返回 (输出路径列表, 实际使用的配置, 是否已线性化, 首次导出的 PDF 大小)
+
+    PDF 超过配置的大小目标时，逐级降低图片分辨率只重新导出 PDF，直到达到目标或用完所有档位；
+    重新导出失败时保留已有的 PDF。最后按配置线性化 PDF。
+    """
+    formats = [profile.convert_to(export_filter) if fmt == "pdf" else fmt for fmt in output_formats]
+    output_paths = await convert_with_timeout(input_path, output_dir, formats, import_filter)
+    pdf_path = output_paths[0]
+    if not pdf_path.exists():
+        return output_paths, profile, False, 0
+
+    # 降低分辨率重新导出和线性化之前的大小，用于统计后续处理的效果
+    original_size = pdf_path.stat().st_size
+    if profile.target_size_kb and export_filter is not None:
+        target_size = profile.target_size_kb * 1024
+        for smaller in smaller_profiles(profile):
+            if pdf_path.stat().st_size <= target_size:
+                break
+            attempt_dir = output_dir / f"dpi_{smaller.image_dpi}"
+            try:
+                [attempt_path] = await convert_with_timeout(
+                    input_path, attempt_dir, [smaller.convert_to(export_filter)], import_filter
+                )
+            except ConversionError as e:
+                logger.warning(f"Failed to re-export PDF at {smaller.image_dpi} DPI, keeping previous output, error: {e}")
+                break
+            pdf_export_stats["size_target"]["reexports"] += 1
+            if attempt_path.exists() and attempt_path.stat().st_size < pdf_path.stat().st_size:
+                attempt_path.replace(pdf_path)
+                profile = smaller
+        final_size = pdf_path.stat().st_size
+        pdf_export_stats["size_target"]["saved_bytes"] += original_size - final_size
+        if final_size > target_size:
+            pdf_export_stats["size_target"]["missed"] += 1
+        if final_size != original_size:
+            logger.info(f"PDF re-exported for size target {profile.target_size_kb} KB: {original_size} -> {final_size} bytes, image dpi: {profile.image_dpi}")
+
+    linearized = False
+    if profile.linearize:
+        linearized = await linearize_pdf(pdf_path)
+        if linearized:
+            pdf_export_stats["linearized"] += 1
+    return output_paths, profile, linearized, original_size
+
+
+def record_pdf_export(profile, applied: bool, input_size: int, exported_size: int, pdf_size: int, source: str):
+    """按请求的导出配置和配置是否生效，累计输入、首次导出和最终 PDF 的大小
+
+    首次导出与最终大小之比是大小目标和线性化的效果；输入格式不同的文件 PDF 大小差异很大，
+    输入与 PDF 的大小之比不代表配置的效果，不作为指标。
+    """
+    profile_stats = pdf_export_stats["profiles"].setdefault(profile.name, {}).setdefault(
+        "applied" if applied else "not_applied",
+        {"conversions": 0, "input_bytes": 0, "exported_bytes": 0, "pdf_bytes": 0}
+    )
+    profile_stats["conversions"] += 1
+    profile_stats["input_bytes"] += input_size
+    profile_stats["exported_bytes"] += exported_size
+    profile_stats["pdf_bytes"] += pdf_size
+    if applied and profile.page_range is not None:
+        pdf_export_stats["partial"] += 1
+    ratio = f"{pdf_size / exported_size:.0%}" if exported_size else "n/a"
+    pages = f", pages: {profile.page_range}" if profile.page_range is not None else ""
+    status = "" if applied else " (export options not applied)"
+    logger.info(
+        f"PDF exported with profile {profile.name}{pages}{status}: first export {exported_size} bytes, "
+        f"final {pdf_size} bytes ({ratio} after post-processing), input {input_size} bytes, source: {source}"
+    )
+
+
+def check_admin(request: Request):
+    """校验管理接口的访问令牌，未通过时返回错误响应；未设置 ADMIN_TOKEN 时管理接口关闭"""
+    if not ADMIN_TOKEN:
+        return JSONResponse({"error": "Admin API is disabled, set ADMIN_TOKEN to enable it"}, status_code=403)
+    if request.headers.get("authorization") != f"Bearer {ADMIN_TOKEN}":
+        return JSONResponse({"error": "Unauthorized"}, status_code=401)
+    return None
+
+
+# 隔离区管理接口：GET 列出隔离的文件，DELETE 清空，DELETE ?hash=<内容哈希> 移除单个文件
+async def poison_list(request: Request):
+    if (error := check_admin(request)) is not None:
+        return error
+    poison_cache._evict()
+    return JSONResponse({
+        "threshold": poison_cache.threshold,
+        "entries": list(poison_cache.entries.values()),
+    }, status_code=200)
+
+
+async def poison_clear(request: Request):
+    if (error := check_admin(request)) is not None:
+        return error
+    content_hash = request.query_params.get("hash")
+    if content_hash:
+        removed = poison_cache.remove(content_hash)
+        if not removed:
+            return JSONResponse({"error": "hash not found"}, status_code=404)
+    else:
+        removed = poison_cache.clear()
+    logger.info(f"Poison cache cleared by {request.client.host}, removed: {removed}")
+    return JSONResponse({"removed": removed}, status_code=200)
+
 
 class ConvertRequest(BaseModel):
     file_url: str
 
 # 转换文件格式接口
 async def convert(request: Request):
-    # 获取客户端ip地址和表单数据
-    client_ip = request.client.host
-    form_data = await request.form()
+    # 截止时间从收到请求头开始计算，包含接收请求体的时间
+    deadline = get_deadline(request)
+    # 未选择异步完成时，客户端断开连接后中止转换、跳过上传
+    complete = complete_on_disconnect(request)
+    idempotency_key = request.headers.get(IDEMPOTENCY_HEADER)
+    if not idempotency_key:
+        return await process_convert(
+            await request.form(), request.client.host, deadline, request=None if complete else request
+        )
+
+    task = idempotency_table.get(idempotency_key)
+    if task is None:
+        # 任务开始前读完表单，任务不再依赖可能已经结束的请求
+        form_data = await request.form()
+        # 读取请求体期间，携带相同键的其他请求可能已经创建了任务
+        task = idempotency_table.get(idempotency_key)
+    if task is not None:
+        logger.info(f"Idempotency key matched, attaching to existing job, key: {idempotency_key}, client ip: {request.client.host}")
+    else:
+        if deadline_expired(deadline, "download", f"idempotency key: {idempotency_key}"):
+            return deadline_response()
+        # 任务与请求解耦，不持有请求对象，也不使用首个请求的截止时间（转换仍受 CONVERT_TIMEOUT 限制）：
+        # 首个请求超时后客户端的重试可以继续等待它；没有请求等待超过 IDEMPOTENCY_GRACE 秒时取消
+        task = asyncio.create_task(process_detached(form_data, request.client.host))
+        idempotency_table.add(idempotency_key, task)
+
+    idempotency_table.attach(idempotency_key, complete)
+    try:
+        # shield 保证本请求超时或断开连接不会直接取消共享的任务
+        waiting = asyncio.wait_for(
+            asyncio.shield(task),
+            timeout=deadline - time.monotonic() if deadline else None
+        )
+        return await cancel_on_disconnect(request, waiting)
+    except asyncio.TimeoutError:
+        logger.warning(f"Request deadline exceeded while waiting for job, key: {idempotency_key}")
+        return deadline_response()
+    except ClientDisconnected:
+        logger.warning(f"Client disconnected while waiting for job, key: {idempotency_key}")
+        return JSONResponse({"error": "Client disconnected"}, status_code=499)
+    finally:
+        idempotency_table.detach(idempotency_key, task)
+
+
+async def process_detached(form_data, client_ip: str):
+    """与请求解耦的转换，完成后关闭表单中的上传文件（请求结束时不会替它关闭）"""
+    try:
+        return await process_convert(form_data, client_ip, None)
+    finally:
+        await form_data.close()
+
+
+async def process_convert(form_data, client_ip: str, deadline, request: Optional[Request] = None):
+    """下载或接收文件、转换并上传，返回响应
+    
+    request 不为 None 时，客户端断开连接后中止转换、跳过上传；为 None 时处理与请求解耦。
+    """
     logger.info(f"client ip is : {client_ip}, time: {time.strftime('%Y-%m-%d %H:%M:%S')}, form data is: {form_data}")
 
     # 支持两种方式：1. 通过file_url下载文件  2. 直接上传文件
@@ -248,8 +942,9 @@ async def convert(request: Request):
     if file_url:
         # 从URL获取文件信息
         file_url = file_url.strip('"\'\\[]')
-        file_extension = file_url.split('.')[-1].strip('"\'\\[]')
-        file_name = pathlib.Path(file_url.split("/")[-1].strip('"\'\\[]'))
+        # 只从 URL 的路径部分取文件名，忽略查询参数和锚点（例如 a.docx?token=x.y）
+        file_name = pathlib.Path(pathlib.PurePosixPath(unquote(urlparse(file_url).path)).name)
+        file_extension = file_name.suffix.lstrip('.').lower()
         original_source = file_url
     else:
         # 从上传文件获取文件信息
@@ -268,6 +963,40 @@ async def convert(request: Request):
     if file_ext_with_dot not in supported_file_types:
         return JSONResponse({"error": f"file type not supported, given file type is: {file_extension}"}, status_code=400)
 
+    # 除 PDF 外额外导出的格式，必须是该类文档可以导出的格式
+    output_formats = parse_output_formats(form_data)
+    allowed_output_formats = get_output_formats(file_ext_with_dot)
+    unsupported_formats = [fmt for fmt in output_formats if f".{fmt}" not in allowed_output_formats]
+    if unsupported_formats:
+        return JSONResponse(
+            {"error": f"output format not supported for {file_ext_with_dot}: {', '.join(unsupported_formats)}"},
+            status_code=400
+        )
+
+    # 首页缩略图作为 png 输出格式单独导出一次（soffice 每次只能导出一种格式），LibreOffice 导出为图片时只渲染第一页
+    thumbnail = parse_flag(form_data, "thumbnail")
+    if thumbnail:
+        if file_ext_with_dot not in thumbnail_input_formats:
+            return JSONResponse({"error": f"thumbnail not supported for {file_ext_with_dot}"}, status_code=400)
+        if "png" not in output_formats:
+            output_formats.append("png")
+
+    # PDF 导出配置：请求未指定时使用服务端默认配置
+    # 部分转换（页码范围、前 N 页预览、指定工作表）作为导出配置的选项传给 LibreOffice
+    try:
+        pdf_profile = parse_profile(form_data)
+        page_selection = parse_page_selection(form_data, file_ext_with_dot in spreadsheet_input_formats)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+    # 不支持导出过滤器选项时按默认设置导出
+    pdf_export_filter = get_pdf_export_filter(file_ext_with_dot) if pdf_filter_options_supported else None
+    if page_selection:
+        if not pdf_filter_options_supported:
+            return JSONResponse({"error": "partial conversion requires LibreOffice 7.4 or later on the server"}, status_code=400)
+        if pdf_export_filter is None:
+            return JSONResponse({"error": f"partial conversion not supported for {file_ext_with_dot}"}, status_code=400)
+        pdf_profile = replace(pdf_profile, **page_selection)
+
     # 创建下载tmp文件夹
     download_file_dir = pathlib.Path(__file__).parent / "tmp"
     download_file_dir.mkdir(parents=True, exist_ok=True)
@@ -275,6 +1004,8 @@ async def convert(request: Request):
     # 生成唯一的下载文件路径
     timestamp = str(time.time())
     download_file_path = download_file_dir / f"{timestamp}_{file_name}"
+    # 转换输出放在单独的目录，导出格式与输入格式相同时不会覆盖输入文件
+    output_dir = download_file_dir / f"{timestamp}_output"
 
     # 转换后的文件名和文件路径
     converted_file_name = file_name.with_suffix(".pdf")
@@ -287,7 +1018,13 @@ async def convert(request: Request):
     }
 
     try:
-        # 获取文件内容（下载或保存上传的文件）
+        if deadline_expired(deadline, "download", original_source):
+            return deadline_response()
+
+        # 获取文件内容（下载或保存上传的文件），同时根据文件头部探测真实格式
+        sniffer = ContentSniffer(file_ext_with_dot)
+        # 文件内容哈希，用于隔离反复转换失败的文件
+        hasher = hashlib.sha256()
         try:
             if file_url:
                 # 从URL下载文件
@@ -295,7 +1032,11 @@ async def convert(request: Request):
                     try:
                         async with session.get(
                             file_url,
-                            timeout=aiohttp.ClientTimeout(total=300),
+                            headers={"Accept-Encoding": "gzip, deflate"},  # 源站支持时压缩传输，aiohttp 自动解压
+                            # 下载时间不超过客户端剩余的等待时间
+                            timeout=aiohttp.ClientTimeout(
+                                total=min(300, max(deadline - time.monotonic(), 0.01)) if deadline else 300
+                            ),
                             ssl=DOWNLOAD_SSL_VERIFY  # 根据环境变量决定是否校验 SSL
                         ) as response:
                             if response.status != 200:
@@ -307,7 +1048,13 @@ async def convert(request: Request):
                                     f"Download failed, status code: {response.status}, reason: {response.reason}"
                                 )
                             with open(download_file_path, "wb") as f:
-                                f.write(await response.read())
+                                async for chunk in response.content.iter_chunked(FILE_CHUNK_SIZE):
+                                    # 内容与扩展名不符时立即停止下载
+                                    sniffer.feed(chunk)
+                                    hasher.update(chunk)
+                                    f.write(chunk)
+                    except ContentMismatch:
+                        raise
                     except Exception as download_exc:
                         # 捕获下载过程中的异常，输出更详细的日志
                         logger.error(
@@ -318,55 +1065,91 @@ async def convert(request: Request):
             else:
                 # 保存上传的文件
                 with open(download_file_path, "wb") as f:
-                    f.write(await uploaded_file.read())
+                    while chunk := await uploaded_file.read(FILE_CHUNK_SIZE):
+                        sniffer.feed(chunk)
+                        hasher.update(chunk)
+                        f.write(chunk)
                 logger.info(f"File uploaded successfully, filename: {uploaded_file.filename}, time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            import_filter = await asyncio.to_thread(sniffer.finish, download_file_path)
+            logger.info(f"File content detected as {sniffer.format}, import filter: {import_filter}, source: {original_source}")
+        except ContentMismatch as e:
+            logger.warning(f"Rejected file before conversion, source: {original_source}, reason: {e}")
+            return JSONResponse({"error": str(e)}, status_code=400)
         except Exception as e:
             logger.error(f"Failed to process file, source: {original_source}, error: {e}")
             return JSONResponse({"error": "Failed to process file"}, status_code=500)
 
-        # 将文件转换为pdf, 并保存到本地
+        # 之前确定性转换失败的文件直接拒绝，不再占用转换进程
+        content_hash = hasher.hexdigest()
+        # 同一文件换一组输出格式、导出配置或导入过滤器可能可以转换，按选项分别隔离
+        poison_options = f"formats={','.join(output_formats)}; profile={pdf_profile!r}; infilter={import_filter}"
+        quarantined = poison_cache.check(content_hash, poison_options)
+        if quarantined is not None:
+            logger.warning(f"Rejected quarantined file, hash: {content_hash}, reason: {quarantined['reason']}, source: {original_source}")
+            return JSONResponse(
+                {"error": f"file previously failed to convert: {quarantined['reason']}", "hash": content_hash},
+                status_code=422
+            )
+
+        if deadline_expired(deadline, "convert", original_source):
+            return deadline_response()
+
+        # 将文件转换为pdf及其他请求的格式, 并保存到本地；转换中途超过截止时间或客户端断开连接时终止转换进程
         try:
-            # 确保路径是绝对路径，并使用os.path.normpath来标准化路径
-            abs_download_path = os.path.normpath(str(download_file_path.absolute()))
-            abs_output_dir = os.path.normpath(str(download_file_path.parent.absolute()))
-            
-            logger.info(f"Converting file path: {abs_download_path}, output dir: {abs_output_dir}")
-            
-            process = await asyncio.create_subprocess_exec("soffice",
-                                                        "--headless",
-                                                        "--convert-to",
-                                                        "pdf",
-                                                        abs_download_path,
-                                                        "--outdir",
-                                                        abs_output_dir,
-                                                        stdout=asyncio.subprocess.PIPE,
-                                                        stderr=asyncio.subprocess.PIPE)
-            stdout, stderr = await process.communicate()
-            if process.returncode != 0:
-                logger.error(f"Failed to convert file, source: {original_source}, abs_download_path: {abs_download_path}, abs_output_dir: {abs_output_dir}, error: {stderr.decode()}")
-                # 记录更详细的错误信息
-                logger.error(f"Conversion command details - File: {abs_download_path}, Output Dir: {abs_output_dir}")
-                logger.error(f"Stdout: {stdout.decode() if stdout else 'None'}")
-                return JSONResponse({"error": "Failed to convert file"}, status_code=500)
-            else:
-                logger.info(f"File conversion successful. Stdout: {stdout.decode() if stdout else 'None'}")
+            conversion = export_outputs(
+                download_file_path, output_dir, output_formats, import_filter, pdf_profile, pdf_export_filter
+            )
+            if request is not None:
+                conversion = cancel_on_disconnect(request, conversion)
+            output_paths, pdf_profile, linearized, exported_size = await asyncio.wait_for(
+                conversion,
+                timeout=deadline - time.monotonic() if deadline else None
+            )
+        except asyncio.TimeoutError:
+            expired_requests["convert"] += 1
+            logger.warning(f"Request deadline exceeded during conversion, dropped, source: {original_source}")
+            return deadline_response()
+        except ClientDisconnected:
+            disconnected_requests["convert"] += 1
+            logger.warning(f"Client disconnected during conversion, aborted, source: {original_source}")
+            return JSONResponse({"error": "Client disconnected"}, status_code=499)
+        except ConversionError as e:
+            logger.error(f"Failed to convert file, source: {original_source}, error: {e}, stderr: {e.stderr}")
+            reason = poison_reason(e, (output_dir / download_file_path.with_suffix(".pdf").name).exists())
+            if reason:
+                poison_cache.record(content_hash, poison_options, reason, original_source)
+            # 错误信息列出导出失败的格式
+            return JSONResponse({"error": str(e)}, status_code=500)
         except Exception as e:
             logger.error(f"Failed to convert file, source: {original_source}, error: {e}")
             return JSONResponse({"error": "Failed to convert file"}, status_code=500)
 
+        if deadline_expired(deadline, "upload", original_source):
+            return deadline_response()
+
+        if request is not None and await request.is_disconnected():
+            disconnected_requests["upload"] += 1
+            logger.warning(f"Client disconnected before upload, aborted, source: {original_source}")
+            return JSONResponse({"error": "Client disconnected"}, status_code=499)
+
         # 将文件上传到minio/s3
         try:
             minio_client = create_minio_client()
-            s3_upload_file_path = f"convert_file2pdf_server/{str(time.time())}_{str(file_name.with_suffix('.pdf'))}"
-            pdf_path = download_file_path.with_suffix(".pdf")
+            # 同一次转换的所有输出使用相同的前缀
+            s3_upload_prefix = f"convert_file2pdf_server/{str(time.time())}_"
             
-            # 检查转换后的PDF文件是否存在
-            if not pdf_path.exists():
-                logger.error(f"Converted PDF file not found at: {pdf_path}")
+            # 检查转换后的文件是否存在
+            missing_formats = [fmt for fmt, path in zip(output_formats, output_paths) if not path.exists()]
+            if missing_formats:
+                logger.error(f"Converted file not found, formats: {missing_formats}, output dir: {output_dir}")
                 # 查看目录中的文件
-                dir_files = list(download_file_path.parent.glob('*'))
+                dir_files = list(output_dir.glob('*'))
                 logger.info(f"Files in directory: {dir_files}")
-                return JSONResponse({"error": "Converted PDF file not found"}, status_code=500)
+                if "pdf" in missing_formats:
+                    # soffice 无法加载文件时也会正常退出，只是没有输出
+                    poison_cache.record(content_hash, poison_options, "soffice produced no output", original_source)
+                    return JSONResponse({"error": "Converted PDF file not found"}, status_code=500)
+                return JSONResponse({"error": f"Converted {', '.join(missing_formats)} file not found"}, status_code=500)
             
             # 检查存储桶是否存在，如果不存在则创建
             if not minio_client.bucket_exists(S3_BUCKET_NAME):
@@ -386,23 +1169,58 @@ async def convert(request: Request):
                     "uploaded_at": str(int(time.time()))
                 }
             
-            # 上传文件到minio
-            logger.info(f"Uploading file to minio: {pdf_path} -> {S3_BUCKET_NAME}/{s3_upload_file_path}")
-            minio_client.fput_object(
-                bucket_name=S3_BUCKET_NAME,
-                object_name=s3_upload_file_path,
-                file_path=str(pdf_path),
-                content_type="application/pdf",
-                metadata=metadata
+            # 页数和输出大小在上传前从本地文件读取，客户端不需要再下载 PDF 解析
+            result["metadata"] = await asyncio.to_thread(describe_outputs, output_formats, output_paths)
+            # 没有导出过滤器时（无法确定文档类型或 LibreOffice 版本过低）配置中的选项不会生效
+            profile_applied = pdf_export_filter is not None or not pdf_profile.filter_options()
+            if pdf_profile.page_range is not None:
+                # 页数超过页码范围说明 LibreOffice 忽略了导出过滤器选项，导出的是完整文档，不能当作部分转换的结果返回
+                max_pages = page_range_max_pages(pdf_profile.page_range)
+                page_count = result["metadata"]["page_count"]
+                if max_pages is not None and page_count is not None and page_count > max_pages:
+                    logger.warning(f"PDF has {page_count} pages, more than requested range {pdf_profile.page_range}, export options were ignored, source: {original_source}")
+                    pdf_export_stats["partial_ignored"] += 1
+                    return JSONResponse({
+                        "error": f"LibreOffice ignored the requested page range {pdf_profile.page_range}, exported {page_count} pages",
+                        "page_count": page_count,
+                    }, status_code=422)
+            # 配置未能生效时不在元数据中返回，仍按请求的配置统计，计入未生效的部分
+            if profile_applied:
+                result["metadata"]["pdf_profile"] = {**pdf_profile.describe(), "export_filter": pdf_export_filter, "linearized": linearized}
+            else:
+                result["metadata"]["pdf_profile"] = None
+            record_pdf_export(
+                pdf_profile, profile_applied, download_file_path.stat().st_size, exported_size,
+                result["metadata"]["sizes"]["pdf"], original_source
             )
             
-            # 添加转换后的URL到结果字典
-            s3_download_url = f"{S3_ENDPOINT_URL}/{S3_BUCKET_NAME}/{s3_upload_file_path}"
-            if DOWNLOAD_URL_PREFIX:
-                result["converted_url"] = f"{DOWNLOAD_URL_PREFIX}/{S3_BUCKET_NAME}/{s3_upload_file_path}"
-            else:
-                result["converted_url"] = s3_download_url
-            logger.info(f"File converted successfully, uploaded to minio/s3, original source: {original_source}, time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
+            async def upload(output_format: str, output_path: pathlib.Path):
+                """上传一个输出文件，返回 (格式, 下载地址)"""
+                s3_upload_file_path = f"{s3_upload_prefix}{file_name.with_suffix(f'.{output_format}')}"
+                logger.info(f"Uploading file to minio: {output_path} -> {S3_BUCKET_NAME}/{s3_upload_file_path}")
+                await asyncio.to_thread(
+                    minio_client.fput_object,
+                    bucket_name=S3_BUCKET_NAME,
+                    object_name=s3_upload_file_path,
+                    file_path=str(output_path),
+                    content_type=mimetypes.guess_type(output_path.name)[0] or "application/octet-stream",
+                    metadata=metadata
+                )
+                if DOWNLOAD_URL_PREFIX:
+                    return output_format, f"{DOWNLOAD_URL_PREFIX}/{S3_BUCKET_NAME}/{s3_upload_file_path}"
+                return output_format, f"{S3_ENDPOINT_URL}/{S3_BUCKET_NAME}/{s3_upload_file_path}"
+            
+            # 所有输出同时上传
+            outputs = dict(await asyncio.gather(
+                *(upload(fmt, path) for fmt, path in zip(output_formats, output_paths))
+            ))
+            
+            # 添加转换后的URL到结果字典，outputs 包含每个格式的下载地址
+            result["converted_url"] = outputs["pdf"]
+            result["outputs"] = outputs
+            if thumbnail:
+                result["thumbnail_url"] = outputs["png"]
+            logger.info(f"File converted successfully, uploaded to minio/s3, original source: {original_source}, formats: {output_formats}, time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
             
         except S3Error as e:
             logger.error(f"Minio S3 error while uploading file, source: {original_source}, error: {e}")
@@ -419,22 +1237,25 @@ async def convert(request: Request):
             except Exception as e:
                 logger.error(f"Failed to delete downloaded file: {download_file_path}, error: {e}")
 
-        # 删除转换后的PDF文件
-        pdf_path = download_file_path.with_suffix(".pdf")
-        if pdf_path.exists():
+        # 删除转换后的文件
+        if output_dir.exists():
             try:
-                pdf_path.unlink()
-                logger.info(f"Deleted converted PDF file: {pdf_path}")
+                shutil.rmtree(output_dir)
+                logger.info(f"Deleted converted files: {output_dir}")
             except Exception as e:
-                logger.error(f"Failed to delete converted PDF file: {pdf_path}, error: {e}")
+                logger.error(f"Failed to delete converted files: {output_dir}, error: {e}")
 
     return JSONResponse(result, status_code=200)
 
 
 app = Starlette(routes=[Route("/health", health, methods=["GET"]),
                         Route("/get_supported_file_types", get_supported_file_types, methods=["GET"]),
-                        Route("/convert", convert, methods=["POST"])],
-                middleware=[Middleware(CORSMiddleware,
+                        Route("/convert", convert, methods=["POST"]),
+                        Route("/stats", stats, methods=["GET"]),
+                        Route("/admin/poison", poison_list, methods=["GET"]),
+                        Route("/admin/poison", poison_clear, methods=["DELETE"])],
+                middleware=[Middleware(GzipRequestMiddleware),
+                            Middleware(CORSMiddleware,
                                        allow_origins=["*"],
                                        allow_methods=["*"],
                                        allow_headers=["*"],
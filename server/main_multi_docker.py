@@ -1,8 +1,11 @@
 # 导入必要库
 import asyncio
+import datetime
+import fcntl
 import os
 import pathlib
 import shutil
+import socket
 import time
 import uuid
 
@@ -41,6 +44,58 @@ DOWNLOAD_SSL_VERIFY = os.getenv("DOWNLOAD_SSL_VERIFY", "false").lower() not in (
     "no",
 )
 
+# 转换容器的名称前缀和标签，用于识别本服务创建的容器（包括进程崩溃后遗留的孤儿容器）
+CONTAINER_NAME_PREFIX = "pdf_converter_"
+CONTAINER_LABEL = "convert2pdf_server.role"
+CONTAINER_LABEL_VALUE = "converter"
+# 创建容器的服务实例标识，多个副本共用同一个 Docker 守护进程时，每个实例只清理自己创建的容器
+# 默认使用主机名（容器/Pod 重启后不变，进程崩溃重启后仍能回收上次遗留的容器）
+INSTANCE_LABEL = "convert2pdf_server.instance"
+INSTANCE_ID = os.getenv("INSTANCE_ID") or socket.gethostname()
+# 创建容器的进程标识（实例、PID 和每次启动生成的随机值），active_tasks 只对本进程有效，
+# 多个进程或共用 INSTANCE_ID 的多个实例不会把对方正在运行的容器当作孤儿
+OWNER_LABEL = "convert2pdf_server.owner"
+OWNER_ID = f"{INSTANCE_ID}:{os.getpid()}:{uuid.uuid4().hex[:12]}"
+
+# 孤儿容器和临时目录的清理间隔（秒），为0表示只在启动时清理一次
+ORPHAN_REAPER_INTERVAL = int(os.getenv("ORPHAN_REAPER_INTERVAL", 300))
+# 临时任务目录超过该时长（秒）且不属于正在运行的任务时被视为遗留目录
+ORPHAN_TMP_MAX_AGE = int(os.getenv("ORPHAN_TMP_MAX_AGE", 3600))
+# 其他进程创建的容器超过该时长（秒）时视为孤儿，需大于容器的最长生命周期（启动等待 15 秒 + 转换请求超时 600 秒）
+ORPHAN_CONTAINER_MAX_AGE = int(os.getenv("ORPHAN_CONTAINER_MAX_AGE", 900))
+
+# 任务临时目录的根目录
+TMP_ROOT_DIR = pathlib.Path(__file__).parent / "tmp"
+
+# 正在运行的任务UUID集合，清理时跳过这些任务的容器和临时目录
+active_tasks: set[str] = set()
+
+# 后台定期清理任务
+reaper_task: asyncio.Task | None = None
+
+# 单个转换容器的资源限制：CPU 核数（可为小数）和内存上限（MB）
+CONTAINER_CPUS = float(os.getenv("CONTAINER_CPUS", 1))
+CONTAINER_MEMORY_MB = int(os.getenv("CONTAINER_MEMORY_MB", 1024))
+# 为宿主机和主服务保留的 CPU 核数与内存（MB），不分配给转换容器
+HOST_RESERVED_CPUS = int(os.getenv("HOST_RESERVED_CPUS", 1))
+HOST_RESERVED_MEMORY_MB = int(os.getenv("HOST_RESERVED_MEMORY_MB", 1024))
+# 是否将每个容器绑定到独立的 CPU 核心集合，默认关闭；如需开启请设为 true/1/yes
+CONTAINER_CPU_PINNING = os.getenv("CONTAINER_CPU_PINNING", "false").lower() not in (
+    "false",
+    "0",
+    "no",
+)
+# 同时运行的容器数量上限，为0表示根据宿主机资源自动计算
+MAX_CONTAINERS = int(os.getenv("MAX_CONTAINERS", 0))
+
+# 根据宿主机资源计算出的容器并发容量和空闲槽位，在启动时初始化
+container_capacity = 0
+free_slots: list[int] = []
+# 运行转换容器的宿主机 CPU 核数，绑核时用于校验核心编号
+host_cpu_count = 0
+# 持有进程锁的文件，进程退出时锁自动释放
+host_lock_file = None
+
 # 1、文档格式
 document_input_formats = [
     ".odt",  # OpenDocument文本文档
@@ -198,9 +253,127 @@ def create_docker_client():
         return None
 
 
+def get_host_resources() -> tuple[int, int]:
+    """
+    获取运行转换容器的宿主机 CPU 核数和内存字节数
+    优先使用 Docker 守护进程报告的数值（守护进程可能不在本机），失败时回退到本机信息
+    """
+    client = create_docker_client()
+    if client:
+        try:
+            info = client.info()
+            return int(info["NCPU"]), int(info["MemTotal"])
+        except Exception as e:
+            logger.warning(f"Failed to get host resources from Docker daemon: {e}")
+
+    cpu_count = os.cpu_count() or 1
+    memory = os.sysconf("SC_PAGE_SIZE") * os.sysconf("SC_PHYS_PAGES")
+    return cpu_count, memory
+
+
+def compute_container_capacity() -> int:
+    """根据宿主机 CPU 和内存计算可同时运行的转换容器数量，并初始化空闲槽位
+
+    保留给宿主机的资源之外放不下一个容器时抛出 RuntimeError，不超额分配
+    """
+    global container_capacity, free_slots, host_cpu_count
+
+    cpu_count, memory = get_host_resources()
+    host_cpu_count = cpu_count
+    usable_cpus = max(cpu_count - HOST_RESERVED_CPUS, 0)
+    usable_memory_mb = max(memory // (1024 * 1024) - HOST_RESERVED_MEMORY_MB, 0)
+
+    # 绑核时每个容器独占整数个核心
+    cpus_per_container = (
+        max(int(CONTAINER_CPUS), 1) if CONTAINER_CPU_PINNING else CONTAINER_CPUS
+    )
+    capacity = min(
+        int(usable_cpus // cpus_per_container),
+        int(usable_memory_mb // CONTAINER_MEMORY_MB),
+    )
+    if MAX_CONTAINERS > 0:
+        capacity = min(capacity, MAX_CONTAINERS)
+    if capacity <= 0:
+        message = (
+            f"No capacity for converter containers: host cpus: {cpu_count}, host memory: {memory // (1024 * 1024)} MB, "
+            f"reserved: {HOST_RESERVED_CPUS} cpus / {HOST_RESERVED_MEMORY_MB} MB, "
+            f"per container: {CONTAINER_CPUS} cpus / {CONTAINER_MEMORY_MB} MB; "
+            f"lower HOST_RESERVED_* or CONTAINER_* settings"
+        )
+        logger.error(message)
+        raise RuntimeError(message)
+
+    container_capacity = capacity
+    free_slots = list(range(capacity))
+    logger.info(
+        f"Container capacity: {capacity}, host cpus: {cpu_count}, host memory: {memory // (1024 * 1024)} MB, "
+        f"per container: {CONTAINER_CPUS} cpus / {CONTAINER_MEMORY_MB} MB, cpu pinning: {CONTAINER_CPU_PINNING}"
+    )
+    return capacity
+
+
+def acquire_host_lock():
+    """获取临时目录下的进程锁，已有其他进程（例如 uvicorn 的其他 worker）持有时抛出 RuntimeError
+
+    容器槽位和绑核状态只在进程内有效，多个进程各自按整机容量分配会超额使用宿主机资源，因此只允许单 worker 运行
+    """
+    global host_lock_file
+    TMP_ROOT_DIR.mkdir(parents=True, exist_ok=True)
+    host_lock_file = open(TMP_ROOT_DIR / ".capacity.lock", "w")
+    try:
+        fcntl.flock(host_lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        host_lock_file.close()
+        host_lock_file = None
+        message = (
+            f"Another process already manages converter containers from {TMP_ROOT_DIR}; "
+            "main_multi_docker.py must run with a single worker"
+        )
+        logger.error(message)
+        raise RuntimeError(message) from None
+
+
+def acquire_container_slot() -> int | None:
+    """申请一个容器槽位，容量已满时返回 None"""
+    if not free_slots:
+        return None
+    return free_slots.pop(0)
+
+
+def release_container_slot(slot: int):
+    """归还容器槽位"""
+    free_slots.append(slot)
+
+
+def container_resource_limits(slot: int) -> dict:
+    """生成指定槽位容器的资源限制参数"""
+    limits = {
+        "cpu_period": 100000,
+        "cpu_quota": int(CONTAINER_CPUS * 100000),
+        "mem_limit": f"{CONTAINER_MEMORY_MB}m",
+        # 与内存上限相同，即禁止使用 swap
+        "memswap_limit": f"{CONTAINER_MEMORY_MB}m",
+    }
+    if CONTAINER_CPU_PINNING:
+        # 前 HOST_RESERVED_CPUS 个核心留给宿主机，之后每个槽位占用一段连续的核心
+        cpus_per_container = max(int(CONTAINER_CPUS), 1)
+        first_cpu = HOST_RESERVED_CPUS + slot * cpus_per_container
+        last_cpu = first_cpu + cpus_per_container - 1
+        if last_cpu >= host_cpu_count:
+            # 核心编号超出宿主机范围时 docker run 会失败，退化为只限制 CPU 配额
+            logger.warning(
+                f"cpuset {first_cpu}-{last_cpu} for slot {slot} exceeds host cpus ({host_cpu_count}), cpu pinning skipped"
+            )
+        else:
+            limits["cpuset_cpus"] = (
+                str(first_cpu) if first_cpu == last_cpu else f"{first_cpu}-{last_cpu}"
+            )
+    return limits
+
+
 # Docker容器管理函数
 async def convert_file_with_docker(
-    file_url: str = None, file_path: str = None, task_uuid: str = None
+    file_url: str = None, file_path: str = None, task_uuid: str = None, slot: int = 0
 ) -> tuple[bool, dict]:
     """
     使用Docker容器转换文件为PDF
@@ -216,7 +389,7 @@ async def convert_file_with_docker(
     if not client:
         return False, {"error": "Failed to create Docker client"}
 
-    container_name = f"pdf_converter_{task_uuid}"
+    container_name = f"{CONTAINER_NAME_PREFIX}{task_uuid}"
     container = None
 
     try:
@@ -241,6 +414,13 @@ async def convert_file_with_docker(
             detach=True,
             remove=False,  # 暂不自动删除，稍后手动清理
             environment=env_vars,
+            labels={
+                CONTAINER_LABEL: CONTAINER_LABEL_VALUE,
+                INSTANCE_LABEL: INSTANCE_ID,
+                OWNER_LABEL: OWNER_ID,
+                "task_uuid": task_uuid,
+            },
+            **container_resource_limits(slot),
         )
 
         # 等待容器启动
@@ -321,6 +501,107 @@ async def convert_file_with_docker(
                 )
 
 
+def _dir_size(path: pathlib.Path) -> int:
+    """统计目录下所有文件的总字节数"""
+    total = 0
+    for file in path.rglob("*"):
+        try:
+            if file.is_file():
+                total += file.stat().st_size
+        except OSError:
+            pass
+    return total
+
+
+def container_age(container) -> float:
+    """容器从创建到现在的秒数，无法解析创建时间时返回 0（视为新容器）"""
+    try:
+        # 形如 2024-01-01T00:00:00.123456789Z，只取到秒
+        created = datetime.datetime.fromisoformat(container.attrs["Created"][:19]).replace(tzinfo=datetime.timezone.utc)
+    except (KeyError, TypeError, ValueError):
+        return 0
+    return (datetime.datetime.now(datetime.timezone.utc) - created).total_seconds()
+
+
+def reap_orphans(tmp_max_age: int = ORPHAN_TMP_MAX_AGE) -> dict:
+    """
+    清理孤儿转换容器和超过时长的遗留临时目录
+    主进程崩溃或被强制杀死后，finally 中的清理逻辑不会执行，需要依靠这里回收资源
+    本进程创建的容器不属于正在运行的任务时立即清理；其他进程（包括同一实例的其他 worker 和之前崩溃的进程）
+    创建的容器无法判断是否仍在使用，只在超过 ORPHAN_CONTAINER_MAX_AGE 后清理
+    返回本次清理的统计信息
+    """
+    report = {"containers": [], "tmp_dirs": [], "reclaimed_bytes": 0, "errors": []}
+
+    # 1. 清理孤儿容器：查找本服务创建的全部转换容器，按创建它的进程判断是否为孤儿
+    client = create_docker_client()
+    if client:
+        try:
+            containers = client.containers.list(
+                all=True,
+                filters={"label": [f"{CONTAINER_LABEL}={CONTAINER_LABEL_VALUE}"]},
+            )
+
+            for container in containers:
+                if not container.name.startswith(CONTAINER_NAME_PREFIX):
+                    continue
+                task_uuid = container.name[len(CONTAINER_NAME_PREFIX):]
+                if container.labels.get(OWNER_LABEL) == OWNER_ID:
+                    if task_uuid in active_tasks:
+                        continue
+                elif container_age(container) < ORPHAN_CONTAINER_MAX_AGE:
+                    continue
+                try:
+                    container.remove(force=True)
+                    report["containers"].append(container.name)
+                    logger.info(f"Removed orphaned container: {container.name}")
+                except Exception as e:
+                    report["errors"].append(f"container {container.name}: {e}")
+                    logger.error(
+                        f"Failed to remove orphaned container {container.name}: {e}"
+                    )
+        except Exception as e:
+            report["errors"].append(f"list containers: {e}")
+            logger.error(f"Failed to list converter containers: {e}")
+
+    # 2. 清理遗留的临时任务目录
+    if TMP_ROOT_DIR.exists():
+        now = time.time()
+        for task_dir in TMP_ROOT_DIR.iterdir():
+            if not task_dir.is_dir() or task_dir.name in active_tasks:
+                continue
+            try:
+                if now - task_dir.stat().st_mtime < tmp_max_age:
+                    continue
+                size = _dir_size(task_dir)
+                shutil.rmtree(task_dir)
+                report["tmp_dirs"].append(task_dir.name)
+                report["reclaimed_bytes"] += size
+                logger.info(f"Removed stale task directory: {task_dir}")
+            except Exception as e:
+                report["errors"].append(f"tmp dir {task_dir.name}: {e}")
+                logger.error(f"Failed to remove stale task directory {task_dir}: {e}")
+
+    if report["containers"] or report["tmp_dirs"] or report["errors"]:
+        logger.info(
+            f"Orphan reaper finished, containers removed: {len(report['containers'])}, "
+            f"tmp dirs removed: {len(report['tmp_dirs'])}, "
+            f"reclaimed bytes: {report['reclaimed_bytes']}, errors: {len(report['errors'])}"
+        )
+    return report
+
+
+async def periodic_reaper():
+    """后台定期执行孤儿资源清理"""
+    while True:
+        await asyncio.sleep(ORPHAN_REAPER_INTERVAL)
+        try:
+            # docker SDK 和文件操作都是阻塞调用，放到线程中执行避免阻塞事件循环
+            await asyncio.to_thread(reap_orphans)
+        except Exception as e:
+            logger.error(f"Orphan reaper failed: {e}")
+
+
 # 编写初始化函数和关闭函数
 async def on_startup():
     # 设置 日志文件 位置，每次启动自动生成一个log文件
@@ -334,9 +615,28 @@ async def on_startup():
     logger.info(
         f"server start up, time: {time.strftime('%Y-%m-%d %H:%M:%S')}, s3 url is: {S3_ENDPOINT_URL}, log file is at: {log_file}"
     )
+    logger.info(f"Instance id: {INSTANCE_ID}, owner id: {OWNER_ID}")
+
+    # 容量和绑核状态只在本进程内有效，同一份部署只能有一个进程管理转换容器
+    acquire_host_lock()
+
+    # 上次进程遗留的容器和临时目录都按时长判断，其他进程可能仍在使用较新的容器和目录
+    report = await asyncio.to_thread(reap_orphans)
+    logger.info(
+        f"Startup orphan sweep, containers removed: {len(report['containers'])}, "
+        f"tmp dirs removed: {len(report['tmp_dirs'])}, reclaimed bytes: {report['reclaimed_bytes']}"
+    )
+
+    await asyncio.to_thread(compute_container_capacity)
+
+    global reaper_task
+    if ORPHAN_REAPER_INTERVAL > 0:
+        reaper_task = asyncio.create_task(periodic_reaper())
 
 
 async def on_shutdown():
+    if reaper_task:
+        reaper_task.cancel()
     logger.info(f"server shut down, time: {time.strftime('%Y-%m-%d %H:%M:%S')}")
 
 
@@ -356,7 +656,7 @@ async def serve_temp_file(request: Request):
     filename = request.path_params["filename"]
 
     # 构造文件路径
-    temp_dir = pathlib.Path(__file__).parent / "tmp" / task_uuid
+    temp_dir = TMP_ROOT_DIR / task_uuid
     file_path = temp_dir / filename
 
     if file_path.exists() and file_path.is_file():
@@ -422,24 +722,38 @@ async def convert(request: Request):
             status_code=400,
         )
 
-    # 生成任务UUID
-    task_uuid = str(uuid.uuid4())
-
-    # 创建任务专用的临时文件夹
-    download_file_dir = pathlib.Path(__file__).parent / "tmp" / task_uuid
-    download_file_dir.mkdir(parents=True, exist_ok=True)
-
-    # 生成下载文件路径
-    download_file_path = download_file_dir / file_name
+    # 准入控制：容器数量已达到宿主机容量上限时直接拒绝，避免过载
+    slot = acquire_container_slot()
+    if slot is None:
+        logger.warning(
+            f"Container capacity exhausted ({container_capacity}), rejecting request from {client_ip}"
+        )
+        return JSONResponse(
+            {"error": "Server is at capacity, please retry later"},
+            status_code=503,
+            headers={"Retry-After": "5"},
+        )
 
-    # 结果字典
-    result = {
-        "status": "success",
-        "original_source": original_source,
-        "converted_url": "",
-    }
+    # 生成任务UUID和任务专用的临时文件夹路径
+    task_uuid = str(uuid.uuid4())
+    download_file_dir = TMP_ROOT_DIR / task_uuid
 
+    # 申请槽位之后的所有操作都在 try 中，任何异常都会归还槽位，容量不会泄漏
     try:
+        # 登记为正在运行的任务，避免被清理
+        active_tasks.add(task_uuid)
+        download_file_dir.mkdir(parents=True, exist_ok=True)
+
+        # 生成下载文件路径
+        download_file_path = download_file_dir / file_name
+
+        # 结果字典
+        result = {
+            "status": "success",
+            "original_source": original_source,
+            "converted_url": "",
+        }
+
         # 获取文件内容（下载或保存上传的文件）
         try:
             if file_url:
@@ -495,7 +809,7 @@ async def convert(request: Request):
                 f"Using file_path mode for Docker conversion: {download_file_path}"
             )
             success, response_data = await convert_file_with_docker(
-                file_path=str(download_file_path), task_uuid=task_uuid
+                file_path=str(download_file_path), task_uuid=task_uuid, slot=slot
             )
 
             if success:
@@ -528,6 +842,9 @@ async def convert(request: Request):
             )
 
     finally:
+        active_tasks.discard(task_uuid)
+        release_container_slot(slot)
+
         # 删除任务临时目录
         if download_file_dir.exists():
             try:
@@ -0,0 +1,78 @@
+"""
+转换输出的信息提取：PDF 页数、PNG 缩略图尺寸
+
+只读取文件中需要的部分，不依赖 PDF 或图片处理库。
+"""
+
+import mmap
+import pathlib
+import re
+import struct
+import zlib
+from typing import Optional
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+# 页面树节点中的页数，/Type 与 /Count 的先后顺序不固定
+PAGES_COUNT_PATTERNS = (
+    re.compile(rb"/Type\s*/Pages\b[^>]*?/Count\s+(\d+)"),
+    re.compile(rb"/Count\s+(\d+)[^>]*?/Type\s*/Pages\b"),
+)
+# 单个页面对象
+PAGE_PATTERN = re.compile(rb"/Type\s*/Page(?![A-Za-z])")
+# 对象流（PDF 1.5+）：多个对象压缩存放在一个流中
+OBJECT_STREAM_PATTERN = re.compile(rb"/Type\s*/ObjStm\b[^>]*>>\s*stream\r?\n")
+# 解压对象流时每次送入的字节数
+INFLATE_CHUNK_SIZE = 64 * 1024
+
+
+def find_page_count(data) -> Optional[int]:
+    """在 PDF 数据中查找页数，取所有页面树节点中最大的 /Count，没有页面树时统计页面对象的数量"""
+    counts = [int(m.group(1)) for pattern in PAGES_COUNT_PATTERNS for m in pattern.finditer(data)]
+    if counts:
+        return max(counts)
+    pages = sum(1 for _ in PAGE_PATTERN.finditer(data))
+    return pages or None
+
+
+def inflate_object_streams(data):
+    """逐个解压 PDF 中的对象流"""
+    for match in OBJECT_STREAM_PATTERN.finditer(data):
+        decompressor = zlib.decompressobj()
+        position = match.end()
+        chunks = []
+        try:
+            while not decompressor.eof and position < len(data):
+                chunks.append(decompressor.decompress(data[position:position + INFLATE_CHUNK_SIZE]))
+                position += INFLATE_CHUNK_SIZE
+        except zlib.error:
+            continue
+        yield b"".join(chunks)
+
+
+def pdf_page_count(path: pathlib.Path) -> Optional[int]:
+    """读取 PDF 的页数，无法识别时返回 None
+
+    根页面树节点的 /Count 即总页数。LibreOffice 导出的 PDF 不使用对象流，页面树可以直接在文件中找到；
+    其他工具生成的 PDF 1.5+ 可能把页面树压缩进对象流，此时再解压对象流查找。
+    """
+    with open(path, "rb") as f:
+        if path.stat().st_size == 0:
+            return None
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            page_count = find_page_count(data)
+            if page_count is None:
+                counts = [find_page_count(stream) for stream in inflate_object_streams(data)]
+                page_count = max(filter(None, counts), default=None)
+            return page_count
+
+
+def png_dimensions(path: pathlib.Path) -> Optional[dict]:
+    """从 PNG 文件头读取宽高，不是 PNG 时返回 None"""
+    with open(path, "rb") as f:
+        header = f.read(24)
+    # 签名之后第一个块必须是 IHDR：长度(4) 类型(4) 宽(4) 高(4)
+    if len(header) < 24 or not header.startswith(PNG_SIGNATURE) or header[12:16] != b"IHDR":
+        return None
+    width, height = struct.unpack(">II", header[16:24])
+    return {"width": width, "height": height}
@@ -0,0 +1,258 @@
+"""
+PDF 导出配置
+
+通过 LibreOffice PDF 导出过滤器的选项（--convert-to 'pdf:writer_pdf_Export:{JSON}'，LibreOffice 7.4+）
+控制图片压缩和分辨率、标准字体嵌入和 PDF 版本；更早的版本会忽略 JSON 选项按默认设置导出，
+服务启动时检查版本，不支持时不使用选项（见 supports_filter_options）。LibreOffice 不能生成线性化（Fast Web View）PDF，
+安装了 qpdf 时在转换后用 qpdf 线性化，未安装时跳过。
+
+LibreOffice 嵌入的字体总是子集化的，没有关闭的选项；EmbedStandardFonts 控制是否同时嵌入 14 种 PDF 标准字体，
+PDF/A 要求嵌入全部字体。
+
+部分转换同样通过导出过滤器的选项实现：PageRange 只导出指定的页面，范围之外的页面不会被渲染；
+表格按工作表选择时开启 SinglePageSheets，每个工作表导出为一页，工作表序号即页码。
+导出后用 PDF 的页数校验页码范围是否生效（见 page_range_max_pages）。
+"""
+
+import asyncio
+import json
+import os
+import pathlib
+import re
+import shutil
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from loguru import logger
+
+# qpdf 可执行文件，未安装时不线性化
+QPDF_PATH = os.getenv("QPDF_PATH") or shutil.which("qpdf")
+# qpdf 线性化的最长时间(秒)
+LINEARIZE_TIMEOUT = int(os.getenv("LINEARIZE_TIMEOUT", 120))
+
+# 超过大小目标时依次尝试的图片设置 (分辨率 DPI, JPEG 质量)，只使用比当前设置更低的档位
+SIZE_TARGET_STEPS = [(150, 75), (96, 60), (72, 50)]
+
+# 页码范围：逗号分隔的页码或范围，例如 "1-5,8,10-"（10- 表示到最后一页）
+PAGE_RANGE_PATTERN = re.compile(r"^\d+(-\d*)?(,\d+(-\d*)?)*$")
+
+# --convert-to 支持 JSON 格式的导出过滤器选项的最低 LibreOffice 版本
+FILTER_OPTIONS_MIN_VERSION = (7, 4)
+LIBREOFFICE_VERSION_PATTERN = re.compile(r"(\d+)\.(\d+)")
+
+# 与文档类型对应的 PDF 导出过滤器，过滤器与打开文档的组件不一致时 LibreOffice 会报错
+WRITER_PDF_EXPORT = "writer_pdf_Export"
+CALC_PDF_EXPORT = "calc_pdf_Export"
+IMPRESS_PDF_EXPORT = "impress_pdf_Export"
+DRAW_PDF_EXPORT = "draw_pdf_Export"
+MATH_PDF_EXPORT = "math_pdf_Export"
+# HTML 由 Writer/Web 打开
+WRITER_WEB_PDF_EXPORT = "writer_web_pdf_Export"
+
+
+@dataclass(frozen=True)
+class PdfProfile:
+    """PDF 导出配置，字段为 None 时使用 LibreOffice 的默认值"""
+    name: str
+    # 图片降采样的最高分辨率(DPI)，为 None 时不降采样
+    image_dpi: Optional[int] = None
+    # JPEG 压缩质量 1-100
+    image_quality: Optional[int] = None
+    # 图片使用无损压缩
+    lossless_images: Optional[bool] = None
+    # 嵌入 14 种 PDF 标准字体
+    embed_standard_fonts: Optional[bool] = None
+    # PDF 版本：0 为默认版本，1/2/3 为 PDF/A-1b/2b/3b，15/16/17 为 PDF 1.5/1.6/1.7
+    pdf_version: Optional[int] = None
+    # 转换后线性化，浏览器下载到第一页即可显示
+    linearize: bool = False
+    # PDF 大小目标(KB)，超过时逐级降低图片分辨率重新导出，为 None 时不限制
+    target_size_kb: Optional[int] = None
+    # 只导出的页码范围，为 None 时导出全部页面
+    page_range: Optional[str] = None
+    # 表格的每个工作表导出为一页（按工作表选择时使用）
+    single_page_sheets: Optional[bool] = None
+
+    def filter_options(self) -> dict:
+        """导出过滤器的 JSON 选项"""
+        options = {}
+        if self.image_dpi is not None:
+            options["ReduceImageResolution"] = {"type": "boolean", "value": "true"}
+            options["MaxImageResolution"] = {"type": "long", "value": str(self.image_dpi)}
+        if self.image_quality is not None:
+            options["Quality"] = {"type": "long", "value": str(self.image_quality)}
+        if self.lossless_images is not None:
+            options["UseLosslessCompression"] = {"type": "boolean", "value": str(self.lossless_images).lower()}
+        if self.embed_standard_fonts is not None:
+            options["EmbedStandardFonts"] = {"type": "boolean", "value": str(self.embed_standard_fonts).lower()}
+        if self.pdf_version is not None:
+            options["SelectPdfVersion"] = {"type": "long", "value": str(self.pdf_version)}
+        if self.page_range is not None:
+            options["PageRange"] = {"type": "string", "value": self.page_range}
+        if self.single_page_sheets is not None:
+            options["SinglePageSheets"] = {"type": "boolean", "value": str(self.single_page_sheets).lower()}
+        return options
+
+    def convert_to(self, export_filter: Optional[str]) -> str:
+        """soffice --convert-to 参数；没有选项或不知道导出过滤器时使用默认的 pdf"""
+        options = self.filter_options()
+        if not options or export_filter is None:
+            return "pdf"
+        return f"pdf:{export_filter}:{json.dumps(options, separators=(',', ':'))}"
+
+    def describe(self) -> dict:
+        return {
+            "name": self.name,
+            "image_dpi": self.image_dpi,
+            "image_quality": self.image_quality,
+            "linearize": self.linearize,
+            "target_size_kb": self.target_size_kb,
+            "page_range": self.page_range,
+            "single_page_sheets": bool(self.single_page_sheets),
+        }
+
+
+PDF_PROFILES = {
+    # LibreOffice 默认设置：不降采样，JPEG 质量 90
+    "default": PdfProfile("default"),
+    # 网页和移动端浏览：150 DPI，线性化后边下载边显示
+    "web": PdfProfile("web", image_dpi=150, image_quality=75, lossless_images=False, linearize=True),
+    # 最小体积，适合预览
+    "compact": PdfProfile("compact", image_dpi=96, image_quality=60, lossless_images=False, linearize=True),
+    # 打印：图片无损、不降采样，嵌入全部字体
+    "print": PdfProfile("print", lossless_images=True, embed_standard_fonts=True),
+    # 长期归档：PDF/A-2b，嵌入全部字体
+    "archive": PdfProfile("archive", embed_standard_fonts=True, pdf_version=2),
+}
+
+# 服务端默认配置，请求未指定 pdf_profile 时使用
+PDF_PROFILE = os.getenv("PDF_PROFILE", "default")
+if PDF_PROFILE not in PDF_PROFILES:
+    raise ValueError(f"Unknown PDF_PROFILE: {PDF_PROFILE}, available: {', '.join(PDF_PROFILES)}")
+
+
+def parse_profile(form_data) -> PdfProfile:
+    """根据表单字段选择导出配置，image_dpi / image_quality / target_size_kb / linearize 覆盖配置中的对应项
+
+    参数错误时抛出 ValueError
+    """
+    name = str(form_data.get("pdf_profile") or PDF_PROFILE).lower()
+    profile = PDF_PROFILES.get(name)
+    if profile is None:
+        raise ValueError(f"unknown pdf profile: {name}, available: {', '.join(PDF_PROFILES)}")
+    overrides = {}
+    for field, low, high in (("image_dpi", 36, 2400), ("image_quality", 1, 100), ("target_size_kb", 1, 10 ** 7)):
+        value = form_data.get(field)
+        if value in (None, ""):
+            continue
+        try:
+            overrides[field] = int(value)
+        except ValueError:
+            raise ValueError(f"{field} must be an integer") from None
+        if not low <= overrides[field] <= high:
+            raise ValueError(f"{field} must be between {low} and {high}")
+    if overrides.get("image_quality") is not None and profile.lossless_images:
+        overrides["lossless_images"] = False
+    linearize = form_data.get("linearize")
+    if linearize not in (None, ""):
+        overrides["linearize"] = str(linearize).lower() in ("true", "1", "yes")
+    return replace(profile, **overrides) if overrides else profile
+
+
+def normalize_page_range(value: str, field: str) -> str:
+    """校验页码范围并去掉空白，格式错误时抛出 ValueError"""
+    page_range = re.sub(r"\s+", "", value)
+    if not PAGE_RANGE_PATTERN.match(page_range):
+        raise ValueError(f"{field} must be page numbers or ranges like 1-5,8,10-")
+    for part in page_range.split(","):
+        start, _, end = part.partition("-")
+        if int(start) < 1 or (end and int(end) < int(start)):
+            raise ValueError(f"{field} contains an invalid range: {part}")
+    return page_range
+
+
+def parse_page_selection(form_data, spreadsheet: bool) -> dict:
+    """解析部分转换参数，返回需要覆盖的导出配置字段，参数错误时抛出 ValueError
+
+    page_range: 只导出指定页面；preview_pages: 只导出前 N 页；
+    sheets: 只导出指定的工作表（从 1 开始的序号，仅表格），三者只能指定一个
+    """
+    fields = {name: str(form_data.get(name) or "").strip() for name in ("page_range", "preview_pages", "sheets")}
+    given = [name for name, value in fields.items() if value]
+    if not given:
+        return {}
+    if len(given) > 1:
+        raise ValueError(f"only one of page_range, preview_pages, sheets can be given: {', '.join(given)}")
+    if fields["page_range"]:
+        return {"page_range": normalize_page_range(fields["page_range"], "page_range")}
+    if fields["preview_pages"]:
+        try:
+            pages = int(fields["preview_pages"])
+        except ValueError:
+            raise ValueError("preview_pages must be an integer") from None
+        if pages < 1:
+            raise ValueError("preview_pages must be at least 1")
+        return {"page_range": f"1-{pages}"}
+    if not spreadsheet:
+        raise ValueError("sheets is only supported for spreadsheets")
+    # 每个工作表一页时，第 N 个（可见的）工作表即第 N 页
+    return {"page_range": normalize_page_range(fields["sheets"], "sheets"), "single_page_sheets": True}
+
+
+def page_range_max_pages(page_range: str) -> Optional[int]:
+    """按页码范围导出的最多页数，范围不封闭（例如 10-）时返回 None"""
+    pages = set()
+    for part in page_range.split(","):
+        start, separator, end = part.partition("-")
+        if separator and not end:
+            return None
+        pages.update(range(int(start), int(end or start) + 1))
+    return len(pages)
+
+
+def supports_filter_options(version: Optional[str]) -> bool:
+    """soffice --version 的输出是否表示支持 JSON 格式的导出过滤器选项，无法识别版本时返回 False"""
+    match = LIBREOFFICE_VERSION_PATTERN.search(version or "")
+    return match is not None and (int(match.group(1)), int(match.group(2))) >= FILTER_OPTIONS_MIN_VERSION
+
+
+def smaller_profiles(profile: PdfProfile):
+    """逐级降低图片分辨率和质量的配置，用于达到大小目标"""
+    for dpi, quality in SIZE_TARGET_STEPS:
+        if profile.image_dpi is None or dpi < profile.image_dpi:
+            yield replace(profile, image_dpi=dpi, image_quality=quality, lossless_images=False)
+
+
+_qpdf_missing_logged = False
+
+
+async def linearize_pdf(path: pathlib.Path) -> bool:
+    """用 qpdf 线性化 PDF（原地替换），未安装 qpdf 或失败时保留原文件并返回 False"""
+    global _qpdf_missing_logged
+    if not QPDF_PATH:
+        if not _qpdf_missing_logged:
+            logger.warning("qpdf not found, PDF linearization is skipped; install qpdf or set QPDF_PATH")
+            _qpdf_missing_logged = True
+        return False
+    linearized_path = path.with_name(f"{path.stem}.linearized.pdf")
+    process = await asyncio.create_subprocess_exec(
+        QPDF_PATH, "--linearize", str(path), str(linearized_path),
+        stdout=asyncio.subprocess.DEVNULL,
+        stderr=asyncio.subprocess.PIPE,
+    )
+    try:
+        _, stderr = await asyncio.wait_for(process.communicate(), timeout=LINEARIZE_TIMEOUT)
+    except asyncio.TimeoutError:
+        stderr = f"timed out after {LINEARIZE_TIMEOUT}s".encode()
+    finally:
+        # 超时或请求被取消时终止 qpdf
+        if process.returncode is None:
+            process.kill()
+            await process.wait()
+    # 退出码 3 表示有警告但输出可用
+    if process.returncode not in (0, 3) or not linearized_path.exists():
+        logger.warning(f"qpdf linearization failed, file: {path}, exit code: {process.returncode}, stderr: {stderr.decode(errors='ignore').strip()}")
+        linearized_path.unlink(missing_ok=True)
+        return False
+    linearized_path.replace(path)
+    return True
@@ -0,0 +1,269 @@
+"""
+文件内容探测
+
+转换前根据文件头部的魔数和容器结构判断文件的真实格式：
+    - 文件为空、实际是 PDF、内容与扩展名不符（例如保存成 .docx 的 HTML 错误页）时直接拒绝，不再浪费一次 soffice 转换
+    - 根据探测结果选择 LibreOffice 导入过滤器（--infilter），跳过 LibreOffice 自己的格式识别，
+      并为没有 BOM 的 UTF-8 文本指定编码，避免按系统默认编码解析出乱码
+
+头部探测在文件边下载边写入时进行，发现不符可以立即停止下载；ZIP 容器在文件写完后读取中央目录确认具体格式。
+"""
+
+import pathlib
+import zipfile
+from typing import Optional
+
+# 探测时使用的文件头部大小
+SNIFF_SIZE = 8 * 1024
+
+OLE2_MAGIC = b"\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1"
+ZIP_MAGICS = (b"PK\x03\x04", b"PK\x05\x06")
+RTF_MAGIC = b"{\\rtf"
+PDF_MAGIC = b"%PDF-"
+
+# 不可能是文档的常见格式，出现在文档扩展名下说明文件有误
+FOREIGN_MAGICS = {
+    b"\x89PNG\r\n\x1a\n": "png image",
+    b"\xff\xd8\xff": "jpeg image",
+    b"GIF87a": "gif image",
+    b"GIF89a": "gif image",
+    b"\x1f\x8b": "gzip archive",
+    b"Rar!\x1a\x07": "rar archive",
+    b"7z\xbc\xaf\x27\x1c": "7z archive",
+    b"\x7fELF": "executable",
+}
+# Windows 可执行文件（PE）：MZ 头，0x3C 处的 e_lfanew 指向 PE\0\0 签名；只有 MZ 两个字节的文本文件并不少见
+MZ_MAGIC = b"MZ"
+PE_SIGNATURE = b"PE\x00\x00"
+# 没有 BOM 的 UTF-16 文本：至少这个比例的字符高位（或低位）字节为 0 时才认为是 UTF-16
+UTF16_NUL_RATIO = 0.3
+
+# 基于 ZIP 容器的格式（OOXML / ODF / OpenOffice.org 1.0）
+ZIP_EXTENSIONS = {
+    ".docx", ".docm", ".xlsx", ".xlsm", ".pptx", ".pptm", ".vsdx",
+    ".odt", ".ods", ".odp", ".odg", ".odf", ".odb",
+    ".sxw", ".sxc", ".sxi", ".sxd",
+}
+# 基于 OLE2 复合文档的格式；这些扩展名下也常见实际为 RTF、OOXML 的文件，LibreOffice 都能识别
+OLE2_EXTENSIONS = {".doc", ".xls", ".ppt", ".vsd", ".wps", ".sdw", ".sdc", ".sdd", ".sda"}
+# 允许内容为 HTML/XML 的二进制扩展名（网页导出、Office 2003 XML 另存的 .doc/.xls）
+MARKUP_TOLERANT_EXTENSIONS = {".doc", ".xls"}
+# 其他私有二进制格式，不检查魔数，只排除明显不是文档的内容
+BINARY_EXTENSIONS = {".wpd", ".lwp", ".wk1", ".wks", ".123", ".mdb", ".accdb"}
+# 纯文本类格式
+TEXT_EXTENSIONS = {".txt", ".csv", ".tsv", ".html", ".htm", ".xml", ".mml", ".svg", ".dif", ".sylk"}
+
+# OLE2 目录项名称（UTF-16LE）-> 导入过滤器
+OLE2_STREAM_FILTERS = {
+    "WordDocument": "MS Word 97",
+    "Workbook": "MS Excel 97",
+    "Book": "MS Excel 95",
+    "PowerPoint Document": "MS PowerPoint 97",
+}
+# OOXML 主文档的内容类型 -> 导入过滤器
+OOXML_CONTENT_TYPE_FILTERS = {
+    "wordprocessingml.document.main": "MS Word 2007 XML",
+    "spreadsheetml.sheet.main": "Calc MS Excel 2007 XML",
+    "presentationml.presentation.main": "Impress MS PowerPoint 2007 XML",
+}
+# ODF mimetype -> 导入过滤器
+ODF_MIMETYPE_FILTERS = {
+    "application/vnd.oasis.opendocument.text": "writer8",
+    "application/vnd.oasis.opendocument.spreadsheet": "calc8",
+    "application/vnd.oasis.opendocument.presentation": "impress8",
+    "application/vnd.oasis.opendocument.graphics": "draw8",
+}
+# UTF-8 文本的导入过滤器；CSV 过滤器参数依次为 分隔符,文本引号,编码(76=UTF-8),起始行
+UTF8_TEXT_FILTERS = {
+    ".txt": "Text (encoded):UTF8",
+    ".csv": "Text - txt - csv (StarCalc):44,34,76,1",
+    ".tsv": "Text - txt - csv (StarCalc):9,34,76,1",
+}
+
+
+class ContentMismatch(Exception):
+    """文件内容为空或与扩展名不符"""
+    pass
+
+
+def is_pe_executable(head: bytes) -> bool:
+    """头部是否为完整的 PE 可执行文件头"""
+    if not head.startswith(MZ_MAGIC) or len(head) < 0x40:
+        return False
+    pe_offset = int.from_bytes(head[0x3C:0x40], "little")
+    return head[pe_offset:pe_offset + 4] == PE_SIGNATURE
+
+
+def detect_utf16(head: bytes, complete: bool) -> Optional[str]:
+    """判断没有 BOM 的头部是否为 UTF-16 文本，返回 utf-16-le / utf-16-be，不是时返回 None
+    
+    以 ASCII 字符为主的 UTF-16 文本每个字符有一个字节为 0，且 0 总在同一侧；二进制内容的 0 不会这样分布。
+    """
+    pairs = len(head) // 2
+    if pairs == 0:
+        return None
+    even_nuls = head[0:pairs * 2:2].count(0)
+    odd_nuls = head[1:pairs * 2:2].count(0)
+    if odd_nuls >= pairs * UTF16_NUL_RATIO and even_nuls == 0:
+        encoding = "utf-16-le"
+    elif even_nuls >= pairs * UTF16_NUL_RATIO and odd_nuls == 0:
+        encoding = "utf-16-be"
+    else:
+        return None
+    # 文件未接收完时头部可能截断在代理对中间
+    sample = head[:pairs * 2] if complete else head[:max(pairs - 2, 0) * 2]
+    try:
+        text = sample.decode(encoding)
+    except UnicodeDecodeError:
+        return None
+    if any(char < " " and char not in "\t\r\n\f" for char in text):
+        return None
+    return encoding
+
+
+def detect_text_encoding(head: bytes, complete: bool) -> Optional[str]:
+    """判断头部是否为文本，返回编码；无法确定编码的文本返回 "unknown"，二进制内容返回 None"""
+    if head.startswith(b"\xef\xbb\xbf"):
+        return "utf-8"
+    if head.startswith((b"\xff\xfe", b"\xfe\xff")):
+        return "utf-16"
+    if b"\x00" in head:
+        # 没有 BOM 的 UTF-16 文本含有大量 0 字节，需要在按二进制处理前识别
+        return detect_utf16(head, complete)
+    try:
+        head.decode("utf-8")
+        return "utf-8"
+    except UnicodeDecodeError as e:
+        # 头部截断在多字节字符中间
+        if not complete and e.reason == "unexpected end of data" and e.start >= len(head) - 3:
+            return "utf-8"
+    return "unknown"
+
+
+def detect_format(head: bytes, complete: bool) -> str:
+    """根据文件头部判断格式：ole2 / zip / rtf / pdf / markup / text / 外来格式描述 / binary"""
+    if head.startswith(OLE2_MAGIC):
+        return "ole2"
+    if head.startswith(ZIP_MAGICS):
+        return "zip"
+    if head.startswith(PDF_MAGIC):
+        return "pdf"
+    for magic, description in FOREIGN_MAGICS.items():
+        if head.startswith(magic):
+            return description
+    if is_pe_executable(head):
+        return "executable"
+    encoding = detect_text_encoding(head, complete)
+    if encoding is None:
+        return "binary"
+    text = head.decode("utf-8" if encoding == "unknown" else encoding, errors="ignore")
+    text = text.lstrip("\ufeff \t\r\n")
+    if text.startswith(RTF_MAGIC.decode()):
+        return "rtf"
+    if text.startswith("<"):
+        return "markup"
+    return "text"
+
+
+def ole2_filter(head: bytes) -> Optional[str]:
+    """目录扇区位于文件头部时，根据其中的流名称选择导入过滤器"""
+    for stream, import_filter in OLE2_STREAM_FILTERS.items():
+        # 目录项名称为 UTF-16LE，以 \0\0 结尾，用于区分 Book 和 Workbook
+        if stream.encode("utf-16-le") + b"\x00\x00" in head:
+            return import_filter
+    return None
+
+
+def zip_filter(path: pathlib.Path, extension: str) -> Optional[str]:
+    """读取 ZIP 中央目录，确认是 OOXML 或 ODF 文档并选择导入过滤器"""
+    try:
+        with zipfile.ZipFile(path) as archive:
+            names = set(archive.namelist())
+            if "mimetype" in names:
+                mimetype = archive.read("mimetype").decode("ascii", errors="ignore").strip()
+                return ODF_MIMETYPE_FILTERS.get(mimetype)
+            if "[Content_Types].xml" in names:
+                content_types = archive.read("[Content_Types].xml").decode("utf-8", errors="ignore")
+                for content_type, import_filter in OOXML_CONTENT_TYPE_FILTERS.items():
+                    if content_type in content_types:
+                        return import_filter
+                # 启用宏的文档、Visio 等交给 LibreOffice 自行识别
+                return None
+            # 旧版 OpenOffice.org 文档没有 mimetype 时也一定有 content.xml
+            if "content.xml" in names:
+                return None
+    except (zipfile.BadZipFile, zipfile.LargeZipFile, OSError) as e:
+        raise ContentMismatch(f"file is damaged or truncated: {extension} archive is unreadable ({e})") from e
+    raise ContentMismatch(f"file content does not match extension {extension}: detected zip archive without office document")
+
+
+class ContentSniffer:
+    """边接收边探测文件内容
+
+    用法:
+        sniffer = ContentSniffer(".docx")
+        for chunk in chunks:
+            sniffer.feed(chunk)  # 头部凑够后立即检查，不符时抛出 ContentMismatch
+            ...
+        import_filter = sniffer.finish(path)
+    """
+
+    def __init__(self, extension: str):
+        self.extension = extension.lower()
+        self.head = b""
+        self.format: Optional[str] = None
+        self.import_filter: Optional[str] = None
+
+    def feed(self, chunk: bytes):
+        if self.format is not None:
+            return
+        self.head += chunk[:SNIFF_SIZE - len(self.head)]
+        if len(self.head) >= SNIFF_SIZE:
+            self._check(complete=False)
+
+    def finish(self, path: pathlib.Path) -> Optional[str]:
+        """文件接收完成后调用，返回应使用的导入过滤器，为 None 时由 LibreOffice 自动识别"""
+        if self.format is None:
+            self._check(complete=True)
+        if self.format == "zip" and self.extension in ZIP_EXTENSIONS:
+            self.import_filter = zip_filter(path, self.extension)
+        return self.import_filter
+
+    def _mismatch(self, detected: str):
+        raise ContentMismatch(f"file content does not match extension {self.extension}: detected {detected}")
+
+    def _check(self, complete: bool):
+        if not self.head:
+            raise ContentMismatch("file is empty")
+        detected = detect_format(self.head, complete)
+        self.format = detected
+        extension = self.extension
+
+        if detected == "pdf":
+            raise ContentMismatch("file is already pdf")
+
+        if extension in ZIP_EXTENSIONS:
+            if detected != "zip":
+                self._mismatch(detected)
+        elif extension in OLE2_EXTENSIONS:
+            if detected == "ole2":
+                self.import_filter = ole2_filter(self.head)
+            elif detected == "rtf":
+                self.import_filter = "Rich Text Format"
+            elif detected in FOREIGN_MAGICS.values():
+                self._mismatch(detected)
+            elif detected in ("markup", "text") and extension not in MARKUP_TOLERANT_EXTENSIONS:
+                self._mismatch(detected)
+            # 其余情况（改了扩展名的 OOXML、Excel 2.x-4.0 等非 OLE2 的旧格式）交给 LibreOffice 识别
+        elif extension == ".rtf":
+            if detected != "rtf":
+                self._mismatch(detected)
+            self.import_filter = "Rich Text Format"
+        elif extension in BINARY_EXTENSIONS:
+            if detected in FOREIGN_MAGICS.values() or detected == "markup":
+                self._mismatch(detected)
+        elif extension in TEXT_EXTENSIONS:
+            if detected not in ("text", "markup", "rtf"):
+                self._mismatch(detected)
+            if detected != "rtf" and detect_text_encoding(self.head, complete) == "utf-8":
+                self.import_filter = UTF8_TEXT_FILTERS.get(extension)
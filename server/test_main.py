@@ -0,0 +1,125 @@
+"""
+服务端接口的测试，使用 fake 执行器和内存中的对象存储，不需要 LibreOffice 和 minio
+
+运行:
+    python -m unittest test_main
+"""
+
+import asyncio
+import os
+import socket
+import threading
+import time
+import unittest
+
+# 导入 main 之前选择 fake 执行器，每次转换固定耗时 1 秒
+os.environ.update(CONVERT_EXECUTOR="fake", FAKE_LATENCY_DISTRIBUTION="fixed", FAKE_LATENCY_MEAN="1", FAKE_FAILURE_RATE="0")
+
+import aiohttp
+import uvicorn
+from loguru import logger
+
+import main
+
+
+class MemoryStorage:
+    """代替 minio 客户端，只记录上传的对象"""
+
+    def __init__(self):
+        self.objects = []
+
+    def bucket_exists(self, bucket_name):
+        return True
+
+    def fput_object(self, bucket_name, object_name, file_path, **kwargs):
+        self.objects.append(object_name)
+
+
+class IdempotentRetryTest(unittest.IsolatedAsyncioTestCase):
+    """客户端超时后携带相同幂等键的重试应等待首次请求的转换，而不是重新转换"""
+
+    @classmethod
+    def setUpClass(cls):
+        logger.remove()
+        cls.storage = MemoryStorage()
+        main.create_minio_client = lambda: cls.storage
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            cls.port = sock.getsockname()[1]
+        # 不执行启动流程（连接对象存储、写日志文件），fake 执行器不需要启动
+        cls.server = uvicorn.Server(uvicorn.Config(main.app, port=cls.port, log_level="warning", lifespan="off"))
+        threading.Thread(target=cls.server.run, daemon=True).start()
+        while not cls.server.started:
+            time.sleep(0.05)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.should_exit = True
+
+    async def asyncSetUp(self):
+        self.conversions = 0
+        convert = main.executor.convert
+
+        async def counting_convert(*args, **kwargs):
+            self.conversions += 1
+            return await convert(*args, **kwargs)
+
+        main.executor.convert = counting_convert
+        self.addCleanup(setattr, main.executor, "convert", convert)
+
+    async def post(self, session, key, timeout=None):
+        data = aiohttp.FormData()
+        data.add_field("file", b"hello world", filename="a.txt")
+        async with session.post(
+            f"http://127.0.0.1:{self.port}/convert",
+            data=data,
+            headers={main.IDEMPOTENCY_HEADER: key, main.DEADLINE_HEADER: str(timeout or 30)},
+            timeout=aiohttp.ClientTimeout(total=timeout),
+        ) as response:
+            return response.status, await response.json()
+
+    async def test_retry_after_client_timeout_reuses_job(self):
+        async with aiohttp.ClientSession() as session:
+            # 第一次尝试在转换完成前超时并断开连接
+            with self.assertRaises(asyncio.TimeoutError):
+                await self.post(session, "retry-key", timeout=0.4)
+            status, result = await self.post(session, "retry-key")
+
+        self.assertEqual(status, 200)
+        self.assertEqual(result["status"], "success")
+        self.assertEqual(self.conversions, 1)
+        self.assertEqual(len(self.storage.objects), 1)
+
+    async def test_orphaned_job_is_cancelled_after_grace(self):
+        grace = main.idempotency_table.grace
+        main.idempotency_table.grace = 0.1
+        self.addCleanup(setattr, main.idempotency_table, "grace", grace)
+        cancelled = main.idempotency_table.cancelled
+        uploads = len(self.storage.objects)
+
+        async with aiohttp.ClientSession() as session:
+            with self.assertRaises(asyncio.TimeoutError):
+                await self.post(session, "orphan-key", timeout=0.4)
+        await asyncio.sleep(1.5)
+
+        self.assertEqual(main.idempotency_table.cancelled, cancelled + 1)
+        self.assertEqual(len(self.storage.objects), uploads)
+
+
+class PoisonCacheTest(unittest.TestCase):
+    """隔离按内容哈希和转换选项区分，某组选项的失败不影响其他选项"""
+
+    def test_failure_only_quarantines_same_options(self):
+        cache = main.PoisonCache(threshold=1, ttl=60, max_entries=10)
+        cache.record("abc", "formats=png", "soffice produced no output", "a.docx")
+
+        self.assertIsNotNone(cache.check("abc", "formats=png"))
+        self.assertIsNone(cache.check("abc", "formats=pdf"))
+
+        cache.record("abc", "formats=pdf", "soffice produced no output", "a.docx")
+        self.assertEqual(cache.remove("abc"), 2)
+        self.assertEqual(len(cache.entries), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()